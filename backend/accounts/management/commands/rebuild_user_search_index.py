@@ -0,0 +1,23 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import UserSearchToken
+from accounts.search import build_search_tokens
+
+
+class Command(BaseCommand):
+    help = "Rebuild the admin user search token index from scratch."
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        with transaction.atomic():
+            UserSearchToken.objects.all().delete()
+            batch = []
+            for user in User.objects.only('id', 'email', 'name', 'organization').iterator(chunk_size=2000):
+                batch.extend(build_search_tokens(user))
+                if len(batch) >= 5000:
+                    UserSearchToken.objects.bulk_create(batch)
+                    batch = []
+            UserSearchToken.objects.bulk_create(batch)
+        self.stdout.write(f"Indexed {User.objects.count()} user(s).")
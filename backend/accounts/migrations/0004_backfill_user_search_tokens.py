@@ -0,0 +1,46 @@
+# Generated by Django 5.2.9 on 2026-10-19 16:08
+
+import re
+
+from django.db import migrations
+
+# Frozen copies of accounts.search as of this migration, so it keeps writing
+# the same tokens whatever the app code later changes to
+SEARCH_FIELDS = ['email', 'name', 'organization']
+MAX_TOKEN_LENGTH = 64
+_TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+def tokenize(text):
+    tokens = []
+    for token in _TOKEN_RE.findall((text or '').lower()):
+        token = token[:MAX_TOKEN_LENGTH]
+        if token not in tokens:
+            tokens.append(token)
+    return tokens
+
+
+def backfill_search_tokens(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    UserSearchToken = apps.get_model('accounts', 'UserSearchToken')
+
+    batch = []
+    for user in User.objects.only('id', *SEARCH_FIELDS).iterator(chunk_size=2000):
+        for field in SEARCH_FIELDS:
+            for token in tokenize(getattr(user, field)):
+                batch.append(UserSearchToken(user_id=user.pk, token=token, field=field))
+        if len(batch) >= 5000:
+            UserSearchToken.objects.bulk_create(batch)
+            batch = []
+    UserSearchToken.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_search_tokens'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_tokens, migrations.RunPython.noop),
+    ]
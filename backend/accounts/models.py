@@ -52,3 +52,22 @@ class Profile(models.Model):
 
     def __str__(self):
         return f'{self.user.email} Profile'
+
+class UserSearchToken(models.Model):
+    """
+    Lower-cased word tokens of a user's email, name and organization.
+    Admin search matches query terms as prefixes of `token`, which is an
+    index range scan instead of an ILIKE '%term%' scan over every user.
+    Kept up to date by accounts.signals.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=64)
+    field = models.CharField(max_length=20)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['token', 'user'], name='user_search_token_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.token} ({self.field}) -> {self.user_id}'
@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class AdminUserCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the admin user list, newest users first.
+    Ordering on the primary key keeps every page an index range scan.
+    """
+    ordering = '-id'
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -0,0 +1,112 @@
+import re
+
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, Q, Sum, Value, When
+from rest_framework.filters import BaseFilterBackend
+
+from .models import UserSearchToken
+
+# Fields indexed for admin search and how much a match in each one counts
+SEARCH_FIELD_WEIGHTS = {'email': 3, 'name': 2, 'organization': 1}
+MAX_TOKEN_LENGTH = 64
+MAX_QUERY_TERMS = 5
+SEARCH_RESULT_LIMIT = 50
+
+_TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+def tokenize(text):
+    """Split text into lower-cased alphanumeric tokens (unique, in order)."""
+    tokens = []
+    for token in _TOKEN_RE.findall((text or '').lower()):
+        token = token[:MAX_TOKEN_LENGTH]
+        if token not in tokens:
+            tokens.append(token)
+    return tokens
+
+
+def build_search_tokens(user):
+    return [
+        UserSearchToken(user=user, token=token, field=field)
+        for field in SEARCH_FIELD_WEIGHTS
+        for token in tokenize(getattr(user, field, ''))
+    ]
+
+
+def index_user(user):
+    """Replace the search tokens of one user."""
+    with transaction.atomic():
+        UserSearchToken.objects.filter(user=user).delete()
+        UserSearchToken.objects.bulk_create(build_search_tokens(user))
+
+
+def search_users(query, limit=SEARCH_RESULT_LIMIT):
+    """
+    Return [(user_id, rank), ...] for users matching every query term as a
+    token prefix, best first. Exact token matches rank above prefix matches
+    and email matches above name and organization matches.
+    """
+    terms = tokenize(query)[:MAX_QUERY_TERMS]
+    if not terms:
+        return []
+
+    any_term = Q()
+    for term in terms:
+        any_term |= Q(token__startswith=term)
+
+    field_weight = Case(
+        *[When(field=field, then=Value(weight)) for field, weight in SEARCH_FIELD_WEIGHTS.items()],
+        default=Value(1),
+        output_field=IntegerField(),
+    )
+    rank = Sum(Case(
+        When(token__in=terms, then=field_weight * 2),
+        default=field_weight,
+        output_field=IntegerField(),
+    ))
+    # One flag per term: did any of the user's tokens start with it?
+    coverage = {
+        f'term_{i}': Max(Case(When(token__startswith=term, then=Value(1)), default=Value(0), output_field=IntegerField()))
+        for i, term in enumerate(terms)
+    }
+
+    matches = (
+        UserSearchToken.objects
+        .filter(any_term)
+        .values('user_id')
+        .annotate(rank=rank, **coverage)
+        .filter(**{name: 1 for name in coverage})
+        .order_by('-rank', '-user_id')
+        .values_list('user_id', 'rank')[:limit]
+    )
+    return list(matches)
+
+
+class UserTokenSearchFilter(BaseFilterBackend):
+    """
+    ?search= backed by the UserSearchToken index. Returns the best
+    SEARCH_RESULT_LIMIT matches ordered by rank.
+    """
+    search_param = 'search'
+
+    def get_search_query(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if not query:
+            return queryset
+
+        ranked = search_users(query)
+        if not ranked:
+            return queryset.none()
+
+        return (
+            queryset
+            .filter(pk__in=[user_id for user_id, _ in ranked])
+            .annotate(search_rank=Case(
+                *[When(pk=user_id, then=Value(rank)) for user_id, rank in ranked],
+                output_field=IntegerField(),
+            ))
+            .order_by('-search_rank', '-id')
+        )
@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .search import SEARCH_FIELD_WEIGHTS, index_user
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def update_user_search_tokens(sender, instance, created, update_fields=None, **kwargs):
+    # Saves that touch none of the searchable fields (e.g. last_login updates) are skipped
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELD_WEIGHTS):
+        return
+    index_user(instance)
@@ -1,16 +1,27 @@
 from django.shortcuts import render
-from rest_framework import viewsets, permissions, status, filters  # Added filters
+from rest_framework import viewsets, permissions, serializers, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from datetime import timedelta
 
 # Import your serializers and models
 from .serializers import UserSerializer,AdminUserSerializer
+from .pagination import AdminUserCursorPagination
 from .permissions import IsAdminUser
-from billing.models import UserCredit, APICallLog
-from billing.serializers import APICallLogSerializer, UserCreditSerializer
+from .search import UserTokenSearchFilter
+from billing.concurrency import concurrency_limiter
+from billing.ledger import InsufficientCredits, adjust_purchased_credits, bulk_adjust_purchased_credits, ledger_balance
+from billing.logs import filter_call_logs, stream_call_logs
+from billing.params import parse_int_param
+from billing.models import APICallLog, APIKey, APIUsageRollup, CreditTransaction
+from billing.pagination import CallLogKeysetPagination
+from billing.rollups import usage_summary
+from billing.serializers import (
+    APICallLogSerializer, BulkCreditAdjustmentSerializer, CreditTransactionSerializer, UserCreditSerializer,
+)
 
 User = get_user_model()
 
@@ -21,18 +32,61 @@ class UserAdminSerializer(AdminUserSerializer):
     # This nests the credit object inside the user response
     credit = UserCreditSerializer(read_only=True)
 
+    # Per-user aggregates annotated by UserAdminViewSet.get_queryset (absent after updates)
+    key_count = serializers.IntegerField(read_only=True, default=None)
+    calls_today = serializers.IntegerField(read_only=True, default=None)
+    last_call_at = serializers.DateTimeField(read_only=True, default=None)
+
     class Meta(AdminUserSerializer.Meta):
         # Add date_joined, last_login, is_active, AND credit
-        fields = AdminUserSerializer.Meta.fields + ('date_joined', 'last_login', 'credit')
+        fields = AdminUserSerializer.Meta.fields + (
+            'date_joined', 'last_login', 'credit', 'key_count', 'calls_today', 'last_call_at',
+        )
 
 class UserAdminViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserAdminSerializer
     permission_classes = [IsAdminUser] 
+    pagination_class = AdminUserCursorPagination
     
-    # --- ADDED SEARCH CONFIGURATION ---
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['name', 'email', 'organization'] # Fields to search against
+    # --- SEARCH (prefix matches on the UserSearchToken index, ranked) ---
+    filter_backends = [UserTokenSearchFilter]
+
+    def paginate_queryset(self, queryset):
+        # Search results are a short ranked list, not a keyset-ordered page
+        if UserTokenSearchFilter().get_search_query(self.request):
+            return None
+        return super().paginate_queryset(queryset)
+
+    def get_queryset(self):
+        """
+        Load credits with a join and compute the per-user aggregates as
+        correlated subqueries, so a page of users is a single query.
+        """
+        queryset = User.objects.select_related('credit')
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+
+        today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        key_count = (
+            APIKey.objects.filter(user=OuterRef('pk'))
+            .order_by().values('user')
+            .annotate(total=Count('id')).values('total')
+        )
+        calls_today = (
+            APICallLog.objects.filter(api_key__user=OuterRef('pk'), timestamp__gte=today_start)
+            .order_by().values('api_key__user')
+            .annotate(total=Count('id')).values('total')
+        )
+        last_call_at = (
+            APICallLog.objects.filter(api_key__user=OuterRef('pk'))
+            .order_by('-timestamp').values('timestamp')[:1]
+        )
+        return queryset.annotate(
+            key_count=Coalesce(Subquery(key_count, output_field=IntegerField()), Value(0)),
+            calls_today=Coalesce(Subquery(calls_today, output_field=IntegerField()), Value(0)),
+            last_call_at=Subquery(last_call_at),
+        )
 
     @action(detail=True, methods=['post'])
     def add_credits(self, request, pk=None):
@@ -47,21 +101,15 @@ class UserAdminViewSet(viewsets.ModelViewSet):
         if credits_to_add == 0:
             return Response({'error': 'Credit amount cannot be zero.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        credit, created = UserCredit.objects.get_or_create(user=user)
-        
-        # Handle both positive (add) and negative (remove) values
-        if credits_to_add > 0:
-            credit.purchased_credits += credits_to_add
-        else:
-            # Removing credits - ensure we don't go negative
-            credits_to_remove = abs(credits_to_add)
-            if credit.purchased_credits < credits_to_remove:
-                return Response({
-                    'error': f'Insufficient purchased credits. User has {credit.purchased_credits} purchased credits.'
-                }, status=status.HTTP_400_BAD_REQUEST)
-            credit.purchased_credits -= credits_to_remove
-        
-        credit.save()
+        # Handle both positive (add) and negative (remove) values through the ledger
+        try:
+            credit = adjust_purchased_credits(
+                user, credits_to_add, reason=request.data.get('reason', ''), created_by=request.user
+            )
+        except InsufficientCredits as e:
+            return Response({
+                'error': f'Insufficient purchased credits. User has {e.available} purchased credits.'
+            }, status=status.HTTP_400_BAD_REQUEST)
 
         action_type = 'added' if credits_to_add > 0 else 'removed'
         return Response({
@@ -70,6 +118,67 @@ class UserAdminViewSet(viewsets.ModelViewSet):
             'purchased_credits': credit.purchased_credits
         })
 
+    @action(detail=False, methods=['post'])
+    def bulk_add_credits(self, request):
+        """
+        Apply credit adjustments to many users in one transaction (Admin only).
+        Body: {"adjustments": [{"user": 1, "credits": 500}, ...], "reason": "..."}
+        All adjustments are applied, or none if any would leave a balance negative.
+        """
+        serializer = BulkCreditAdjustmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        adjustments = {}
+        for item in serializer.validated_data['adjustments']:
+            adjustments[item['user']] = adjustments.get(item['user'], 0) + item['credits']
+
+        missing = set(adjustments) - set(User.objects.filter(pk__in=adjustments).values_list('pk', flat=True))
+        if missing:
+            return Response({'error': 'Unknown users.', 'users': sorted(missing)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            applied = bulk_adjust_purchased_credits(
+                adjustments, reason=serializer.validated_data['reason'], created_by=request.user
+            )
+        except InsufficientCredits as e:
+            return Response({
+                'error': f'Insufficient purchased credits for user {e.user_id}. '
+                         f'User has {e.available} purchased credits. No adjustments were applied.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'status': 'credits applied',
+            'users': applied,
+            'total_credits': sum(adjustments.values()),
+        })
+
+    @action(detail=True, methods=['get'])
+    def in_flight(self, request, pk=None):
+        """
+        Requests currently in flight for each of a user's API keys (Admin only).
+        """
+        user = self.get_object()
+        keys = list(APIKey.objects.filter(user=user).values('id', 'name', 'max_in_flight'))
+        counts = concurrency_limiter.in_flight([key['id'] for key in keys])
+        return Response([{**key, 'in_flight': counts[key['id']]} for key in keys])
+
+    @action(detail=True, methods=['get'])
+    def credit_history(self, request, pk=None):
+        """
+        Latest credit ledger entries for a specific user (Admin only), with the ledger balance.
+        """
+        user = self.get_object()
+        transactions = (
+            CreditTransaction.objects
+            .filter(user=user)
+            .select_related('created_by')
+            .order_by('-id')[:100]
+        )
+        return Response({
+            'ledger_balance': ledger_balance(user.pk),
+            'transactions': CreditTransactionSerializer(transactions, many=True).data,
+        })
+
     @action(detail=True, methods=['post'])
     def toggle_active(self, request, pk=None):
         user = self.get_object()
@@ -96,33 +205,41 @@ class UserAdminViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def logs(self, request, pk=None):
         """
-        Fetch API logs for a specific user (Admin only).
-        Supports ?time_range=1h/24h/7d/30d/all query param.
+        Fetch API logs for a specific user (Admin only), newest first.
+        Keyset paginated via ?cursor= and ?page_size=. Supports ?time_range=1h/24h/7d/30d/all
+        (default 7d) plus ?api_key, ?status_code/?status, ?endpoint, ?since and ?until.
+        """
+        user = self.get_object()
+        logs = filter_call_logs(
+            APICallLog.objects.filter(api_key__user=user), request.query_params, default_time_range='7d'
+        )
+        paginator = CallLogKeysetPagination()
+        page = paginator.paginate_queryset(logs, request, view=self)
+        serializer = APICallLogSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'], url_path='logs/export')
+    def export_logs(self, request, pk=None):
+        """Stream a user's filtered logs as CSV (default) or NDJSON via ?export_format=ndjson (Admin only)"""
+        user = self.get_object()
+        logs = filter_call_logs(
+            APICallLog.objects.filter(api_key__user=user), request.query_params, default_time_range='7d'
+        )
+        return stream_call_logs(logs, request.query_params.get('export_format', 'csv'), filename=f'api-logs-user-{user.pk}')
+
+    @action(detail=True, methods=['get'])
+    def usage(self, request, pk=None):
+        """
+        Usage analytics for a specific user from the pre-aggregated rollups (Admin only).
+        Supports ?time_range=1h/24h/7d/30d/all, ?granularity=hour/day and ?api_key=<id>.
         """
         user = self.get_object()
-        
-        # Time Filtering Logic
-        time_range = request.query_params.get('time_range', '7d')
-        
-        logs_query = APICallLog.objects.filter(api_key__user=user)
-
-        if time_range != 'all':
-            start_date = timezone.now()
-            if time_range == '1h':
-                start_date -= timedelta(hours=1)
-            elif time_range == '24h':
-                start_date -= timedelta(hours=24)
-            elif time_range == '30d':
-                start_date -= timedelta(days=30)
-            else: # Default 7d
-                start_date -= timedelta(days=7)
-            
-            logs_query = logs_query.filter(timestamp__gte=start_date)
-
-        # Query logs for THIS user's keys
-        # Limit to 100 items to avoid overloading the frontend list since we removed pagination
-        logs = logs_query.order_by('-timestamp')[:100]
-
-        # Return flat list to match frontend expectation (array vs pagination object)
-        serializer = APICallLogSerializer(logs, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        rollups = APIUsageRollup.objects.filter(api_key__user=user)
+        api_key_id = request.query_params.get('api_key')
+        if api_key_id:
+            rollups = rollups.filter(api_key_id=parse_int_param('api_key', api_key_id))
+        return Response(usage_summary(
+            rollups,
+            time_range=request.query_params.get('time_range', '7d'),
+            granularity=request.query_params.get('granularity'),
+        ))
@@ -0,0 +1,129 @@
+import gzip
+import json
+import os
+from datetime import datetime, time, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import APICallLog, UsageRollupCheckpoint
+from .rollups import CHECKPOINT_NAME
+
+ARCHIVE_FIELDS = ('id', 'api_key_id', 'api_key__user_id', 'endpoint', 'method', 'ip_address', 'status_code', 'timestamp')
+
+
+def segment_path(day, root=None):
+    """Archive segment for one UTC day: <root>/YYYY/MM/YYYY-MM-DD.jsonl.gz"""
+    root = Path(root or settings.CALL_LOG_ARCHIVE_ROOT)
+    return root / f"{day:%Y}" / f"{day:%m}" / f"{day:%Y-%m-%d}.jsonl.gz"
+
+
+def archive_call_logs(older_than_days=None, chunk_size=5000, root=None):
+    """
+    Move APICallLog rows older than `older_than_days` into gzip JSONL day segments,
+    then delete them from the live table one chunk at a time.
+
+    Only rows already folded into the usage rollups are archived, so the
+    rollups stay complete. Each chunk is appended as a new gzip member and
+    fsynced before the rows are deleted; a crash in between can at worst
+    duplicate a chunk in the archive, which the reader de-duplicates by id.
+    Returns the number of rows archived.
+    """
+    if older_than_days is None:
+        older_than_days = settings.CALL_LOG_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+
+    checkpoint = UsageRollupCheckpoint.objects.filter(name=CHECKPOINT_NAME).first()
+    rolled_up_to = checkpoint.last_log_id if checkpoint else 0
+
+    queryset = (
+        APICallLog.objects
+        .filter(timestamp__lt=cutoff, id__lte=rolled_up_to)
+        .order_by('id')
+        .values(*ARCHIVE_FIELDS)
+    )
+
+    archived = 0
+    while True:
+        rows = list(queryset[:chunk_size])
+        if not rows:
+            break
+
+        by_day = {}
+        for row in rows:
+            by_day.setdefault(row['timestamp'].date(), []).append(row)
+        for day, day_rows in by_day.items():
+            _append_segment(segment_path(day, root), day_rows)
+
+        with transaction.atomic():
+            APICallLog.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        archived += len(rows)
+
+    return archived
+
+
+def _append_segment(path, rows):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'ab') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as segment:
+            for row in rows:
+                segment.write(json.dumps(_serialize_row(row), separators=(',', ':')).encode() + b'\n')
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def _serialize_row(row):
+    return {
+        'id': row['id'],
+        'api_key_id': row['api_key_id'],
+        'user_id': row['api_key__user_id'],
+        'endpoint': row['endpoint'],
+        'method': row['method'],
+        'ip_address': row['ip_address'],
+        'status_code': row['status_code'],
+        'timestamp': row['timestamp'].isoformat(),
+    }
+
+
+def iter_archived_logs(start, end, api_key_id=None, user_id=None, root=None):
+    """
+    Stream archived call logs with start <= timestamp < end, in archive order.
+    Reads one day segment at a time, so memory stays flat for long ranges.
+    """
+    if timezone.is_naive(start):
+        start = timezone.make_aware(start)
+    if timezone.is_naive(end):
+        end = timezone.make_aware(end)
+
+    day = start.date()
+    while day <= end.date():
+        path = segment_path(day, root)
+        day += timedelta(days=1)
+        if not path.exists():
+            continue
+
+        seen_ids = set()
+        with gzip.open(path, 'rt') as segment:
+            for line in segment:
+                record = json.loads(line)
+                if record['id'] in seen_ids:
+                    continue
+                seen_ids.add(record['id'])
+
+                timestamp = parse_datetime(record['timestamp'])
+                if not (start <= timestamp < end):
+                    continue
+                if api_key_id is not None and record['api_key_id'] != api_key_id:
+                    continue
+                if user_id is not None and record['user_id'] != user_id:
+                    continue
+                yield record
+
+
+def day_bounds(day):
+    """Aware [start, end) datetimes covering a calendar day."""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
@@ -0,0 +1,176 @@
+import time
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+from .locks import acquire_lock, release_lock
+
+POLL_INTERVAL = 0.02
+
+# Each slot is a lease that expires this many seconds after it was taken or
+# last refreshed, so a slot leaked by a killed worker frees itself however
+# busy the key stays. Requests finish well within it; streams refresh theirs.
+LEASE_SECONDS = 60
+# Upper bound on how long the non-Redis lease table may stay locked
+LOCK_TIMEOUT = 1
+
+# key is None for an unlimited acquire, which holds nothing
+Lease = namedtuple('Lease', ['key', 'token'])
+
+# Leases are members of a sorted set scored by their expiry (Redis clock)
+_NOW = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+"""
+ACQUIRE_SCRIPT = _NOW + """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[3])
+redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[2])) + 1)
+return 1
+"""
+REFRESH_SCRIPT = _NOW + """
+if redis.call('ZADD', KEYS[1], 'XX', 'CH', now + tonumber(ARGV[1]), ARGV[2]) == 1 then
+    redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[1])) + 1)
+end
+return 1
+"""
+COUNT_SCRIPT = _NOW + """
+return redis.call('ZCOUNT', KEYS[1], '(' .. now, '+inf')
+"""
+
+
+class KeyConcurrencyLimiter:
+    """
+    Counting semaphore per API key, shared by all worker processes through
+    the Django cache. Every slot is its own expiring lease: a sorted set
+    handled by Lua scripts on Redis, a {token: expiry} entry updated under a
+    short cache lock on other backends.
+    """
+
+    def __init__(self, cache_alias='default', prefix='inflight'):
+        self.cache_alias = cache_alias
+        self.prefix = prefix
+        self.scripts = {}
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def _key(self, api_key_id):
+        return f"{self.prefix}:{api_key_id}"
+
+    def acquire(self, api_key_id, limit, wait=None):
+        """
+        Take a slot for the key, waiting up to `wait` seconds for one to free up.
+        Returns the Lease to release, or None if no slot was free. A limit of
+        0 means unlimited.
+        """
+        if not limit:
+            return Lease(None, None)
+        if wait is None:
+            wait = settings.MAX_IN_FLIGHT_QUEUE_SECONDS
+
+        lease = Lease(self._key(api_key_id), uuid.uuid4().hex)
+        deadline = time.monotonic() + wait
+        while True:
+            if self._take(lease, limit):
+                return lease
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(POLL_INTERVAL)
+
+    def refresh(self, lease):
+        """Keep a slot held longer than LEASE_SECONDS (a stream) from expiring."""
+        if lease.key is None:
+            return
+        if self._redis():
+            self._run('refresh', REFRESH_SCRIPT, lease.key, [LEASE_SECONDS, lease.token])
+            return
+        with self._table(lease.key) as leases:
+            if lease.token in leases:
+                leases[lease.token] = time.time() + LEASE_SECONDS
+
+    def release(self, lease):
+        if lease.key is None:
+            return
+        if self._redis():
+            key = self.cache.make_and_validate_key(lease.key)
+            self.cache._cache.get_client(key, write=True).zrem(key, lease.token)
+            return
+        with self._table(lease.key) as leases:
+            leases.pop(lease.token, None)
+
+    def in_flight(self, api_key_ids):
+        """Current in-flight request counts, {api_key_id: count}."""
+        if self._redis():
+            return {
+                api_key_id: self._run('count', COUNT_SCRIPT, self._key(api_key_id), [])
+                for api_key_id in api_key_ids
+            }
+        keys = {self._key(api_key_id): api_key_id for api_key_id in api_key_ids}
+        tables = self.cache.get_many(list(keys))
+        now = time.time()
+        return {
+            api_key_id: sum(1 for expires in tables.get(key, {}).values() if expires > now)
+            for key, api_key_id in keys.items()
+        }
+
+    def _take(self, lease, limit):
+        if self._redis():
+            return bool(self._run('acquire', ACQUIRE_SCRIPT, lease.key, [limit, LEASE_SECONDS, lease.token]))
+        with self._table(lease.key) as leases:
+            if len(leases) >= limit:
+                return False
+            leases[lease.token] = time.time() + LEASE_SECONDS
+            return True
+
+    def _redis(self):
+        return isinstance(self.cache, RedisCache)
+
+    def _run(self, name, source, key, args):
+        key = self.cache.make_and_validate_key(key)
+        client = self.cache._cache.get_client(key, write=True)
+        if name not in self.scripts:
+            self.scripts[name] = client.register_script(source)
+        return self.scripts[name](keys=[key], args=args, client=client)
+
+    def _table(self, key):
+        return _LeaseTable(self.cache, key)
+
+
+class _LeaseTable:
+    """{token: expiry} of one key, without expired leases, saved on exit (non-Redis backends)."""
+
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.key = key
+
+    def __enter__(self):
+        # Waits out a holder that died: the lock expires after LOCK_TIMEOUT
+        self.token = acquire_lock(self.cache, f"{self.key}:lock", LOCK_TIMEOUT, wait=2 * LOCK_TIMEOUT)
+        now = time.time()
+        self.leases = {
+            token: expires for token, expires in (self.cache.get(self.key) or {}).items() if expires > now
+        }
+        return self.leases
+
+    def __exit__(self, *exc_info):
+        try:
+            if self.leases:
+                self.cache.set(self.key, self.leases, timeout=LEASE_SECONDS + 1)
+            else:
+                self.cache.delete(self.key)
+        finally:
+            if self.token:
+                release_lock(self.cache, f"{self.key}:lock", self.token)
+
+
+concurrency_limiter = KeyConcurrencyLimiter()
+# Open SSE streams per key (APIKey.max_in_flight only covers the connecting call)
+stream_limiter = KeyConcurrencyLimiter(prefix='streams')
@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from monitoring.metrics import cache_requests
+
+from .models import APICallLog, APIKey, UserCredit
+from .serializers import APICallLogSerializer, APIKeySerializer, UserCreditSerializer
+
+RECENT_ACTIVITY_LIMIT = 50
+
+
+def summary_cache_key(user_id):
+    return f"dashboard-summary:{user_id}"
+
+
+def invalidate_summary(*user_ids):
+    cache.delete_many([summary_cache_key(user_id) for user_id in user_ids])
+
+
+def get_dashboard_summary(user):
+    """
+    Cached dashboard summary for a user; rebuilt at most every DASHBOARD_SUMMARY_TTL seconds
+    or after a key change or credit purchase invalidates it.
+    """
+    key = summary_cache_key(user.pk)
+    data = cache.get(key)
+    cache_requests.labels('dashboard_summary', 'miss' if data is None else 'hit').inc()
+    if data is None:
+        data = build_dashboard_summary(user)
+        cache.set(key, data, settings.DASHBOARD_SUMMARY_TTL)
+    return data
+
+
+def build_dashboard_summary(user):
+    """
+    Credits, keys with today's usage, 24h stats and recent activity.
+    Always exactly four read-only queries, however many keys or logs the user has.
+    """
+    now = timezone.now()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    # 1. Credits (an unsaved default row for users who never had one, nothing is written)
+    credit = UserCredit.objects.filter(user=user).first() or UserCredit(user=user)
+
+    # 2. Keys with today's call count
+    keys = (
+        APIKey.objects
+        .filter(user=user)
+        .annotate(calls_today=Count('call_logs', filter=Q(call_logs__timestamp__gte=today_start)))
+        .order_by('-created_at')
+    )
+    key_data = []
+    for key in keys:
+        item = APIKeySerializer(key).data
+        item['calls_today'] = key.calls_today
+        key_data.append(item)
+
+    user_logs = APICallLog.objects.filter(api_key__user=user)
+
+    # 3. Last 24h totals
+    last_24h = user_logs.filter(timestamp__gte=now - timedelta(hours=24)).aggregate(
+        total=Count('id'),
+        success=Count('id', filter=Q(status_code__gte=200, status_code__lt=300)),
+    )
+
+    # 4. Recent activity
+    recent = user_logs.order_by('-timestamp', '-id')[:RECENT_ACTIVITY_LIMIT]
+
+    return {
+        'credit': UserCreditSerializer(credit).data,
+        'keys': key_data,
+        'usage_24h': last_24h,
+        'recent_activity': APICallLogSerializer(recent, many=True).data,
+        'generated_at': now,
+    }
@@ -0,0 +1,110 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from monitoring.metrics import cache_requests
+
+from .locks import acquire_lock, release_lock
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# Outcomes of IdempotencyStore.begin()
+STARTED = 'started'
+REPLAY = 'replay'
+MISMATCH = 'mismatch'
+IN_PROGRESS = 'in_progress'
+
+POLL_INTERVAL = 0.05
+
+
+def request_fingerprint(request):
+    """What an Idempotency-Key is bound to: the method and full path (including the query string)."""
+    return f"{request.method} {request.get_full_path()}"
+
+
+class IdempotencyStore:
+    """
+    Stores the response of a request made with an Idempotency-Key so a retry
+    with the same key (from the same API key) is answered from storage.
+
+    Records live in the Django cache with a TTL (IDEMPOTENCY_TTL); the cache
+    backend's eviction (Redis allkeys-lru / LocMemCache MAX_ENTRIES) keeps
+    the total bounded. While the first request runs, a short-lived lock
+    entry makes concurrent duplicates wait briefly (IDEMPOTENCY_WAIT_SECONDS)
+    for its result, then answer 409, instead of executing a second time.
+    The lock holds a token, so a request that outlived
+    IDEMPOTENCY_LOCK_TIMEOUT cannot release a lock another request now owns.
+    """
+
+    def __init__(self, cache_alias='default', prefix='idempotency'):
+        self.cache_alias = cache_alias
+        self.prefix = prefix
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def _keys(self, api_key_id, idempotency_key):
+        digest = hashlib.sha256(idempotency_key.encode()).hexdigest()
+        base = f"{self.prefix}:{api_key_id}:{digest}"
+        return f"{base}:response", f"{base}:lock"
+
+    def begin(self, api_key_id, idempotency_key, fingerprint):
+        """
+        Returns (outcome, stored_response). On STARTED the caller owns the key,
+        the second item is its lock token, and it must call complete() or
+        release() with that token when done.
+        """
+        record_key, lock_key = self._keys(api_key_id, idempotency_key)
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+
+        while True:
+            stored = self.cache.get(record_key)
+            if stored is not None:
+                cache_requests.labels('idempotency', 'hit').inc()
+                return (REPLAY if stored['fingerprint'] == fingerprint else MISMATCH), stored
+
+            token = acquire_lock(self.cache, lock_key, settings.IDEMPOTENCY_LOCK_TIMEOUT)
+            if token:
+                # The previous owner may have finished between our two lookups
+                stored = self.cache.get(record_key)
+                if stored is not None:
+                    release_lock(self.cache, lock_key, token)
+                    cache_requests.labels('idempotency', 'hit').inc()
+                    return (REPLAY if stored['fingerprint'] == fingerprint else MISMATCH), stored
+                cache_requests.labels('idempotency', 'miss').inc()
+                return STARTED, token
+
+            if time.monotonic() >= deadline:
+                return IN_PROGRESS, None
+            time.sleep(POLL_INTERVAL)
+
+    def complete(self, api_key_id, idempotency_key, fingerprint, response, token):
+        """Store a finished response for replay (when it is small enough) and release the key."""
+        record_key, lock_key = self._keys(api_key_id, idempotency_key)
+        if not response.streaming and len(response.content) <= settings.IDEMPOTENCY_MAX_RESPONSE_BYTES:
+            self.cache.set(record_key, {
+                'fingerprint': fingerprint,
+                'status': response.status_code,
+                'content': response.content,
+                'content_type': response.get('Content-Type'),
+            }, timeout=settings.IDEMPOTENCY_TTL)
+        release_lock(self.cache, lock_key, token)
+
+    def release(self, api_key_id, idempotency_key, token):
+        """Give the key up without storing anything, so a retry executes normally."""
+        _, lock_key = self._keys(api_key_id, idempotency_key)
+        release_lock(self.cache, lock_key, token)
+
+
+def replay_response(stored):
+    response = HttpResponse(stored['content'], status=stored['status'], content_type=stored['content_type'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+idempotency_store = IdempotencyStore()
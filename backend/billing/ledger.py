@@ -0,0 +1,173 @@
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+
+from .dashboard import invalidate_summary
+from .models import CreditBalanceSnapshot, CreditTransaction, UserCredit
+
+# Snapshot a user's balance once this many transactions have piled up after
+# the previous snapshot, which keeps ledger_balance() a bounded tail sum.
+SNAPSHOT_EVERY = 500
+
+
+class InsufficientCredits(Exception):
+    def __init__(self, user_id, available, requested):
+        self.user_id = user_id
+        self.available = available
+        self.requested = requested
+        super().__init__(
+            f"User {user_id} has {available} purchased credits, cannot remove {requested}."
+        )
+
+
+def adjust_purchased_credits(user, amount, reason='', created_by=None):
+    """
+    Add (amount > 0) or remove (amount < 0) purchased credits for one user.
+    Locks the user's credit row, so it cannot race with deduct_credits().
+    Returns the updated UserCredit.
+    """
+    with transaction.atomic():
+        UserCredit.objects.get_or_create(user=user)
+        credit = UserCredit.objects.select_for_update().get(user=user)
+
+        if credit.purchased_credits + amount < 0:
+            raise InsufficientCredits(user.pk, credit.purchased_credits, -amount)
+
+        credit.purchased_credits += amount
+        credit.save(update_fields=['purchased_credits'])
+        CreditTransaction.objects.create(
+            user=user,
+            amount=amount,
+            kind=CreditTransaction.TOP_UP if amount > 0 else CreditTransaction.REMOVAL,
+            reason=reason,
+            created_by=created_by,
+        )
+    invalidate_summary(user.pk)
+    return credit
+
+
+def bulk_adjust_purchased_credits(adjustments, reason='', created_by=None):
+    """
+    Apply many adjustments in a single transaction.
+    `adjustments` maps user id -> signed credit amount. Either every adjustment
+    is applied or, if any would leave a balance negative, none is.
+    Returns the number of users adjusted.
+    """
+    adjustments = {user_id: amount for user_id, amount in adjustments.items() if amount}
+    if not adjustments:
+        return 0
+
+    with transaction.atomic():
+        existing = set(
+            UserCredit.objects.filter(user_id__in=adjustments).values_list('user_id', flat=True)
+        )
+        UserCredit.objects.bulk_create(
+            [UserCredit(user_id=user_id) for user_id in adjustments if user_id not in existing],
+            ignore_conflicts=True,
+        )
+
+        # Lock in a stable order so concurrent bulk runs cannot deadlock
+        credits = list(
+            UserCredit.objects
+            .select_for_update()
+            .filter(user_id__in=adjustments)
+            .order_by('pk')
+        )
+
+        for credit in credits:
+            amount = adjustments[credit.user_id]
+            if credit.purchased_credits + amount < 0:
+                raise InsufficientCredits(credit.user_id, credit.purchased_credits, -amount)
+            credit.purchased_credits += amount
+
+        UserCredit.objects.bulk_update(credits, ['purchased_credits'], batch_size=1000)
+        CreditTransaction.objects.bulk_create(
+            [
+                CreditTransaction(
+                    user_id=user_id,
+                    amount=amount,
+                    kind=CreditTransaction.TOP_UP if amount > 0 else CreditTransaction.REMOVAL,
+                    reason=reason,
+                    created_by=created_by,
+                )
+                for user_id, amount in adjustments.items()
+            ],
+            batch_size=1000,
+        )
+
+    # Usage saves do not drop the cached summaries (see billing.signals); purchases do
+    invalidate_summary(*adjustments)
+    return len(credits)
+
+
+def _latest_snapshot(user_id):
+    """(balance, last_transaction_id) of the newest snapshot, or (0, 0)."""
+    snapshot = (
+        CreditBalanceSnapshot.objects
+        .filter(user_id=user_id)
+        .order_by('-last_transaction_id')
+        .first()
+    )
+    if snapshot is None:
+        return 0, 0
+    return snapshot.balance, snapshot.last_transaction_id
+
+
+def ledger_balance(user_id):
+    """
+    Purchased-credit balance computed from the ledger: latest snapshot plus the tail after it.
+    """
+    base, after_id = _latest_snapshot(user_id)
+    tail = (
+        CreditTransaction.objects
+        .filter(user_id=user_id, id__gt=after_id)
+        .aggregate(total=Sum('amount'))
+    )
+    return base + (tail['total'] or 0)
+
+
+def snapshot_balances(min_tail=SNAPSHOT_EVERY):
+    """
+    Snapshot every user whose ledger tail has at least `min_tail` transactions.
+    Returns the number of snapshots written.
+    """
+    written = 0
+    for user_id in CreditTransaction.objects.values_list('user_id', flat=True).distinct():
+        if _tail(user_id)['count'] < max(min_tail, 1):
+            continue
+
+        with transaction.atomic():
+            # Every ledger write holds this row lock until it commits, so no
+            # transaction with a lower id than the tail's last one is still
+            # uncommitted (and would be skipped by every later tail sum)
+            UserCredit.objects.select_for_update().filter(user_id=user_id).first()
+            base, tail = _tail(user_id, with_base=True)
+            if tail['count'] < max(min_tail, 1):
+                continue
+            CreditBalanceSnapshot.objects.create(
+                user_id=user_id,
+                balance=base + tail['total'],
+                last_transaction_id=tail['last_id'],
+            )
+        written += 1
+    return written
+
+
+def _tail(user_id, with_base=False):
+    base, after_id = _latest_snapshot(user_id)
+    tail = (
+        CreditTransaction.objects
+        .filter(user_id=user_id, id__gt=after_id)
+        .aggregate(total=Sum('amount'), count=Count('id'), last_id=Max('id'))
+    )
+    return (base, tail) if with_base else tail
+
+
+def ledger_drift():
+    """
+    Yield (user_id, materialized, ledger) for users whose UserCredit.purchased_credits
+    disagrees with the ledger. Used by the reconcile check.
+    """
+    for user_id, materialized in UserCredit.objects.values_list('user_id', 'purchased_credits').iterator():
+        balance = ledger_balance(user_id)
+        if balance != materialized:
+            yield user_id, materialized, balance
@@ -0,0 +1,29 @@
+"""
+Short-lived locks in the Django cache, owned by a random token so only the
+holder can release them (a holder that overran the timeout must not free a
+lock that has since passed to someone else).
+"""
+import time
+import uuid
+
+RETRY_DELAY = 0.002
+
+
+def acquire_lock(cache, key, timeout, wait=0):
+    """
+    Take the lock at `key` for `timeout` seconds, retrying for up to `wait`
+    seconds. Returns the owner token, or None if it stayed taken.
+    """
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + wait
+    while not cache.add(key, token, timeout=timeout):
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(RETRY_DELAY)
+    return token
+
+
+def release_lock(cache, key, token):
+    """Delete the lock if `token` still owns it."""
+    if cache.get(key) == token:
+        cache.delete(key)
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from billing.archive import archive_call_logs
+
+
+class Command(BaseCommand):
+    help = "Move old APICallLog rows into compressed day segments and delete them from the live table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int, default=settings.CALL_LOG_RETENTION_DAYS,
+            help="Archive rows older than this many days (default: CALL_LOG_RETENTION_DAYS).",
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        archived = archive_call_logs(
+            older_than_days=options['older_than_days'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(f"Archived {archived} call log(s) to {settings.CALL_LOG_ARCHIVE_ROOT}.")
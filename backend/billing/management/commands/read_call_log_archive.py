@@ -0,0 +1,33 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date, parse_datetime
+
+from billing.archive import day_bounds, iter_archived_logs
+
+
+class Command(BaseCommand):
+    help = "Stream archived call logs for a time range as JSON lines (for audits and disputes)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', required=True, help="YYYY-MM-DD or ISO datetime (inclusive)")
+        parser.add_argument('--end', required=True, help="YYYY-MM-DD (inclusive day) or ISO datetime (exclusive)")
+        parser.add_argument('--api-key', type=int, help="Only rows for this APIKey id")
+        parser.add_argument('--user', type=int, help="Only rows for this user id")
+
+    def handle(self, *args, **options):
+        start = self._parse(options['start'], end=False)
+        end = self._parse(options['end'], end=True)
+
+        for record in iter_archived_logs(start, end, api_key_id=options['api_key'], user_id=options['user']):
+            self.stdout.write(json.dumps(record))
+
+    def _parse(self, value, end):
+        moment = parse_datetime(value)
+        if moment is not None:
+            return moment
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"Invalid date: {value}")
+        day_start, day_end = day_bounds(day)
+        return day_end if end else day_start
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from billing.rollups import rollup_new_logs
+
+
+class Command(BaseCommand):
+    help = "Fold new APICallLog rows into the hourly/daily usage rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help="Keep running and roll up every N seconds (0 = run once).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = rollup_new_logs(batch_size=options['batch_size'])
+            self.stdout.write(f"Rolled up {processed} call log(s).")
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
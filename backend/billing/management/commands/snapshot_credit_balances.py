@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from billing.ledger import SNAPSHOT_EVERY, ledger_drift, snapshot_balances
+
+
+class Command(BaseCommand):
+    help = "Snapshot credit ledger balances so balance lookups only sum a short tail."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-tail', type=int, default=SNAPSHOT_EVERY,
+            help="Only snapshot users with at least this many transactions since their last snapshot.",
+        )
+        parser.add_argument(
+            '--reconcile', action='store_true',
+            help="Also report users whose materialized balance disagrees with the ledger.",
+        )
+
+    def handle(self, *args, **options):
+        written = snapshot_balances(min_tail=options['min_tail'])
+        self.stdout.write(f"Wrote {written} balance snapshot(s).")
+
+        if options['reconcile']:
+            drifted = 0
+            for user_id, materialized, balance in ledger_drift():
+                drifted += 1
+                self.stdout.write(self.style.WARNING(
+                    f"User {user_id}: purchased_credits={materialized}, ledger={balance}"
+                ))
+            self.stdout.write(f"{drifted} user(s) out of sync with the ledger.")
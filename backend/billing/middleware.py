@@ -1,7 +1,25 @@
+import logging
+import math
+
 from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
 from django.utils import timezone
+from monitoring.metrics import api_rejections, call_log_write_failures, credit_refund_failures
+from monitoring.timing import phase
+from . import idempotency
+from .concurrency import concurrency_limiter
+from .idempotency import idempotency_store
 from .models import APIKey, APICallLog
+from .ratelimit import rate_limiter
+
+logger = logging.getLogger('billing.middleware')
+
+
+def reject(reason, response):
+    """Count a rejected partner API request (by reason) and pass the response through."""
+    api_rejections.labels(reason, str(response.status_code)).inc()
+    return response
+
 
 class APICreditMiddleware(MiddlewareMixin):
     def process_view(self, request, view_func, view_args, view_kwargs):
@@ -13,14 +31,80 @@ class APICreditMiddleware(MiddlewareMixin):
         # 2. VALIDATION: Check for API Key Header
         key_value = request.headers.get('X-API-KEY')
         if not key_value:
-            return JsonResponse({'error': 'Missing X-API-KEY header'}, status=401)
+            return reject('missing_key', JsonResponse({'error': 'Missing X-API-KEY header'}, status=401))
 
         # 3. AUTH: Verify Key Exists and is Active
         try:
             # select_related optimizes the DB query since we need the user and their credit next
-            api_key = APIKey.objects.select_related('user__credit').get(key=key_value, is_active=True)
+            with phase('key_lookup'):
+                api_key = APIKey.objects.select_related('user__credit').get(key=key_value, is_active=True)
         except APIKey.DoesNotExist:
-            return JsonResponse({'error': 'Invalid or inactive API Key'}, status=403)
+            return reject('invalid_key', JsonResponse({'error': 'Invalid or inactive API Key'}, status=403))
+
+        # ------------------------------------------------------------------
+        # 3a. BURST LIMIT (Token bucket, shared by all workers via the cache)
+        # ------------------------------------------------------------------
+        # Checked before any usage counting or credit work so a burst is
+        # rejected as cheaply as possible
+        with phase('rate_limit'):
+            allowed, retry_after = rate_limiter.consume(
+                api_key.pk, api_key.rate_limit_per_second, api_key.burst_size
+            )
+        if not allowed:
+            response = JsonResponse({
+                'error': f'Rate limit of {api_key.rate_limit_per_second:g} requests/second '
+                         f'(burst {api_key.burst_size}) exceeded for this API Key.'
+            }, status=429)
+            response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+            return reject('rate_limit', response)
+
+        # ------------------------------------------------------------------
+        # 3b. CONCURRENCY CAP (Max in-flight requests per key, across workers)
+        # ------------------------------------------------------------------
+        # Waits briefly for a free slot, then rejects. The slot is released in
+        # process_response, which also runs for rejections below and for errors.
+        with phase('concurrency'):
+            lease = concurrency_limiter.acquire(api_key.pk, api_key.max_in_flight)
+        if lease is None:
+            response = JsonResponse({
+                'error': f'Too many concurrent requests: at most {api_key.max_in_flight} '
+                         f'may be in flight for this API Key.'
+            }, status=429)
+            response['Retry-After'] = '1'
+            return reject('concurrency', response)
+        request.concurrency_slot = lease
+
+        # ------------------------------------------------------------------
+        # 3c. IDEMPOTENCY (Retries replay the stored response, unbilled)
+        # ------------------------------------------------------------------
+        # After the burst limit and concurrency cap, so a storm of retries
+        # waiting on the same key cannot tie up more workers than those allow
+        idempotency_key = request.headers.get(idempotency.IDEMPOTENCY_HEADER)
+        if idempotency_key:
+            if len(idempotency_key) > idempotency.MAX_KEY_LENGTH:
+                return reject('idempotency_key_too_long', JsonResponse({
+                    'error': 'Idempotency-Key is too long.'
+                }, status=400))
+
+            fingerprint = idempotency.request_fingerprint(request)
+            with phase('idempotency'):
+                outcome, stored = idempotency_store.begin(api_key.pk, idempotency_key, fingerprint)
+            if outcome == idempotency.REPLAY:
+                return idempotency.replay_response(stored)
+            if outcome == idempotency.MISMATCH:
+                return reject('idempotency_mismatch', JsonResponse({
+                    'error': 'Idempotency-Key was already used for a different request.'
+                }, status=422))
+            if outcome == idempotency.IN_PROGRESS:
+                response = JsonResponse({
+                    'error': 'A request with this Idempotency-Key is still in progress.'
+                }, status=409)
+                response['Retry-After'] = '1'
+                return reject('idempotency_in_progress', response)
+
+            # We own the key now (begin() returned our lock token as `stored`);
+            # process_response stores the result or releases it
+            request.idempotency = (api_key.pk, idempotency_key, fingerprint, stored)
 
         # ------------------------------------------------------------------
         # 4. ENFORCE DAILY LIMIT (The "Speed Limit")
@@ -29,16 +113,19 @@ class APICreditMiddleware(MiddlewareMixin):
         today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
 
         # Count how many logs exist for THIS key since midnight
-        daily_usage_count = APICallLog.objects.filter(
-            api_key=api_key,
-            timestamp__gte=today_start
-        ).count()
+        # (server errors are not billed, so they do not count either)
+        with phase('usage_count'):
+            daily_usage_count = APICallLog.objects.filter(
+                api_key=api_key,
+                status_code__lt=500,
+                timestamp__gte=today_start
+            ).count()
 
         # Check if usage exceeds the key's specific daily_limit
         if daily_usage_count >= api_key.daily_limit:
-            return JsonResponse({
+            return reject('daily_limit', JsonResponse({
                 'error': f'Daily limit of {api_key.daily_limit} requests reached for this API Key.'
-            }, status=429)  # 429 Too Many Requests
+            }, status=429))  # 429 Too Many Requests
 
         # ------------------------------------------------------------------
         # 5. DEDUCT CREDIT (The "Payment")
@@ -46,15 +133,21 @@ class APICreditMiddleware(MiddlewareMixin):
         try:
             credit_system = api_key.user.credit
         except AttributeError:
-             return JsonResponse({'error': 'User has no credit account configured.'}, status=500)
+             return reject('no_credit_account', JsonResponse({
+                 'error': 'User has no credit account configured.'
+             }, status=500))
 
         # Attempt to deduct 1 credit
-        success = credit_system.deduct_credits(cost=1)
+        with phase('credit_deduct'):
+            success = credit_system.deduct_credits(cost=1)
         
         if not success:
-            return JsonResponse({
+            return reject('insufficient_credits', JsonResponse({
                 'error': 'Insufficient credits. Daily free limit used and no purchased credits remaining.'
-            }, status=402) # 402 Payment Required
+            }, status=402)) # 402 Payment Required
+
+        # Kept so process_response can refund the credit if the call fails
+        request.credit_deduction = credit_system
 
         # 6. ATTACH: Attach key/user to request for the View and Logging
         request.api_key_instance = api_key
@@ -63,6 +156,34 @@ class APICreditMiddleware(MiddlewareMixin):
         return None
 
     def process_response(self, request, response):
+        # Free the concurrency slot taken in process_view (exactly once)
+        slot = request.__dict__.pop('concurrency_slot', None)
+        if slot is not None:
+            concurrency_limiter.release(slot)
+
+        # Store the result for Idempotency-Key retries. Only responses that went
+        # through the view (and were billed) are kept; early rejections and
+        # server errors release the key so a retry runs again.
+        if hasattr(request, 'idempotency'):
+            api_key_id, idempotency_key, fingerprint, lock_token = request.idempotency
+            if hasattr(request, 'api_key_instance') and response.status_code < 500:
+                idempotency_store.complete(api_key_id, idempotency_key, fingerprint, response, lock_token)
+            else:
+                idempotency_store.release(api_key_id, idempotency_key, lock_token)
+
+        # 6a. REFUND: failed calls (5xx, including 503 while news_db is down) are not billed
+        credit_system = request.__dict__.pop('credit_deduction', None)
+        if credit_system is not None and response.status_code >= 500:
+            daily, purchased = credit_system.last_deduction
+            try:
+                with phase('credit_refund'):
+                    credit_system.refund_credits(
+                        daily=daily, purchased=purchased, reason=f'API call failed with {response.status_code}'
+                    )
+            except Exception:
+                credit_refund_failures.inc()
+                logger.exception("Could not refund credits for a %s response", response.status_code)
+
         # 7. LOGGING (The "Receipt")
         # We only log if the request had a valid API key attached in process_view
         if hasattr(request, 'api_key_instance'):
@@ -76,15 +197,17 @@ class APICreditMiddleware(MiddlewareMixin):
 
             try:
                 # Create the log entry (This increases the count for tomorrow's check)
-                APICallLog.objects.create(
-                    api_key=request.api_key_instance,
-                    endpoint=request.path,
-                    method=request.method,
-                    ip_address=ip,
-                    status_code=response.status_code
-                )
+                with phase('call_log'):
+                    APICallLog.objects.create(
+                        api_key=request.api_key_instance,
+                        endpoint=request.path,
+                        method=request.method,
+                        ip_address=ip,
+                        status_code=response.status_code
+                    )
             except Exception as e:
                 # Log error silently to console so we don't crash the user's response
+                call_log_write_failures.inc()
                 print(f"Middleware Logging Failed: {e}")
 
         return response
\ No newline at end of file
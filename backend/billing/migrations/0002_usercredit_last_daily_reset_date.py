@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-19 15:59
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usercredit',
+            name='last_daily_reset',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.9 on 2026-10-19 16:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0002_usercredit_last_daily_reset_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsageRollupCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_log_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='APIUsageRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hourly'), ('day', 'Daily')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('endpoint', models.CharField(max_length=255)),
+                ('status_code', models.IntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField()),
+                ('api_key', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_rollups', to='billing.apikey')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('api_key', 'granularity', 'bucket_start', 'endpoint', 'status_code'), name='unique_usage_rollup_bucket')],
+            },
+        ),
+    ]
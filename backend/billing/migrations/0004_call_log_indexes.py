@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-19 16:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0003_usage_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='apicalllog',
+            index=models.Index(fields=['api_key', '-timestamp', '-id'], name='calllog_key_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='apicalllog',
+            index=models.Index(fields=['api_key', 'status_code', '-timestamp'], name='calllog_key_status_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='apicalllog',
+            index=models.Index(fields=['api_key', 'endpoint', '-timestamp'], name='calllog_key_endpoint_time_idx'),
+        ),
+    ]
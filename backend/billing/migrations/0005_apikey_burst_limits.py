@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-19 16:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0004_call_log_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apikey',
+            name='burst_size',
+            field=models.PositiveIntegerField(default=20, help_text='Max requests allowed in a single burst'),
+        ),
+        migrations.AddField(
+            model_name='apikey',
+            name='rate_limit_per_second',
+            field=models.FloatField(default=5, help_text='Sustained requests per second for this key'),
+        ),
+    ]
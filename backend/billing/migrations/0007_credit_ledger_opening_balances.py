@@ -0,0 +1,35 @@
+# Generated by Django 5.2.9 on 2026-10-19 16:06
+
+from django.db import migrations
+
+
+def create_opening_balances(apps, schema_editor):
+    """Seed the ledger with each user's existing purchased credits."""
+    UserCredit = apps.get_model('billing', 'UserCredit')
+    CreditTransaction = apps.get_model('billing', 'CreditTransaction')
+
+    CreditTransaction.objects.bulk_create(
+        [
+            CreditTransaction(
+                user_id=user_id,
+                amount=purchased_credits,
+                kind='opening',
+                reason='Balance before the credit ledger was introduced',
+            )
+            for user_id, purchased_credits in (
+                UserCredit.objects.filter(purchased_credits__gt=0).values_list('user_id', 'purchased_credits')
+            )
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0006_credit_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-19 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0007_credit_ledger_opening_balances'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apikey',
+            name='max_in_flight',
+            field=models.PositiveIntegerField(default=10, help_text='Max concurrent requests for this key (0 = unlimited)'),
+        ),
+    ]
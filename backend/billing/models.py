@@ -2,6 +2,7 @@ from django.conf import settings
 from django.utils import timezone
 import uuid
 from django.db import models, transaction
+from monitoring.metrics import credit_lock_wait
 
 
 class APIKey(models.Model):
@@ -13,6 +14,11 @@ class APIKey(models.Model):
     
     # Limits for this specific key (optional)
     daily_limit = models.PositiveIntegerField(default=1000, help_text="Max calls allowed per day for this specific key")
+
+    # Burst limits (token bucket). 0 disables the burst limit for this key.
+    rate_limit_per_second = models.FloatField(default=5, help_text="Sustained requests per second for this key")
+    burst_size = models.PositiveIntegerField(default=20, help_text="Max requests allowed in a single burst")
+    max_in_flight = models.PositiveIntegerField(default=10, help_text="Max concurrent requests for this key (0 = unlimited)")
     
     def save(self, *args, **kwargs):
         if not self.key:
@@ -30,6 +36,14 @@ class APICallLog(models.Model):
     status_code = models.IntegerField()
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Back the keyset pagination on (timestamp, id) and the log filters
+        indexes = [
+            models.Index(fields=['api_key', '-timestamp', '-id'], name='calllog_key_time_idx'),
+            models.Index(fields=['api_key', 'status_code', '-timestamp'], name='calllog_key_status_time_idx'),
+            models.Index(fields=['api_key', 'endpoint', '-timestamp'], name='calllog_key_endpoint_time_idx'),
+        ]
+
     def __str__(self):
         return f"{self.api_key.name} - {self.endpoint} - {self.status_code}"
 
@@ -48,19 +62,23 @@ class UserCredit(models.Model):
 
     purchased_credits = models.PositiveIntegerField(default=0)
     daily_free_credits = models.PositiveIntegerField(default=DAILY_FREE_LIMIT)
-    last_daily_reset = models.DateField(default=timezone.now)
+    last_daily_reset = models.DateField(default=timezone.localdate)
 
-    def check_and_reset_daily_credits(self):
-        today = timezone.now().date()
+    # (daily, purchased) credits taken by this instance's last successful deduct_credits()
+    last_deduction = (0, 0)
 
-        if self.last_daily_reset < today:
-            self.daily_free_credits = self.DAILY_FREE_LIMIT
-            self.last_daily_reset = today
-            self.save(update_fields=['daily_free_credits', 'last_daily_reset'])
+    def effective_daily_free_credits(self):
+        """
+        Daily free credits available today, computed on read.
+        A row that was last reset before today counts as a full allowance;
+        the reset itself is only persisted when a deduction happens.
+        """
+        if self.last_daily_reset < timezone.localdate():
+            return self.DAILY_FREE_LIMIT
+        return self.daily_free_credits
 
     def has_sufficient_credits(self, cost=1):
-        self.check_and_reset_daily_credits()
-        return (self.daily_free_credits + self.purchased_credits) >= cost
+        return self.total_available() >= cost
 
     def deduct_credits(self, cost=1):
         """
@@ -68,36 +86,175 @@ class UserCredit(models.Model):
         Returns True if successful, False otherwise.
         """
         with transaction.atomic():
-            credit = (
-                UserCredit.objects
-                .select_for_update()
-                .get(pk=self.pk)
-            )
+            with credit_lock_wait.time():
+                credit = (
+                    UserCredit.objects
+                    .select_for_update()
+                    .get(pk=self.pk)
+                )
 
-            credit.check_and_reset_daily_credits()
+            # Apply a pending daily reset in memory; it is saved together with the deduction.
+            credit.daily_free_credits = credit.effective_daily_free_credits()
+            credit.last_daily_reset = timezone.localdate()
 
             if credit.daily_free_credits + credit.purchased_credits < cost:
                 return False
 
             if credit.daily_free_credits >= cost:
                 credit.daily_free_credits -= cost
+                self.last_deduction = (cost, 0)
             else:
                 remaining = cost - credit.daily_free_credits
                 credit.daily_free_credits = 0
                 credit.purchased_credits -= remaining
+                # Purchased credits only move through the ledger
+                CreditTransaction.objects.create(
+                    user_id=credit.user_id,
+                    amount=-remaining,
+                    kind=CreditTransaction.USAGE,
+                )
+                self.last_deduction = (cost - remaining, remaining)
 
-            credit.save(update_fields=['daily_free_credits', 'purchased_credits'])
+            credit.save(update_fields=['daily_free_credits', 'purchased_credits', 'last_daily_reset'])
             return True
 
+    def refund_credits(self, daily=0, purchased=0, reason=''):
+        """
+        Give back credits taken by deduct_credits() (see last_deduction) for a
+        call that failed. Daily free credits only come back on the day they
+        were taken; purchased credits go back through the ledger.
+        """
+        with transaction.atomic():
+            credit = UserCredit.objects.select_for_update().get(pk=self.pk)
+
+            if daily and credit.last_daily_reset == timezone.localdate():
+                credit.daily_free_credits = min(credit.daily_free_credits + daily, self.DAILY_FREE_LIMIT)
+            if purchased:
+                credit.purchased_credits += purchased
+                CreditTransaction.objects.create(
+                    user_id=credit.user_id,
+                    amount=purchased,
+                    kind=CreditTransaction.REFUND,
+                    reason=reason,
+                )
+
+            credit.save(update_fields=['daily_free_credits', 'purchased_credits'])
+
     def total_available(self):
-        self.check_and_reset_daily_credits()
-        return self.daily_free_credits + self.purchased_credits
+        return self.effective_daily_free_credits() + self.purchased_credits
 
     def __str__(self):
         return (
             f"{self.user.email} | "
             f"Total: {self.total_available()} "
-            f"(Daily: {self.daily_free_credits}, Paid: {self.purchased_credits})"
+            f"(Daily: {self.effective_daily_free_credits()}, Paid: {self.purchased_credits})"
         )
 
-  
\ No newline at end of file
+
+class CreditTransaction(models.Model):
+    """
+    Append-only ledger of purchased-credit movements.
+    UserCredit.purchased_credits is the materialized balance and is only
+    changed in the same transaction that appends the matching entry.
+    """
+    OPENING = 'opening'
+    TOP_UP = 'top_up'
+    REMOVAL = 'removal'
+    USAGE = 'usage'
+    REFUND = 'refund'
+    KIND_CHOICES = [
+        (OPENING, 'Opening balance'),
+        (TOP_UP, 'Top-up'),
+        (REMOVAL, 'Removal'),
+        (USAGE, 'API usage'),
+        (REFUND, 'Refund'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='credit_transactions')
+    amount = models.IntegerField(help_text="Signed change to purchased credits")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    reason = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='credit_tx_user_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Credit transactions are append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Credit transactions are append-only.")
+
+    def __str__(self):
+        return f"{self.user_id} | {self.kind} {self.amount:+d}"
+
+
+class CreditBalanceSnapshot(models.Model):
+    """
+    Ledger balance of a user as of a given transaction id.
+    The current ledger balance is the latest snapshot plus the (short) tail after it.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='credit_snapshots')
+    balance = models.IntegerField()
+    last_transaction_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-last_transaction_id'], name='credit_snapshot_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} | {self.balance} @ {self.last_transaction_id}"
+
+
+class APIUsageRollup(models.Model):
+    """
+    Pre-aggregated APICallLog counts per key, time bucket, endpoint and status code.
+    Maintained incrementally by billing.rollups.rollup_new_logs().
+    """
+    HOURLY = 'hour'
+    DAILY = 'day'
+    GRANULARITY_CHOICES = [
+        (HOURLY, 'Hourly'),
+        (DAILY, 'Daily'),
+    ]
+
+    api_key = models.ForeignKey(APIKey, on_delete=models.CASCADE, related_name='usage_rollups')
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    endpoint = models.CharField(max_length=255)
+    status_code = models.IntegerField()
+    count = models.PositiveIntegerField(default=0)
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['api_key', 'granularity', 'bucket_start', 'endpoint', 'status_code'],
+                name='unique_usage_rollup_bucket',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.api_key_id} - {self.granularity} {self.bucket_start:%Y-%m-%d %H:%M} - {self.endpoint} - {self.status_code}: {self.count}"
+
+
+class UsageRollupCheckpoint(models.Model):
+    """
+    Remembers the last APICallLog id folded into the rollups.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    last_log_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_log_id}"
@@ -0,0 +1,20 @@
+"""Query-parameter parsing shared by the billing and admin endpoints; bad input is a 400."""
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+def parse_int_param(name, value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({name: 'Must be an integer.'})
+
+
+def parse_datetime_param(name, value):
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ValidationError({name: 'Must be an ISO 8601 datetime.'})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
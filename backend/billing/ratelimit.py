@@ -0,0 +1,113 @@
+import math
+import time
+import uuid
+
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+# How long a bucket lock may be held before it expires on its own (seconds),
+# so a crashed worker can never wedge a key.
+LOCK_TIMEOUT = 1
+LOCK_RETRY_DELAY = 0.002
+
+# The whole refill-consume cycle as one Redis command. Uses the Redis clock so
+# workers with skewed clocks agree; floats go back as strings (Lua numbers
+# would be truncated to integers).
+CONSUME_SCRIPT = """
+local rate, burst, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or burst
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated_at) * rate)
+local allowed, retry_after = 0, 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket rate limiter shared by all worker processes through the Django cache.
+
+    Each bucket refills at `rate` tokens per second up to `burst` tokens. On
+    Redis the read-refill-consume-write cycle is a single Lua script, so
+    concurrent workers cannot both spend the same token and never wait on
+    each other. Other backends run it under a short cache lock (cache.add is
+    atomic on Memcached) owned by a unique token.
+    """
+
+    def __init__(self, cache_alias='default', prefix='ratelimit'):
+        self.cache_alias = cache_alias
+        self.prefix = prefix
+        self.script = None
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def consume(self, bucket_id, rate, burst, cost=1):
+        """
+        Try to take `cost` tokens from the bucket.
+        Returns (allowed, retry_after_seconds).
+        A rate or burst of 0 disables limiting for the bucket.
+        """
+        if not rate or not burst:
+            return True, 0
+
+        state_key = f"{self.prefix}:{bucket_id}:state"
+        if isinstance(self.cache, RedisCache):
+            return self._consume_redis(state_key, rate, burst, cost)
+        return self._consume_locked(f"{self.prefix}:{bucket_id}:lock", state_key, rate, burst, cost)
+
+    def _consume_redis(self, state_key, rate, burst, cost):
+        key = self.cache.make_and_validate_key(state_key)
+        client = self.cache._cache.get_client(key, write=True)
+        if self.script is None:
+            self.script = client.register_script(CONSUME_SCRIPT)
+        allowed, retry_after = self.script(keys=[key], args=[rate, burst, cost], client=client)
+        return bool(allowed), float(retry_after)
+
+    def _consume_locked(self, lock_key, state_key, rate, burst, cost):
+        token = uuid.uuid4().hex
+        self._acquire(lock_key, token)
+        try:
+            now = time.time()
+            tokens, updated_at = self.cache.get(state_key) or (burst, now)
+            tokens = min(burst, tokens + max(0, now - updated_at) * rate)
+
+            if tokens >= cost:
+                tokens -= cost
+                allowed, retry_after = True, 0
+            else:
+                allowed, retry_after = False, (cost - tokens) / rate
+
+            # Keep the state only as long as it takes to refill completely
+            self.cache.set(state_key, (tokens, now), timeout=math.ceil(burst / rate) + 1)
+            return allowed, retry_after
+        finally:
+            # Past LOCK_TIMEOUT the lock may already be another worker's
+            if self.cache.get(lock_key) == token:
+                self.cache.delete(lock_key)
+
+    def _acquire(self, lock_key, token):
+        # A held lock expires after LOCK_TIMEOUT, so waiting is bounded; if a
+        # steady stream of other holders still beats us, go ahead unlocked
+        # rather than reject a request that may well have tokens left
+        deadline = time.monotonic() + 2 * LOCK_TIMEOUT
+        while not self.cache.add(lock_key, token, timeout=LOCK_TIMEOUT):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(LOCK_RETRY_DELAY)
+        return True
+
+
+rate_limiter = TokenBucketLimiter()
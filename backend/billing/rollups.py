@@ -0,0 +1,197 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Max, Min, Sum
+from django.utils import timezone
+
+from .models import APICallLog, APIUsageRollup, UsageRollupCheckpoint
+
+CHECKPOINT_NAME = 'api_call_log'
+
+# Rows younger than this are left for the next run, so a log row whose id was
+# allocated earlier but committed later is not skipped by the checkpoint.
+SETTLE_SECONDS = 5
+
+TIME_RANGES = {
+    '1h': timedelta(hours=1),
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30),
+}
+
+
+def resolve_time_range(time_range, default='7d'):
+    """
+    Translate a ?time_range=1h/24h/7d/30d/all value into a start datetime.
+    Returns None for 'all'. Unknown values fall back to `default`.
+    """
+    if time_range == 'all':
+        return None
+    delta = TIME_RANGES.get(time_range) or TIME_RANGES[default]
+    return timezone.now() - delta
+
+
+def bucket_start(timestamp, granularity):
+    start = timestamp.replace(minute=0, second=0, microsecond=0)
+    if granularity == APIUsageRollup.DAILY:
+        start = start.replace(hour=0)
+    return start
+
+
+def rollup_new_logs(batch_size=5000):
+    """
+    Fold APICallLog rows newer than the checkpoint into hourly and daily rollups.
+    Safe to run from several processes; the checkpoint row lock serializes them.
+    Returns the number of log rows processed.
+    """
+    processed = 0
+    while True:
+        cutoff = timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+        with transaction.atomic():
+            checkpoint, _ = (
+                UsageRollupCheckpoint.objects
+                .select_for_update()
+                .get_or_create(name=CHECKPOINT_NAME)
+            )
+            rows = list(
+                APICallLog.objects
+                .filter(id__gt=checkpoint.last_log_id)
+                .order_by('id')
+                .values('id', 'api_key_id', 'endpoint', 'status_code', 'timestamp')[:batch_size]
+            )
+            fetched = len(rows)
+
+            # Stop at the first row that has not settled yet
+            for index, row in enumerate(rows):
+                if row['timestamp'] >= cutoff:
+                    rows = rows[:index]
+                    break
+
+            if not rows:
+                break
+
+            _merge_into_rollups(rows)
+            checkpoint.last_log_id = rows[-1]['id']
+            checkpoint.save(update_fields=['last_log_id', 'updated_at'])
+
+        processed += len(rows)
+        if fetched < batch_size or len(rows) < fetched:
+            break
+
+    return processed
+
+
+def _merge_into_rollups(rows):
+    # (api_key_id, granularity, bucket_start, endpoint, status_code) -> [count, first_seen, last_seen]
+    deltas = {}
+    for row in rows:
+        for granularity in (APIUsageRollup.HOURLY, APIUsageRollup.DAILY):
+            key = (
+                row['api_key_id'],
+                granularity,
+                bucket_start(row['timestamp'], granularity),
+                row['endpoint'][:255],
+                row['status_code'],
+            )
+            entry = deltas.get(key)
+            if entry is None:
+                deltas[key] = [1, row['timestamp'], row['timestamp']]
+            else:
+                entry[0] += 1
+                entry[1] = min(entry[1], row['timestamp'])
+                entry[2] = max(entry[2], row['timestamp'])
+
+    buckets = [key[2] for key in deltas]
+    existing = {
+        (r.api_key_id, r.granularity, r.bucket_start, r.endpoint, r.status_code): r
+        for r in APIUsageRollup.objects.filter(
+            api_key_id__in={key[0] for key in deltas},
+            bucket_start__gte=min(buckets),
+            bucket_start__lte=max(buckets),
+        )
+    }
+
+    to_update = []
+    to_create = []
+    for key, (count, first_seen, last_seen) in deltas.items():
+        rollup = existing.get(key)
+        if rollup is None:
+            api_key_id, granularity, start, endpoint, status_code = key
+            to_create.append(APIUsageRollup(
+                api_key_id=api_key_id,
+                granularity=granularity,
+                bucket_start=start,
+                endpoint=endpoint,
+                status_code=status_code,
+                count=count,
+                first_seen=first_seen,
+                last_seen=last_seen,
+            ))
+        else:
+            rollup.count += count
+            rollup.first_seen = min(rollup.first_seen, first_seen)
+            rollup.last_seen = max(rollup.last_seen, last_seen)
+            to_update.append(rollup)
+
+    if to_update:
+        APIUsageRollup.objects.bulk_update(to_update, ['count', 'first_seen', 'last_seen'], batch_size=1000)
+    if to_create:
+        APIUsageRollup.objects.bulk_create(to_create, batch_size=1000)
+
+
+def usage_summary(rollups, time_range='7d', granularity=None):
+    """
+    Build the usage analytics payload from a queryset of rollups
+    (already scoped to a user or key).
+    """
+    if granularity not in (APIUsageRollup.HOURLY, APIUsageRollup.DAILY):
+        granularity = APIUsageRollup.HOURLY if time_range in ('1h', '24h') else APIUsageRollup.DAILY
+
+    rollups = rollups.filter(granularity=granularity)
+    start = resolve_time_range(time_range)
+    if start is not None:
+        rollups = rollups.filter(bucket_start__gte=bucket_start(start, granularity))
+
+    series = (
+        rollups.values('bucket_start')
+        .annotate(count=Sum('count'))
+        .order_by('bucket_start')
+    )
+    by_endpoint = (
+        rollups.values('endpoint')
+        .annotate(count=Sum('count'))
+        .order_by('-count')
+    )
+    by_status = (
+        rollups.values('status_code')
+        .annotate(count=Sum('count'))
+        .order_by('status_code')
+    )
+    totals = rollups.aggregate(
+        total=Sum('count'),
+        first_seen=Min('first_seen'),
+        last_seen=Max('last_seen'),
+    )
+
+    return {
+        'granularity': granularity,
+        'time_range': time_range,
+        'total': totals['total'] or 0,
+        'first_seen': totals['first_seen'],
+        'last_seen': totals['last_seen'],
+        'series': [{'bucket': row['bucket_start'], 'count': row['count']} for row in series],
+        'by_endpoint': list(by_endpoint),
+        'by_status': list(by_status),
+    }
+
+
+def rollup_backlog():
+    """How many call logs were written after the rollup checkpoint (an id-range estimate, no table scan)."""
+    checkpoint = (
+        UsageRollupCheckpoint.objects
+        .filter(name=CHECKPOINT_NAME)
+        .values_list('last_log_id', flat=True)
+        .first()
+    ) or 0
+    newest = APICallLog.objects.aggregate(newest=Max('id'))['newest'] or 0
+    return max(0, newest - checkpoint)
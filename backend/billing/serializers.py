@@ -1,7 +1,8 @@
 from rest_framework import serializers
-from .models import APIKey, APICallLog, UserCredit
+from .models import APIKey, APICallLog, CreditTransaction, UserCredit
 
 class UserCreditSerializer(serializers.ModelSerializer):
+    daily_free_credits = serializers.IntegerField(source='effective_daily_free_credits', read_only=True)
     remaining_credits = serializers.IntegerField(source='total_available', read_only=True)
     
     class Meta:
@@ -11,10 +12,27 @@ class UserCreditSerializer(serializers.ModelSerializer):
 class APIKeySerializer(serializers.ModelSerializer):
     class Meta:
         model = APIKey
-        fields = ['id', 'name', 'key', 'created_at', 'is_active', 'daily_limit']
-        read_only_fields = ['key', 'created_at']
+        fields = ['id', 'name', 'key', 'created_at', 'is_active', 'daily_limit', 'rate_limit_per_second', 'burst_size', 'max_in_flight']
+        read_only_fields = ['key', 'created_at', 'rate_limit_per_second', 'burst_size', 'max_in_flight']
 
 class APICallLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = APICallLog
-        fields = ['endpoint', 'method', 'status_code', 'ip_address', 'timestamp']
\ No newline at end of file
+        fields = ['id', 'api_key', 'endpoint', 'method', 'status_code', 'ip_address', 'timestamp']
+
+class CreditTransactionSerializer(serializers.ModelSerializer):
+    created_by = serializers.EmailField(source='created_by.email', read_only=True, default=None)
+
+    class Meta:
+        model = CreditTransaction
+        fields = ['id', 'amount', 'kind', 'reason', 'created_by', 'created_at']
+
+class CreditAdjustmentSerializer(serializers.Serializer):
+    user = serializers.IntegerField()
+    credits = serializers.IntegerField()
+
+class BulkCreditAdjustmentSerializer(serializers.Serializer):
+    MAX_ADJUSTMENTS = 10000
+
+    adjustments = CreditAdjustmentSerializer(many=True, allow_empty=False, max_length=MAX_ADJUSTMENTS)
+    reason = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .dashboard import invalidate_summary
+from .models import APIKey, UserCredit
+
+
+@receiver([post_save, post_delete], sender=APIKey)
+def invalidate_dashboard_summary(sender, instance, **kwargs):
+    invalidate_summary(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=UserCredit)
+def invalidate_dashboard_summary_credits(sender, instance, update_fields=None, **kwargs):
+    # Usage (deduct_credits/refund_credits) saves named fields on every billed
+    # call and is left to DASHBOARD_SUMMARY_TTL; purchases and grants
+    # invalidate in billing.ledger. Full saves (creation, admin edits) do here.
+    if update_fields is None:
+        invalidate_summary(instance.user_id)
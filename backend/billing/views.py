@@ -1,7 +1,12 @@
 from rest_framework import viewsets, mixins, permissions
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from .models import APIKey, APICallLog, UserCredit
+from .dashboard import get_dashboard_summary
+from .logs import filter_call_logs, stream_call_logs
+from .params import parse_int_param
+from .models import APIKey, APICallLog, APIUsageRollup, UserCredit
+from .pagination import CallLogKeysetPagination
+from .rollups import usage_summary
 from .serializers import APIKeySerializer, APICallLogSerializer, UserCreditSerializer
 from rest_framework import status
 class DashboardViewSet(viewsets.GenericViewSet):
@@ -16,11 +21,18 @@ class DashboardViewSet(viewsets.GenericViewSet):
         """Get current user credit balance"""
         # Ensure credit object exists
         credit, _ = UserCredit.objects.get_or_create(user=request.user)
-        # Trigger lazy reset if needed before showing
-        credit.check_and_reset_daily_credits()
+        # Daily reset is computed on read by the serializer, nothing is written here
         serializer = UserCreditSerializer(credit)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """
+        Everything the dashboard home needs in one response: credits, keys with
+        today's usage, 24h totals and recent activity. Cached briefly per user.
+        """
+        return Response(get_dashboard_summary(request.user))
+
     # --- API KEY ENDPOINTS ---
     @action(detail=False, methods=['get'])
     def list_keys(self, request):
@@ -49,10 +61,38 @@ class DashboardViewSet(viewsets.GenericViewSet):
     # --- LOGS ENDPOINT ---
     @action(detail=False, methods=['get'])
     def logs(self, request):
-        """View usage logs for all user keys"""
-        logs = APICallLog.objects.filter(api_key__user=request.user).order_by('-timestamp')[:50] # Last 50 logs
-        serializer = APICallLogSerializer(logs, many=True)
-        return Response(serializer.data)
+        """
+        View usage logs for all user keys, newest first.
+        Keyset paginated via ?cursor= and ?page_size=, filterable by
+        ?api_key, ?status_code/?status, ?endpoint, ?time_range, ?since and ?until.
+        """
+        logs = filter_call_logs(APICallLog.objects.filter(api_key__user=request.user), request.query_params)
+        paginator = CallLogKeysetPagination()
+        page = paginator.paginate_queryset(logs, request, view=self)
+        serializer = APICallLogSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='logs/export')
+    def export_logs(self, request):
+        """Stream the filtered logs as CSV (default) or NDJSON via ?export_format=ndjson"""
+        logs = filter_call_logs(APICallLog.objects.filter(api_key__user=request.user), request.query_params)
+        return stream_call_logs(logs, request.query_params.get('export_format', 'csv'))
+
+    @action(detail=False, methods=['get'])
+    def usage(self, request):
+        """
+        Usage analytics from the pre-aggregated rollups.
+        Supports ?time_range=1h/24h/7d/30d/all, ?granularity=hour/day and ?api_key=<id>.
+        """
+        rollups = APIUsageRollup.objects.filter(api_key__user=request.user)
+        api_key_id = request.query_params.get('api_key')
+        if api_key_id:
+            rollups = rollups.filter(api_key_id=parse_int_param('api_key', api_key_id))
+        return Response(usage_summary(
+            rollups,
+            time_range=request.query_params.get('time_range', '7d'),
+            granularity=request.query_params.get('granularity'),
+        ))
 
 class APIKeyViewSet(viewsets.ModelViewSet):
     queryset = APIKey.objects.all()
@@ -1,17 +1,20 @@
+from news.replicas import news_replicas
+
+
 class NewsRouter:
     """
     Router for the `news` app.
-    - READ ONLY database: news_db
+    - READ ONLY database: news_db (or one of its read replicas)
     - No writes
     - No migrations
     """
 
     def db_for_read(self, model, **hints):
         """
-        Read news models from news_db.
+        Read news models from the replica news.replicas picks (news_db without replicas).
         """
         if model._meta.app_label == 'news':
-            return 'news_db'
+            return news_replicas.choose()
         return None
 
     def db_for_write(self, model, **hints):
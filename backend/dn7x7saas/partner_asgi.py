@@ -0,0 +1,17 @@
+"""
+ASGI config for the partner API process.
+
+Serves only /api/news/ with the minimal middleware chain from
+dn7x7saas.partner_settings. Route /api/news/ to this app at the proxy and
+everything else to dn7x7saas.asgi, e.g.:
+
+    uvicorn dn7x7saas.partner_asgi:application --port 8101
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dn7x7saas.partner_settings')
+
+application = get_asgi_application()
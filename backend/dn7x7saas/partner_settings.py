@@ -0,0 +1,43 @@
+"""
+Settings overlay for the partner API process (partner_asgi / partner_wsgi).
+
+This process serves only /api/news/: stateless JSON reads authenticated by
+the X-API-KEY header. Sessions, CSRF, messages, allauth, djoser and the
+admin are left out so each request runs through as little as possible.
+CORS stays because the dashboard playground calls the API from the browser.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "rest_framework",
+    "corsheaders",
+    "accounts",
+    "billing",
+    "news",
+    "monitoring",
+]
+
+MIDDLEWARE = [
+    # Both drop out unless SERVER_TIMING_ENABLED / METRICS_ENABLED
+    "monitoring.middleware.ServerTimingMiddleware",
+    "monitoring.middleware.PrometheusMetricsMiddleware",
+    "corsheaders.middleware.CorsMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "billing.middleware.APICreditMiddleware",
+]
+
+ROOT_URLCONF = "dn7x7saas.partner_urls"
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    # Partner views declare their own APIKeyAuthentication
+    "DEFAULT_AUTHENTICATION_CLASSES": (),
+    "DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",),
+    "DEFAULT_PARSER_CLASSES": ("rest_framework.parsers.JSONParser",),
+}
+
+# The mailer app (and its queue table) is not loaded here
+EMAIL_BACKEND = EMAIL_DELIVERY_BACKEND
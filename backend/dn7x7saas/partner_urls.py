@@ -0,0 +1,18 @@
+"""
+URL configuration for the partner API process (see partner_settings).
+Only the news API is mounted here.
+"""
+from django.conf import settings
+from django.urls import path, include
+
+from monitoring.views import metrics_view
+from news.views import ThumbnailView
+
+urlpatterns = [
+    path('api/news/', include('news.urls')),
+    # Public (image tags cannot send X-API-KEY); URLs are signed instead
+    path('api/thumbnails/', ThumbnailView.as_view(), name='news-thumbnail'),
+]
+
+if settings.METRICS_ENABLED:
+    urlpatterns += [path('metrics', metrics_view)]
@@ -0,0 +1,16 @@
+"""
+WSGI config for the partner API process.
+
+Serves only /api/news/ with the minimal middleware chain from
+dn7x7saas.partner_settings, e.g.:
+
+    gunicorn --bind 0.0.0.0:8101 dn7x7saas.partner_wsgi:application
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dn7x7saas.partner_settings')
+
+application = get_wsgi_application()
@@ -49,11 +49,16 @@ INSTALLED_APPS = [
     "accounts",
     "billing",
     "news",
+    "monitoring",
+    "mailer",
+    "webhooks",
 ]
 
 SITE_ID = 1
 
 MIDDLEWARE = [
+    "monitoring.middleware.ServerTimingMiddleware",
+    "monitoring.middleware.PrometheusMetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -103,6 +108,10 @@ WSGI_APPLICATION = "dn7x7saas.wsgi.application"
 
 
 # Database
+# news_db is the live WordPress MySQL in production; NEWS_DB_ENGINE lets load
+# tests point it at a local stand-in (see loadtest/wordpress.py).
+NEWS_DB_ENGINE = os.getenv("NEWS_DB_ENGINE", "django.db.backends.mysql")
+
 DATABASES = {
     "default": {
         "ENGINE": os.getenv("DB_ENGINE", "django.db.backends.sqlite3"),
@@ -113,7 +122,7 @@ DATABASES = {
         "PORT": os.getenv("DB_PORT"),
     },
     "news_db": {
-        "ENGINE": "django.db.backends.mysql",
+        "ENGINE": NEWS_DB_ENGINE,
         "NAME": os.getenv("NEWS_DB_NAME", "dairynewsnew"),
         "USER": os.getenv("NEWS_DB_USER", "root"),
         "PASSWORD": os.getenv("NEWS_DB_PASSWORD", ""),
@@ -121,13 +130,171 @@ DATABASES = {
         "PORT": os.getenv("NEWS_DB_PORT", "3306"),
         "OPTIONS": {
             "init_command": "SET sql_mode='STRICT_TRANS_TABLES'",
-        },
+            # Fail fast instead of holding a worker while WordPress MySQL hangs
+            "connect_timeout": int(os.getenv("NEWS_DB_CONNECT_TIMEOUT", 3)),
+            "read_timeout": int(os.getenv("NEWS_DB_READ_TIMEOUT", 10)),
+        } if NEWS_DB_ENGINE == "django.db.backends.mysql" else {},
     },
 }
 
+# Read replicas of the WordPress database, comma-separated host[:port][@weight]
+# (with a non-MySQL NEWS_DB_ENGINE each entry is the replica's NAME instead).
+# Each becomes a news_db_replica_<n> alias; news/replicas.py picks one per read
+# and news_db itself is only read from when no replica is usable.
+NEWS_DB_REPLICAS = {}
+for _index, _entry in enumerate(filter(None, os.getenv("NEWS_DB_REPLICAS", "").split(",")), start=1):
+    _address, _, _weight = _entry.strip().partition("@")
+    _replica = {**DATABASES["news_db"], "OPTIONS": dict(DATABASES["news_db"]["OPTIONS"]), "TEST": {"MIRROR": "news_db"}}
+    if NEWS_DB_ENGINE == "django.db.backends.mysql":
+        _host, _, _port = _address.partition(":")
+        _replica.update(HOST=_host, PORT=_port or DATABASES["news_db"]["PORT"])
+    else:
+        _replica["NAME"] = _address
+    DATABASES[f"news_db_replica_{_index}"] = _replica
+    NEWS_DB_REPLICAS[f"news_db_replica_{_index}"] = float(_weight or 1)
+
+# "weighted" (random, by weight) or "least_loaded" (fewest in-flight reads and
+# lowest recent latency per unit of weight)
+NEWS_DB_REPLICA_SELECTION = os.getenv("NEWS_DB_REPLICA_SELECTION", "weighted")
+# A replica that failed to connect is skipped for this many seconds
+NEWS_DB_REPLICA_RETRY_SECONDS = int(os.getenv("NEWS_DB_REPLICA_RETRY_SECONDS", 30))
+# Change-feed reads only use replicas at most this far behind news_db
+NEWS_DB_FRESH_MAX_LAG_SECONDS = float(os.getenv("NEWS_DB_FRESH_MAX_LAG_SECONDS", 5))
+# How long a measured replication lag is reused before asking the replica again
+NEWS_DB_LAG_CHECK_SECONDS = float(os.getenv("NEWS_DB_LAG_CHECK_SECONDS", 10))
+
 DATABASE_ROUTERS = ["dn7x7saas.db_routers.NewsRouter"]
 
 
+# ---------------------------------------------------------
+# CACHE (shared by all gunicorn workers when CACHE_URL is set)
+# ---------------------------------------------------------
+# Rate limiting and other cross-worker state live here, so production
+# should always point this at Redis. Example .env: CACHE_URL=redis://127.0.0.1:6379/1
+CACHE_URL = os.getenv("CACHE_URL")
+if CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+else:
+    # Per-process only; fine for local development
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Seconds a user's dashboard summary stays cached (dropped early on key changes and credit purchases;
+# credits spent by API calls show up once it expires)
+DASHBOARD_SUMMARY_TTL = int(os.getenv("DASHBOARD_SUMMARY_TTL", 30))
+
+# Idempotency-Key replay storage for partner API calls
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", 24 * 60 * 60))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", 1))
+IDEMPOTENCY_LOCK_TIMEOUT = 60  # upper bound on how long one request may own a key
+IDEMPOTENCY_MAX_RESPONSE_BYTES = 256 * 1024
+
+# How long a request waits for a free per-key concurrency slot before a 429
+MAX_IN_FLIGHT_QUEUE_SECONDS = float(os.getenv("MAX_IN_FLIGHT_QUEUE_SECONDS", 2))
+
+
+# ---------------------------------------------------------
+# REQUEST TIMING (Server-Timing header + structured log lines)
+# ---------------------------------------------------------
+# Off by default: the middleware then removes itself from the chain.
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "False") == "True"
+# Send the header on every response, not only to staff / the debug key
+SERVER_TIMING_PUBLIC = os.getenv("SERVER_TIMING_PUBLIC", "False") == "True"
+# Requests carrying "X-Debug-Timing: <key>" get the header too
+SERVER_TIMING_DEBUG_KEY = os.getenv("SERVER_TIMING_DEBUG_KEY", "")
+# Only log requests at least this slow (milliseconds); 0 logs every request
+SERVER_TIMING_LOG_MIN_MS = float(os.getenv("SERVER_TIMING_LOG_MIN_MS", 0))
+
+# ---------------------------------------------------------
+# PROMETHEUS METRICS (/metrics)
+# ---------------------------------------------------------
+# Under gunicorn also set PROMETHEUS_MULTIPROC_DIR (see gunicorn.conf.py) so
+# the scrape aggregates every worker.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "False") == "True"
+# When set, scrapes must send "Authorization: Bearer <token>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# ---------------------------------------------------------
+# SLOW QUERY CAPTURE (see `python manage.py slow_queries`)
+# ---------------------------------------------------------
+SLOW_QUERY_DATABASES = [
+    alias for alias in os.getenv("SLOW_QUERY_DATABASES", ",".join(["news_db", *NEWS_DB_REPLICAS])).split(",") if alias
+]
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 200))
+# Share of repeat slow queries that get a fresh EXPLAIN (the first one always does)
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", 0.1))
+
+# ---------------------------------------------------------
+# NEWS_DB CIRCUIT BREAKER + STALE FALLBACK (see news/circuit.py)
+# ---------------------------------------------------------
+NEWS_DB_CIRCUIT_ENABLED = os.getenv("NEWS_DB_CIRCUIT_ENABLED", "True") == "True"
+# Open once this share of the calls in the last one to two windows failed...
+NEWS_DB_CIRCUIT_FAILURE_RATE = float(os.getenv("NEWS_DB_CIRCUIT_FAILURE_RATE", 0.5))
+# ...and there were at least this many calls
+NEWS_DB_CIRCUIT_MIN_CALLS = int(os.getenv("NEWS_DB_CIRCUIT_MIN_CALLS", 20))
+NEWS_DB_CIRCUIT_WINDOW_SECONDS = int(os.getenv("NEWS_DB_CIRCUIT_WINDOW_SECONDS", 30))
+# A call slower than this counts as failed even if it returned
+NEWS_DB_CIRCUIT_SLOW_MS = float(os.getenv("NEWS_DB_CIRCUIT_SLOW_MS", 2000))
+# How long an open circuit refuses calls before letting one probe through
+NEWS_DB_CIRCUIT_OPEN_SECONDS = int(os.getenv("NEWS_DB_CIRCUIT_OPEN_SECONDS", 30))
+# How long the last good response per list page / post is kept for serving stale
+NEWS_STALE_TTL = int(os.getenv("NEWS_STALE_TTL", 24 * 60 * 60))
+
+# Time budget for all WordPress statements of one request (milliseconds),
+# enforced server-side per statement (see news/budgets.py). A list page whose
+# count does not fit is returned without it; anything else that does not fit
+# is served stale or as an unbilled 503.
+NEWS_LIST_QUERY_BUDGET_MS = int(os.getenv("NEWS_LIST_QUERY_BUDGET_MS", 1500))
+NEWS_DETAIL_QUERY_BUDGET_MS = int(os.getenv("NEWS_DETAIL_QUERY_BUDGET_MS", 1000))
+
+# ---------------------------------------------------------
+# SHARED LATEST-POSTS SNAPSHOT (see news/snapshot.py)
+# ---------------------------------------------------------
+# Published by `refresh_news_snapshot`; workers on the same host map it read-only
+NEWS_SNAPSHOT_ENABLED = os.getenv("NEWS_SNAPSHOT_ENABLED", "True") == "True"
+NEWS_SNAPSHOT_PATH = os.getenv(
+    "NEWS_SNAPSHOT_PATH",
+    "/dev/shm/dn7x7saas-news-snapshot" if os.path.isdir("/dev/shm") else os.path.join(BASE_DIR, "news_snapshot.bin"),
+)
+# Newest posts kept per category (and for all categories)
+NEWS_SNAPSHOT_POSTS = int(os.getenv("NEWS_SNAPSHOT_POSTS", 100))
+# An older snapshot is ignored and pages are read from news_db again
+NEWS_SNAPSHOT_MAX_AGE_SECONDS = int(os.getenv("NEWS_SNAPSHOT_MAX_AGE_SECONDS", 120))
+# How often each worker looks for a newly published snapshot
+NEWS_SNAPSHOT_CHECK_SECONDS = float(os.getenv("NEWS_SNAPSHOT_CHECK_SECONDS", 1))
+
+# ---------------------------------------------------------
+# LIVE NEWS STREAM, SSE at /api/news/stream/ (see news/stream.py)
+# ---------------------------------------------------------
+# How often each process checks news_db for new posts while clients are connected
+NEWS_STREAM_POLL_SECONDS = float(os.getenv("NEWS_STREAM_POLL_SECONDS", 2))
+# Posts younger than this are left for the next poll (commits can land out of order)
+NEWS_STREAM_SETTLE_SECONDS = int(os.getenv("NEWS_STREAM_SETTLE_SECONDS", 5))
+# Recent events kept per process for Last-Event-ID resume without a query
+NEWS_STREAM_BACKLOG = int(os.getenv("NEWS_STREAM_BACKLOG", 1000))
+# Resuming from further back than this many changes sends a `reset` event instead
+NEWS_STREAM_RESUME_LIMIT = int(os.getenv("NEWS_STREAM_RESUME_LIMIT", 200))
+# Events buffered for a slow client before its stream is closed (it resumes on reconnect)
+NEWS_STREAM_QUEUE_SIZE = int(os.getenv("NEWS_STREAM_QUEUE_SIZE", 100))
+NEWS_STREAM_HEARTBEAT_SECONDS = float(os.getenv("NEWS_STREAM_HEARTBEAT_SECONDS", 15))
+# Streams are closed after this long; clients reconnect with Last-Event-ID
+NEWS_STREAM_MAX_SECONDS = int(os.getenv("NEWS_STREAM_MAX_SECONDS", 60 * 60))
+NEWS_STREAM_RETRY_MS = int(os.getenv("NEWS_STREAM_RETRY_MS", 3000))
+NEWS_STREAM_MAX_PER_KEY = int(os.getenv("NEWS_STREAM_MAX_PER_KEY", 2))
+# "event": NEWS_STREAM_COST credits per delivered post; "minute": per connection-minute
+# (the first minute is the connecting call, billed like any other)
+NEWS_STREAM_BILLING = os.getenv("NEWS_STREAM_BILLING", "event")
+NEWS_STREAM_COST = int(os.getenv("NEWS_STREAM_COST", 1))
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -163,6 +330,40 @@ STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 MEDIA_URL = "/api/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+
+# ---------------------------------------------------------
+# FEATURED IMAGE THUMBNAILS, /api/thumbnails/ (see news/thumbnails.py)
+# ---------------------------------------------------------
+THUMBNAIL_CACHE_ROOT = os.getenv("THUMBNAIL_CACHE_ROOT", os.path.join(MEDIA_ROOT, "thumbnails"))
+# Least recently used variants are deleted beyond this size
+THUMBNAIL_CACHE_MAX_BYTES = int(os.getenv("THUMBNAIL_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+THUMBNAIL_PRUNE_INTERVAL_SECONDS = int(os.getenv("THUMBNAIL_PRUNE_INTERVAL_SECONDS", 60))
+THUMBNAIL_WIDTHS = [int(width) for width in os.getenv("THUMBNAIL_WIDTHS", "160,320,640,1024").split(",")]
+THUMBNAIL_DEFAULT_WIDTH = int(os.getenv("THUMBNAIL_DEFAULT_WIDTH", 640))
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", 80))
+# Image generation threads per process
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", 2))
+# How long a request waits for its variant to be generated before a 503
+THUMBNAIL_TIMEOUT_SECONDS = float(os.getenv("THUMBNAIL_TIMEOUT_SECONDS", 15))
+THUMBNAIL_FETCH_TIMEOUT_SECONDS = float(os.getenv("THUMBNAIL_FETCH_TIMEOUT_SECONDS", 10))
+THUMBNAIL_MAX_SOURCE_BYTES = int(os.getenv("THUMBNAIL_MAX_SOURCE_BYTES", 20 * 1024 ** 2))
+THUMBNAIL_MAX_SOURCE_PIXELS = int(os.getenv("THUMBNAIL_MAX_SOURCE_PIXELS", 50_000_000))
+# Sources that failed to load are not retried for this long
+THUMBNAIL_FAILURE_TTL = int(os.getenv("THUMBNAIL_FAILURE_TTL", 60))
+THUMBNAIL_MAX_AGE = int(os.getenv("THUMBNAIL_MAX_AGE", 365 * 24 * 60 * 60))
+# Prefix for thumbnail URLs in API payloads, e.g. https://api.example.com (empty = relative)
+THUMBNAIL_BASE_URL = os.getenv("THUMBNAIL_BASE_URL", "").rstrip("/")
+
+
+# ---------------------------------------------------------
+# API CALL LOG RETENTION
+# ---------------------------------------------------------
+# Rows older than this are moved to gzip JSONL segments by `archive_call_logs`
+CALL_LOG_RETENTION_DAYS = int(os.getenv("CALL_LOG_RETENTION_DAYS", 90))
+CALL_LOG_ARCHIVE_ROOT = os.getenv(
+    "CALL_LOG_ARCHIVE_ROOT", os.path.join(BASE_DIR, "archive", "call_logs")
+)
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "accounts.User"
 
@@ -196,15 +397,30 @@ SIMPLE_JWT = {
 }
 
 # Email Settings
+# Requests only queue mail (mailer.backends.QueuedEmailBackend);
+# `send_queued_email` delivers it through EMAIL_DELIVERY_BACKEND.
 if DEBUG:
-    EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
+    EMAIL_DELIVERY_BACKEND = "django.core.mail.backends.console.EmailBackend"
 else:
-    EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+    EMAIL_DELIVERY_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
     EMAIL_HOST = os.getenv("EMAIL_HOST", "smtp.gmail.com")
     EMAIL_PORT = int(os.getenv("EMAIL_PORT", 587))
     EMAIL_USE_TLS = True
     EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
     EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
+    EMAIL_TIMEOUT = int(os.getenv("EMAIL_TIMEOUT", 30))
+# e.g. django.core.mail.backends.filebased.EmailBackend with EMAIL_FILE_PATH for local testing
+EMAIL_DELIVERY_BACKEND = os.getenv("EMAIL_DELIVERY_BACKEND", EMAIL_DELIVERY_BACKEND)
+EMAIL_FILE_PATH = os.getenv("EMAIL_FILE_PATH", os.path.join(BASE_DIR, "sent_emails"))
+# EMAIL_QUEUE_ENABLED=False sends synchronously in the request again
+EMAIL_QUEUE_ENABLED = os.getenv("EMAIL_QUEUE_ENABLED", "True") == "True"
+EMAIL_BACKEND = "mailer.backends.QueuedEmailBackend" if EMAIL_QUEUE_ENABLED else EMAIL_DELIVERY_BACKEND
+EMAIL_QUEUE_MAX_ATTEMPTS = int(os.getenv("EMAIL_QUEUE_MAX_ATTEMPTS", 8))
+# Retry n waits base * 2^(n-1) seconds (+-20%), up to the max
+EMAIL_QUEUE_RETRY_BASE_SECONDS = int(os.getenv("EMAIL_QUEUE_RETRY_BASE_SECONDS", 30))
+EMAIL_QUEUE_RETRY_MAX_SECONDS = int(os.getenv("EMAIL_QUEUE_RETRY_MAX_SECONDS", 60 * 60))
+# A claimed email is handed to another worker if not finished within this time
+EMAIL_QUEUE_LEASE_SECONDS = int(os.getenv("EMAIL_QUEUE_LEASE_SECONDS", 5 * 60))
 
 DEFAULT_FROM_EMAIL = os.getenv(
     "DEFAULT_FROM_EMAIL", "Dairynews <noreply@dn7x7saas.com>"
@@ -213,6 +429,24 @@ DOMAIN = os.getenv("DOMAIN", "localhost:3000")
 SITE_NAME = "DairyNews7x7 API"
 
 
+# Webhooks
+# `deliver_webhooks` fans changed WordPress posts out to partner endpoints.
+# Changes younger than this are left for the next scan (edits right after publishing)
+WEBHOOK_SETTLE_SECONDS = int(os.getenv("WEBHOOK_SETTLE_SECONDS", 30))
+# Posts per delivery (one signed POST)
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", 20))
+WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("WEBHOOK_TIMEOUT_SECONDS", 10))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", 10))
+# Retry n waits base * 2^(n-1) seconds (+-20%), up to the max
+WEBHOOK_RETRY_BASE_SECONDS = int(os.getenv("WEBHOOK_RETRY_BASE_SECONDS", 15))
+WEBHOOK_RETRY_MAX_SECONDS = int(os.getenv("WEBHOOK_RETRY_MAX_SECONDS", 6 * 60 * 60))
+WEBHOOK_LEASE_SECONDS = int(os.getenv("WEBHOOK_LEASE_SECONDS", 2 * 60))
+WEBHOOK_DELIVERY_RETENTION_DAYS = int(os.getenv("WEBHOOK_DELIVERY_RETENTION_DAYS", 7))
+WEBHOOK_MAX_ENDPOINTS_PER_USER = int(os.getenv("WEBHOOK_MAX_ENDPOINTS_PER_USER", 5))
+# Allows http:// and private/loopback hosts, e.g. loadtest/webhook_receiver.py
+WEBHOOK_ALLOW_PRIVATE_URLS = os.getenv("WEBHOOK_ALLOW_PRIVATE_URLS", str(DEBUG)) == "True"
+
+
 # Djoser Configuration
 DJOSER = {
     "LOGIN_FIELD": "email",
@@ -263,5 +497,15 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        'monitoring': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'news': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
\ No newline at end of file
@@ -18,13 +18,21 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from monitoring.views import metrics_view
+from news.views import ThumbnailView
 
 urlpatterns = [
     path('api/admin/', admin.site.urls),
     path('api/accounts/', include('accounts.urls')),
     path('api/dashboard/', include('billing.urls')),
     path('api/news/', include('news.urls')),
+    # Public (image tags cannot send X-API-KEY); URLs are signed instead
+    path('api/thumbnails/', ThumbnailView.as_view(), name='news-thumbnail'),
+    path('api/webhooks/', include('webhooks.urls')),
 ]
 
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+if settings.METRICS_ENABLED:
+    urlpatterns += [path('metrics', metrics_view)]
@@ -0,0 +1,23 @@
+"""
+Gunicorn settings, loaded automatically from the working directory.
+
+Prepares the Prometheus multiprocess directory: every worker writes its
+metric samples there and /metrics aggregates them. The directory must be
+emptied on each start and must not be shared between the main and partner
+apps (give each its own PROMETHEUS_MULTIPROC_DIR).
+"""
+import os
+import shutil
+
+
+def on_starting(server):
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
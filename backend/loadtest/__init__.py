@@ -0,0 +1,22 @@
+"""
+Load-test harness for the partner news API (run from the backend directory):
+
+    python -m loadtest.wordpress --posts 1000000    # synthetic WordPress data in news_db
+    python -m loadtest.seed --keys 20 --output keys.txt
+    python -m loadtest.driver --base-url http://127.0.0.1:8100 --keys-file keys.txt
+    python -m loadtest.compare main HEAD            # both commits, same data, same load
+
+See "Load testing" in the backend Readme.
+"""
+import os
+import sys
+
+
+def setup_django(settings_module='dn7x7saas.settings'):
+    """Configure Django for a script run from a backend directory (the current one, not this file's)."""
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+
+    import django
+    django.setup()
@@ -0,0 +1,213 @@
+"""
+Load-test two commits under identical conditions and compare them:
+
+    python -m loadtest.compare main HEAD --duration 30 --concurrency 16 --repeat 3
+
+Each commit is checked out into a temporary git worktree and gets its own
+fresh SQLite default database (migrated by that commit's code), its own
+seeded keys and its own gunicorn. news_db comes from the environment
+(NEWS_DB_ENGINE/NEWS_DB_NAME/...) and is shared read-only by both, so
+generate it once with loadtest.wordpress first. Driver runs alternate
+between the two servers and the median of the runs is reported.
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from loadtest.driver import DEFAULT_MIX, Driver, format_result, parse_mix, read_keys
+
+SEED_SCRIPT = Path(__file__).resolve().with_name('seed.py')
+
+# Written into each checkout. IMMEDIATE transactions make concurrent SQLite
+# writers queue on the busy timeout instead of failing with "database is locked".
+SETTINGS_OVERLAY = '''from dn7x7saas.settings import *  # noqa: F401,F403
+
+DATABASES["default"]["OPTIONS"] = {"transaction_mode": "IMMEDIATE", "timeout": 30}
+'''
+METRICS = ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms')
+
+
+def git(*args, cwd=None):
+    return subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class CommitServer:
+    """A checkout of one commit with its own database, keys and gunicorn."""
+
+    def __init__(self, label, ref, workdir, workers, keys, credits):
+        self.label = label
+        self.ref = ref
+        self.sha = git('rev-parse', '--short', ref)
+        self.root = Path(workdir) / label
+        self.workers = workers
+        self.key_count = keys
+        self.credits = credits
+        self.port = free_port()
+        self.process = None
+        self.log = None
+
+        top = Path(git('rev-parse', '--show-toplevel'))
+        self.backend = self.root / Path.cwd().resolve().relative_to(top)
+        self.env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': 'loadtest_settings',
+            'DB_ENGINE': 'django.db.backends.sqlite3',
+            'DB_NAME': str(self.root / 'default.sqlite3'),
+            'DEBUG': 'False',
+            'ALLOWED_HOSTS': '127.0.0.1,localhost',
+        }
+        self.env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.port}'
+
+    def run(self, *command):
+        completed = subprocess.run(command, cwd=self.backend, env=self.env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"{' '.join(command)} failed for {self.sha}:\n{completed.stderr}")
+
+    def setup(self):
+        git('worktree', 'add', '--detach', str(self.root), self.sha)
+        (self.backend / 'loadtest_settings.py').write_text(SETTINGS_OVERLAY)
+        self.run(sys.executable, 'manage.py', 'migrate', '--noinput')
+        self.keys_file = self.root / 'keys.txt'
+        self.run(
+            sys.executable, str(SEED_SCRIPT), '--keys', str(self.key_count),
+            '--credits', str(self.credits), '--output', str(self.keys_file),
+        )
+        self.keys = read_keys(self.keys_file)
+
+        self.log = open(self.root / 'gunicorn.log', 'w')
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{self.port}',
+             '--workers', str(self.workers), 'dn7x7saas.wsgi:application'],
+            cwd=self.backend, env=self.env, stdout=self.log, stderr=subprocess.STDOUT,
+        )
+        self.wait_until_ready()
+
+    def wait_until_ready(self, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"gunicorn for {self.sha} exited; see {self.root / 'gunicorn.log'}")
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=2)
+                connection.request('GET', '/api/news/')
+                connection.getresponse().read()
+                connection.close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError(f"gunicorn for {self.sha} did not start within {timeout}s")
+
+    def teardown(self, keep=False):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.log:
+            self.log.close()
+        if not keep and self.root.exists():
+            git('worktree', 'remove', '--force', str(self.root))
+
+
+def median_result(runs):
+    """Per scenario, the median of each metric over the runs."""
+    merged = {}
+    for name in ['overall', *runs[0]['scenarios']]:
+        stats = [run['overall'] if name == 'overall' else run['scenarios'][name] for run in runs]
+        merged[name] = {metric: statistics.median(s[metric] for s in stats) for metric in METRICS}
+        merged[name]['requests'] = sum(s['requests'] for s in stats)
+    return merged
+
+
+def format_comparison(base, head, base_label, head_label):
+    lines = [f"{'':24}{base_label:>12}{head_label:>12}{'change':>10}"]
+    for name in base:
+        for metric in METRICS:
+            before, after = base[name][metric], head.get(name, {}).get(metric, 0)
+            change = (after - before) / before * 100 if before else 0
+            lines.append(f"{name + ' ' + metric:24}{before:>12.1f}{after:>12.1f}{change:>+9.1f}%")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare partner API latency/throughput between two commits.")
+    parser.add_argument('base')
+    parser.add_argument('head')
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=5)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=3, help="Alternating runs per commit")
+    parser.add_argument('--workers', type=int, default=3, help="gunicorn workers per commit")
+    parser.add_argument('--keys', type=int, default=20)
+    parser.add_argument('--credits', type=int, default=100_000_000)
+    parser.add_argument('--mix', default=DEFAULT_MIX)
+    parser.add_argument('--page-size', type=int, default=10)
+    parser.add_argument('--max-page', type=int, default=5)
+    parser.add_argument('--output', help="Write all runs and medians as JSON here")
+    parser.add_argument('--keep', action='store_true', help="Keep the worktrees and logs for inspection")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='dn7x7-loadtest-')
+    servers = [
+        CommitServer(label, ref, workdir, args.workers, args.keys, args.credits)
+        for label, ref in (('base', args.base), ('head', args.head))
+    ]
+    runs = {server.label: [] for server in servers}
+    try:
+        for server in servers:
+            print(f"Starting {server.ref} ({server.sha}) on {server.base_url} ...")
+            server.setup()
+
+        for attempt in range(1, args.repeat + 1):
+            for server in servers:
+                driver = Driver(
+                    server.base_url, server.keys, mix=parse_mix(args.mix),
+                    page_size=args.page_size, max_page=args.max_page, seed=attempt,
+                )
+                result = driver.run(duration=args.duration, concurrency=args.concurrency, warmup=args.warmup)
+                runs[server.label].append(result)
+                print(f"\n{server.ref} ({server.sha}), run {attempt}/{args.repeat}\n{format_result(result)}")
+    finally:
+        for server in servers:
+            server.teardown(keep=args.keep)
+        if args.keep:
+            print(f"\nWorktrees and logs kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    base, head = (median_result(runs[server.label]) for server in servers)
+    print(f"\nMedian of {args.repeat} run(s):")
+    print(format_comparison(base, head, servers[0].sha, servers[1].sha))
+
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump({
+                server.label: {
+                    'ref': server.ref, 'sha': server.sha, 'runs': runs[server.label], 'median': median,
+                }
+                for server, median in zip(servers, (base, head))
+            }, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
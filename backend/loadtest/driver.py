@@ -0,0 +1,201 @@
+"""
+Closed-loop HTTP load driver for the partner news API.
+
+Each worker thread holds one keep-alive connection and one API key and sends
+requests back to back, so the numbers include the full middleware path
+(key lookup, limits, credit deduction, call logging). Reports throughput and
+p50/p95/p99 latency per scenario:
+
+    python -m loadtest.driver --base-url http://127.0.0.1:8100 --keys-file keys.txt \\
+        --duration 60 --concurrency 16 --mix list=6,list_category=2,detail=2
+
+Uses only the standard library so it can drive any commit's server.
+"""
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+CATEGORIES = ['indian', 'global', 'blog']
+DEFAULT_MIX = 'list=6,list_category=2,detail=2'
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ('list', 'list_category', 'detail'):
+            raise ValueError(f"Unknown scenario {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, window):
+    latencies = sorted(latency for _, latency in samples)
+    statuses = Counter(str(status) for status, _ in samples)
+    return {
+        'requests': len(samples),
+        'throughput_rps': len(samples) / window if window else 0,
+        'mean_ms': (sum(latencies) / len(latencies) * 1000) if latencies else 0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': (latencies[-1] * 1000) if latencies else 0,
+        'statuses': dict(sorted(statuses.items())),
+    }
+
+
+class Driver:
+    def __init__(self, base_url, keys, mix=None, page_size=10, max_page=5, seed=1, timeout=30):
+        parts = urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip('/')
+        self.keys = keys
+        self.mix = mix or parse_mix(DEFAULT_MIX)
+        self.page_size = page_size
+        self.max_page = max_page
+        self.seed = seed
+        self.timeout = timeout
+        self.post_ids = []
+
+    def connect(self):
+        return self.connection_class(self.host, self.port, timeout=self.timeout)
+
+    def get(self, connection, path, key):
+        connection.request('GET', self.prefix + path, headers={'X-API-KEY': key})
+        response = connection.getresponse()
+        body = response.read()
+        return response.status, body
+
+    def discover_post_ids(self, pages=3):
+        """Collect real post ids for the detail scenario from the first list pages."""
+        connection = self.connect()
+        try:
+            for page in range(1, pages + 1):
+                status, body = self.get(connection, f'/api/news/?page={page}&page_size={self.page_size}', self.keys[0])
+                if status != 200:
+                    break
+                self.post_ids += [post['id'] for post in json.loads(body).get('results', [])]
+        finally:
+            connection.close()
+        if not self.post_ids:
+            self.mix.pop('detail', None)
+
+    def path_for(self, scenario, rng):
+        page = rng.randint(1, self.max_page)
+        if scenario == 'list':
+            return f'/api/news/?page={page}&page_size={self.page_size}'
+        if scenario == 'list_category':
+            return f'/api/news/?category={rng.choice(CATEGORIES)}&page={page}&page_size={self.page_size}'
+        return f'/api/news/{rng.choice(self.post_ids)}/'
+
+    def worker(self, index, measure_from, deadline, samples):
+        rng = random.Random(self.seed * 1000 + index)
+        key = self.keys[index % len(self.keys)]
+        scenarios, weights = zip(*self.mix.items())
+        connection = self.connect()
+        local = []
+        while True:
+            start = time.perf_counter()
+            if start >= deadline:
+                break
+            scenario = rng.choices(scenarios, weights)[0]
+            try:
+                status, _ = self.get(connection, self.path_for(scenario, rng), key)
+            except (OSError, http.client.HTTPException):
+                status = 'error'
+                connection.close()
+                connection = self.connect()
+            if start >= measure_from:
+                local.append((scenario, status, time.perf_counter() - start))
+        connection.close()
+        samples.extend(local)
+
+    def run(self, duration=30, concurrency=8, warmup=5):
+        if not self.post_ids:
+            self.discover_post_ids()
+
+        samples = []
+        measure_from = time.perf_counter() + warmup
+        deadline = measure_from + duration
+        threads = [
+            threading.Thread(target=self.worker, args=(index, measure_from, deadline, samples))
+            for index in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        result = {
+            'config': {
+                'duration': duration, 'concurrency': concurrency, 'warmup': warmup,
+                'mix': self.mix, 'page_size': self.page_size, 'max_page': self.max_page, 'keys': len(self.keys),
+            },
+            'overall': summarize([(status, latency) for _, status, latency in samples], duration),
+            'scenarios': {},
+        }
+        for scenario in self.mix:
+            subset = [(status, latency) for name, status, latency in samples if name == scenario]
+            result['scenarios'][scenario] = summarize(subset, duration)
+        return result
+
+
+def format_result(result):
+    lines = [f"{'scenario':15}{'requests':>10}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}  statuses"]
+    rows = list(result['scenarios'].items()) + [('overall', result['overall'])]
+    for name, stats in rows:
+        statuses = ' '.join(f"{status}:{count}" for status, count in stats['statuses'].items())
+        lines.append(
+            f"{name:15}{stats['requests']:>10}{stats['throughput_rps']:>10.1f}{stats['p50_ms']:>10.1f}"
+            f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}  {statuses}"
+        )
+    return '\n'.join(lines)
+
+
+def read_keys(path):
+    with open(path) as handle:
+        return [line.strip() for line in handle if line.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive load against the partner news API.")
+    parser.add_argument('--base-url', default='http://127.0.0.1:8100')
+    parser.add_argument('--keys-file', default='loadtest_keys.txt')
+    parser.add_argument('--duration', type=float, default=30, help="Measured seconds")
+    parser.add_argument('--warmup', type=float, default=5, help="Unmeasured seconds before that")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="Scenario weights, e.g. list=6,list_category=2,detail=2")
+    parser.add_argument('--page-size', type=int, default=10)
+    parser.add_argument('--max-page', type=int, default=5, help="List pages are drawn from 1..max-page")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="Also write the result as JSON here")
+    args = parser.parse_args(argv)
+
+    driver = Driver(
+        args.base_url, read_keys(args.keys_file), mix=parse_mix(args.mix),
+        page_size=args.page_size, max_page=args.max_page, seed=args.seed,
+    )
+    result = driver.run(duration=args.duration, concurrency=args.concurrency, warmup=args.warmup)
+    print(format_result(result))
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(result, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
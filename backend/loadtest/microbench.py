@@ -0,0 +1,371 @@
+"""
+Micro-benchmarks for the code every partner API call pays for:
+
+    auth        APIKeyAuthentication.authenticate
+    middleware  APICreditMiddleware.process_view and process_response
+    deduct      UserCredit.deduct_credits, alone and from N threads on one account
+    serializer  MinimalNewsSerializer over one page of posts
+
+    python -m loadtest.microbench [--only auth,deduct] [--iterations 2000] [--threads 8] [--json out.json]
+    python -m loadtest.microbench --check    # deduct_credits concurrency correctness only
+
+Everything runs against a throwaway test database created with Django's test
+database machinery, never the configured one. Each benchmark reports the
+queries one call issues, wall time per call and the peak memory allocated
+during a call (tracemalloc).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+from loadtest import setup_django
+from loadtest.driver import percentile
+
+ALLOCATION_SAMPLES = 200
+WARMUP_CALLS = 50
+
+
+def measure(name, call, iterations, setup=None):
+    """
+    Time `call(state)` `iterations` times; `setup()` (untimed) makes a fresh
+    state for each call when given. Returns a result dict.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    def one_call():
+        return call(setup() if setup else None)
+
+    for _ in range(min(WARMUP_CALLS, iterations)):
+        one_call()
+
+    state = setup() if setup else None
+    with CaptureQueriesContext(connection) as captured:
+        call(state)
+    queries = len(captured.captured_queries)
+
+    timings = []
+    for _ in range(iterations):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        call(state)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    # tracemalloc slows everything down, so allocations use their own, smaller sample
+    peaks = []
+    tracemalloc.start()
+    for _ in range(min(ALLOCATION_SAMPLES, iterations)):
+        state = setup() if setup else None
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        call(state)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - baseline)
+    tracemalloc.stop()
+    peaks.sort()
+
+    return {
+        'name': name,
+        'calls': iterations,
+        'queries_per_call': queries,
+        'p50_us': percentile(timings, 0.50) * 1e6,
+        'mean_us': sum(timings) / len(timings) * 1e6,
+        'p95_us': percentile(timings, 0.95) * 1e6,
+        'peak_kib_per_call': percentile(peaks, 0.50) / 1024,
+    }
+
+
+def make_account(purchased_credits):
+    """A user with purchased credits and an API key whose burst, concurrency and daily limits are off."""
+    from accounts.models import User
+    from billing.ledger import adjust_purchased_credits
+    from billing.models import APIKey
+
+    user = User.objects.create_user(email=f'bench-{uuid.uuid4().hex[:12]}@example.com', password=None, name='Bench')
+    credit = adjust_purchased_credits(user, purchased_credits, reason='Micro-benchmark')
+    api_key = APIKey.objects.create(
+        user=user, name='Bench', daily_limit=2_000_000_000,
+        rate_limit_per_second=0, burst_size=0, max_in_flight=0,
+    )
+    return credit, api_key
+
+
+def bench_auth(args):
+    from django.test import RequestFactory
+    from rest_framework.request import Request
+
+    from news.authentication import APIKeyAuthentication
+
+    _, api_key = make_account(10_000_000)
+    request = Request(RequestFactory().get('/api/news/', HTTP_X_API_KEY=api_key.key))
+    authentication = APIKeyAuthentication()
+    return [measure('auth.authenticate', lambda _: authentication.authenticate(request), args.iterations)]
+
+
+def bench_middleware(args):
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+
+    from billing.middleware import APICreditMiddleware
+
+    _, api_key = make_account(10_000_000)
+    factory = RequestFactory()
+    middleware = APICreditMiddleware(lambda request: HttpResponse())
+    response = HttpResponse(b'{}', content_type='application/json')
+
+    def new_request():
+        return factory.get('/api/news/', HTTP_X_API_KEY=api_key.key)
+
+    def viewed_request():
+        request = new_request()
+        middleware.process_view(request, None, (), {})
+        return request
+
+    return [
+        measure(
+            'middleware.process_view',
+            lambda request: middleware.process_view(request, None, (), {}),
+            args.iterations, setup=new_request,
+        ),
+        measure(
+            'middleware.process_response',
+            lambda request: middleware.process_response(request, response),
+            args.iterations, setup=viewed_request,
+        ),
+    ]
+
+
+def run_threads(threads, target):
+    """Run target(index) on `threads` threads started together; returns (seconds, errors)."""
+    from django.db import connections
+
+    barrier = threading.Barrier(threads)
+    errors = []
+
+    def worker(index):
+        try:
+            barrier.wait()
+            target(index)
+        except Exception as exc:
+            errors.append(repr(exc))
+        finally:
+            connections.close_all()
+
+    pool = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return time.perf_counter() - start, errors
+
+
+def bench_deduct(args):
+    from billing.models import UserCredit
+
+    credit, _ = make_account(10_000_000)
+    results = [measure('deduct_credits', lambda _: credit.deduct_credits(1), args.iterations)]
+
+    per_thread = max(1, args.iterations // args.threads)
+    latencies = [[] for _ in range(args.threads)]
+
+    def deduct(index):
+        own = UserCredit.objects.get(pk=credit.pk)
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            own.deduct_credits(1)
+            latencies[index].append(time.perf_counter() - start)
+
+    seconds, errors = run_threads(args.threads, deduct)
+    timings = sorted(latency for thread in latencies for latency in thread)
+    results.append({
+        'name': f'deduct_credits x{args.threads} threads',
+        'calls': len(timings),
+        'queries_per_call': results[0]['queries_per_call'],
+        'p50_us': percentile(timings, 0.50) * 1e6,
+        'mean_us': (sum(timings) / len(timings) * 1e6) if timings else 0,
+        'p95_us': percentile(timings, 0.95) * 1e6,
+        'peak_kib_per_call': results[0]['peak_kib_per_call'],
+        'throughput_per_s': len(timings) / seconds,
+        'errors': errors,
+    })
+    return results
+
+
+def sample_posts(count, rng):
+    """Posts shaped like PartnerNewsListView.map_post_to_format output."""
+    words = 'milk dairy farmers cooperative price procurement cattle fodder export butter cheese ghee'.split()
+    posts = []
+    start = datetime(2026, 1, 1)
+    for n in range(count):
+        paragraphs = [
+            '<p>' + ' '.join(rng.choices(words, k=60)) + ' <a href="https://example.com">link</a></p>'
+            for _ in range(rng.randint(4, 12))
+        ]
+        posts.append({
+            'id': n + 1,
+            'date': start + timedelta(hours=n),
+            'slug': f'post-{n}',
+            'title': ' '.join(rng.choices(words, k=8)).capitalize(),
+            'content': {'rendered': '\n'.join(paragraphs)},
+            'featured_media_url': f'https://dairynews7x7.com/wp-content/uploads/image-{n}.jpg',
+            'categories': ['Indian News', 'Blog'],
+        })
+    return posts
+
+
+def bench_serializer(args):
+    from news.constants import MAX_PAGE_SIZE
+    from news.serializers import MinimalNewsSerializer
+
+    posts = sample_posts(MAX_PAGE_SIZE, random.Random(1))
+    return [measure(
+        f'MinimalNewsSerializer x{len(posts)} posts',
+        lambda _: MinimalNewsSerializer(posts, many=True).data,
+        args.iterations,
+    )]
+
+
+BENCHMARKS = {
+    'auth': bench_auth,
+    'middleware': bench_middleware,
+    'deduct': bench_deduct,
+    'serializer': bench_serializer,
+}
+
+
+def check_deduct_concurrency(threads, attempts_per_thread):
+    """
+    Hammer one account from `threads` threads with more deductions than it can
+    cover and verify no credit is double-spent or driven negative, and that
+    the ledger agrees with the materialized balance. Returns a list of failures.
+    """
+    from django.db.models import Sum
+
+    from billing.ledger import ledger_balance
+    from billing.models import CreditTransaction, UserCredit
+
+    failures = []
+    for label, costs in (('cost 1', [1]), ('mixed costs', [1, 2, 3])):
+        attempts = threads * attempts_per_thread
+        purchased = attempts // 2
+        credit, _ = make_account(purchased)
+        initial = credit.total_available()
+        spent = [0] * threads
+
+        def deduct(index):
+            rng = random.Random(index)
+            own = UserCredit.objects.get(pk=credit.pk)
+            for _ in range(attempts_per_thread):
+                cost = rng.choice(costs)
+                if own.deduct_credits(cost):
+                    spent[index] += cost
+
+        _, errors = run_threads(threads, deduct)
+        credit.refresh_from_db()
+        remaining = credit.total_available()
+        usage = -(CreditTransaction.objects.filter(user_id=credit.user_id, kind=CreditTransaction.USAGE)
+                  .aggregate(total=Sum('amount'))['total'] or 0)
+
+        checks = {
+            'no errors in worker threads': not errors,
+            'balances never negative': credit.purchased_credits >= 0 and credit.daily_free_credits >= 0,
+            'spent + remaining == initial (no double spend)': sum(spent) + remaining == initial,
+            'ledger usage == purchased credits consumed': usage == purchased - credit.purchased_credits,
+            'ledger balance == purchased_credits': ledger_balance(credit.user_id) == credit.purchased_credits,
+        }
+        if costs == [1]:
+            checks['account fully drained'] = remaining == 0
+
+        print(f"deduct_credits, {threads} threads x {attempts_per_thread} attempts, {label}: "
+              f"initial {initial}, spent {sum(spent)}, remaining {remaining}")
+        for description, passed in checks.items():
+            print(f"  [{'ok' if passed else 'FAIL'}] {description}")
+            if not passed:
+                failures.append(f"{label}: {description}")
+        for error in errors[:5]:
+            print(f"  error: {error}")
+    return failures
+
+
+def format_results(results):
+    lines = [f"{'benchmark':34}{'calls':>7}{'queries':>9}{'p50 us':>10}{'mean us':>10}{'p95 us':>10}{'KiB/call':>10}"]
+    for result in results:
+        line = (
+            f"{result['name']:34}{result['calls']:>7}{result['queries_per_call']:>9}"
+            f"{result['p50_us']:>10.1f}{result['mean_us']:>10.1f}{result['p95_us']:>10.1f}"
+            f"{result['peak_kib_per_call']:>10.1f}"
+        )
+        if 'throughput_per_s' in result:
+            line += f"  {result['throughput_per_s']:.0f}/s"
+        if result.get('errors'):
+            line += f"  {len(result['errors'])} error(s)"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def use_isolated_test_database():
+    """
+    Point the default database's test settings at a throwaway SQLite file
+    (when SQLite is in use) with IMMEDIATE transactions, so threads serialize
+    on the write lock like row locks would on MySQL instead of failing.
+    Must run before the first connection is opened.
+    """
+    from django.conf import settings
+
+    database = settings.DATABASES['default']
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        database.setdefault('TEST', {})['NAME'] = os.path.join(tempfile.mkdtemp(), 'microbench.sqlite3')
+        database.setdefault('OPTIONS', {}).update(transaction_mode='IMMEDIATE', timeout=30)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the partner API billing and auth hot path.")
+    parser.add_argument('--only', help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8, help="Threads for the concurrent deduct_credits run")
+    parser.add_argument('--check', action='store_true', help="Only run the deduct_credits concurrency correctness check")
+    parser.add_argument('--check-attempts', type=int, default=200, help="Deduction attempts per thread in --check")
+    parser.add_argument('--json', help="Also write the results as JSON here")
+    args = parser.parse_args(argv)
+
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    setup_django()
+    use_isolated_test_database()
+    from django.test.utils import setup_databases, setup_test_environment, teardown_databases
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+    try:
+        if args.check:
+            failures = check_deduct_concurrency(args.threads, args.check_attempts)
+            if failures:
+                sys.exit(f"{len(failures)} check(s) failed.")
+            return
+
+        results = []
+        for name in names:
+            results += BENCHMARKS[name](args)
+        print(format_results(results))
+        if args.json:
+            with open(args.json, 'w') as handle:
+                json.dump(results, handle, indent=2)
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Seed load-test users, credits and API keys into the default database and
+write the keys to a file for the driver.
+
+Self-contained on purpose: loadtest.compare runs this file by path inside
+checkouts of other commits, so it only touches model fields that exist there
+and imports nothing from the loadtest package.
+"""
+import argparse
+import os
+import sys
+
+EMAIL_TEMPLATE = 'loadtest+{n}@example.com'
+
+# Limits that would otherwise throttle the load generator itself
+UNLIMITED = {
+    'daily_limit': 2_000_000_000,
+    'rate_limit_per_second': 0,
+    'burst_size': 0,
+    'max_in_flight': 0,
+}
+
+
+def seed_keys(count, credits, keep_limits=False):
+    """Create (or reuse) `count` users with `credits` purchased credits and one key each. Returns the keys."""
+    from accounts.models import User
+    from billing.models import APIKey, UserCredit
+
+    key_fields = {field.name for field in APIKey._meta.fields}
+    limits = {} if keep_limits else {name: value for name, value in UNLIMITED.items() if name in key_fields}
+
+    keys = []
+    for n in range(count):
+        email = EMAIL_TEMPLATE.format(n=n)
+        user = User.objects.filter(email=email).first()
+        if user is None:
+            user = User.objects.create_user(email=email, password=None, name=f'Load test {n}')
+
+        credit, _ = UserCredit.objects.get_or_create(user=user)
+        if credit.purchased_credits < credits:
+            top_up = credits - credit.purchased_credits
+            try:
+                # Keeps the credit ledger in step where there is one
+                from billing.ledger import adjust_purchased_credits
+            except ImportError:
+                credit.purchased_credits = credits
+                credit.save()
+            else:
+                adjust_purchased_credits(user, top_up, reason='Load test seed')
+
+        api_key = APIKey.objects.filter(user=user, name='Load test').first()
+        if api_key is None:
+            api_key = APIKey(user=user, name='Load test')
+        for name, value in limits.items():
+            setattr(api_key, name, value)
+        api_key.is_active = True
+        api_key.save()
+        keys.append(api_key.key)
+    return keys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed users, credits and API keys for load tests.")
+    parser.add_argument('--keys', type=int, default=20)
+    parser.add_argument('--credits', type=int, default=100_000_000, help="Purchased credits per user")
+    parser.add_argument('--keep-limits', action='store_true', help="Keep the model's default per-key limits")
+    parser.add_argument('--output', default='loadtest_keys.txt')
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.getcwd())
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dn7x7saas.settings')
+    import django
+    django.setup()
+
+    keys = seed_keys(args.keys, args.credits, keep_limits=args.keep_limits)
+    with open(args.output, 'w') as handle:
+        handle.write('\n'.join(keys) + '\n')
+    print(f"Wrote {len(keys)} API key(s) to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
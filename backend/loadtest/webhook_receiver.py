@@ -0,0 +1,122 @@
+"""
+Local stand-in for a partner's webhook endpoint.
+
+Verifies each delivery's signature, optionally fails or stalls a share of
+them to exercise retries, backoff and dead-lettering, and prints a summary
+on Ctrl-C:
+
+    python -m loadtest.webhook_receiver --port 8200 --secret <endpoint secret> \\
+        --fail-rate 0.3 --delay 0.2
+
+Register http://127.0.0.1:8200/ as an endpoint with WEBHOOK_ALLOW_PRIVATE_URLS=True.
+Uses only the standard library.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Mirrors webhooks.delivery without importing Django
+TIMESTAMP_HEADER = 'X-DN7-Webhook-Timestamp'
+SIGNATURE_HEADER = 'X-DN7-Webhook-Signature'
+DELIVERY_HEADER = 'X-DN7-Webhook-Id'
+MAX_CLOCK_SKEW = 300
+
+
+def expected_signature(secret, timestamp, body):
+    return 'v1=' + hmac.new(secret.encode(), f'{timestamp}.'.encode() + body, hashlib.sha256).hexdigest()
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.results = Counter()
+        self.posts = 0
+        self.deliveries = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def enter(self):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def leave(self, result, delivery_id=None, posts=0):
+        with self.lock:
+            self.in_flight -= 1
+            self.results[result] += 1
+            if delivery_id is not None:
+                self.deliveries.add(delivery_id)
+                self.posts += posts
+
+
+def make_handler(options, stats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            stats.enter()
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            result, status, delivery_id, posts = self.check(body)
+            if options.delay:
+                time.sleep(options.delay)
+            self.send_response(status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            stats.leave(result, delivery_id, posts)
+
+        def check(self, body):
+            timestamp = self.headers.get(TIMESTAMP_HEADER, '')
+            if options.secret:
+                signature = self.headers.get(SIGNATURE_HEADER, '')
+                if not hmac.compare_digest(signature, expected_signature(options.secret, timestamp, body)):
+                    return 'bad_signature', 401, None, 0
+                if not timestamp.isdigit() or abs(time.time() - int(timestamp)) > MAX_CLOCK_SKEW:
+                    return 'stale_timestamp', 401, None, 0
+            if random.random() < options.fail_rate:
+                return 'failed', options.status, None, 0
+            payload = json.loads(body)
+            return 'ok', 200, self.headers.get(DELIVERY_HEADER), len(payload.get('posts', []))
+
+        def log_message(self, format, *args):
+            if options.verbose:
+                super().log_message(format, *args)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8200)
+    parser.add_argument('--secret', default='', help="Endpoint secret; signatures are not checked without it")
+    parser.add_argument('--fail-rate', type=float, default=0, help="Share of deliveries answered with --status")
+    parser.add_argument('--status', type=int, default=503, help="Status code for failed deliveries")
+    parser.add_argument('--delay', type=float, default=0, help="Seconds to wait before answering")
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    options = parser.parse_args()
+
+    stats = Stats()
+    server = ThreadingHTTPServer((options.host, options.port), make_handler(options, stats))
+    print(f"Receiving webhooks on http://{options.host}:{options.port}/ (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    print(json.dumps({
+        'requests': dict(stats.results),
+        'unique_deliveries': len(stats.deliveries),
+        'posts': stats.posts,
+        'max_concurrent': stats.max_in_flight,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
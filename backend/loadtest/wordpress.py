@@ -0,0 +1,294 @@
+"""
+Synthetic WordPress data for load tests.
+
+Creates the five tables the news API reads (wp_posts, wp_postmeta, wp_terms,
+wp_term_taxonomy, wp_term_relationships) with WordPress core's indexes and
+fills them with posts, featured-image attachments, categories and tags.
+Runs against a Django database alias (MySQL or SQLite), by default news_db:
+
+    NEWS_DB_ENGINE=django.db.backends.sqlite3 NEWS_DB_NAME=/tmp/wp.sqlite3 \\
+        python -m loadtest.wordpress --posts 1000000
+
+Output is deterministic for a given --seed, so runs are comparable.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from loadtest import setup_django
+
+TABLES = ['wp_posts', 'wp_postmeta', 'wp_terms', 'wp_term_taxonomy', 'wp_term_relationships']
+
+# Column types valid on both MySQL and SQLite (SQLite maps them by affinity)
+SCHEMA = {
+    'wp_posts': """
+        ID BIGINT UNSIGNED NOT NULL PRIMARY KEY,
+        post_author BIGINT UNSIGNED NOT NULL DEFAULT 0,
+        post_date DATETIME NOT NULL,
+        post_date_gmt DATETIME NOT NULL,
+        post_content LONGTEXT NOT NULL,
+        post_title TEXT NOT NULL,
+        post_status VARCHAR(20) NOT NULL DEFAULT 'publish',
+        post_name VARCHAR(200) NOT NULL DEFAULT '',
+        post_modified DATETIME NOT NULL,
+        post_modified_gmt DATETIME NOT NULL,
+        post_parent BIGINT UNSIGNED NOT NULL DEFAULT 0,
+        guid VARCHAR(255) NOT NULL DEFAULT '',
+        post_type VARCHAR(20) NOT NULL DEFAULT 'post',
+        post_mime_type VARCHAR(100) NOT NULL DEFAULT ''
+    """,
+    'wp_postmeta': """
+        meta_id BIGINT UNSIGNED NOT NULL PRIMARY KEY,
+        post_id BIGINT UNSIGNED NOT NULL DEFAULT 0,
+        meta_key VARCHAR(191) DEFAULT NULL,
+        meta_value LONGTEXT
+    """,
+    'wp_terms': """
+        term_id BIGINT UNSIGNED NOT NULL PRIMARY KEY,
+        name VARCHAR(191) NOT NULL DEFAULT '',
+        slug VARCHAR(191) NOT NULL DEFAULT '',
+        term_group BIGINT NOT NULL DEFAULT 0
+    """,
+    'wp_term_taxonomy': """
+        term_taxonomy_id BIGINT UNSIGNED NOT NULL PRIMARY KEY,
+        term_id BIGINT UNSIGNED NOT NULL DEFAULT 0,
+        taxonomy VARCHAR(32) NOT NULL DEFAULT '',
+        description LONGTEXT,
+        parent BIGINT UNSIGNED NOT NULL DEFAULT 0,
+        count BIGINT NOT NULL DEFAULT 0
+    """,
+    'wp_term_relationships': """
+        object_id BIGINT UNSIGNED NOT NULL DEFAULT 0,
+        term_taxonomy_id BIGINT UNSIGNED NOT NULL DEFAULT 0,
+        term_order INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (object_id, term_taxonomy_id)
+    """,
+}
+
+# WordPress core's secondary indexes; created after the bulk load
+INDEXES = [
+    'CREATE INDEX post_name ON wp_posts (post_name)',
+    'CREATE INDEX type_status_date ON wp_posts (post_type, post_status, post_date, ID)',
+    'CREATE INDEX post_parent ON wp_posts (post_parent)',
+    'CREATE INDEX post_author ON wp_posts (post_author)',
+    'CREATE INDEX post_id ON wp_postmeta (post_id)',
+    'CREATE INDEX meta_key ON wp_postmeta (meta_key)',
+    'CREATE INDEX slug ON wp_terms (slug)',
+    'CREATE INDEX name ON wp_terms (name)',
+    'CREATE UNIQUE INDEX term_id_taxonomy ON wp_term_taxonomy (term_id, taxonomy)',
+    'CREATE INDEX taxonomy ON wp_term_taxonomy (taxonomy)',
+    'CREATE INDEX term_taxonomy_id ON wp_term_relationships (term_taxonomy_id)',
+]
+
+# The categories news/constants.py maps to, and how often posts carry them
+MAPPED_CATEGORIES = [(1, 'Blog', 0.1), (23, 'Indian News', 0.35), (24, 'Global News', 0.35)]
+EXTRA_TERM_START = 100
+
+WORDS = (
+    "milk dairy farmers cooperative price procurement cattle fodder export import butter cheese "
+    "ghee powder market demand supply state government policy scheme subsidy yield breed veterinary "
+    "chilling plant collection centre quality fat snf litre season monsoon production growth "
+    "industry brand retail consumer processing technology sustainability carbon methane feed"
+).split()
+
+
+def placeholder(connection):
+    return '?' if connection.vendor == 'sqlite' else '%s'
+
+
+def paragraph_pool(rng, size=500):
+    """Pre-built paragraphs; post bodies are stitched from these, so generating millions stays fast."""
+    pool = []
+    for _ in range(size):
+        sentences = []
+        for _ in range(rng.randint(3, 7)):
+            words = rng.choices(WORDS, k=rng.randint(8, 18))
+            sentences.append(' '.join(words).capitalize() + '.')
+        pool.append('<p>' + ' '.join(sentences) + '</p>')
+    return pool
+
+
+def tables_exist(connection):
+    return bool(set(TABLES) & set(connection.introspection.table_names()))
+
+
+def create_schema(raw, connection, drop=False):
+    suffix = ' ENGINE=InnoDB DEFAULT CHARSET=utf8mb4' if connection.vendor == 'mysql' else ''
+    for table in TABLES:
+        if drop:
+            raw.execute(f'DROP TABLE IF EXISTS {table}')
+        raw.execute(f'CREATE TABLE {table} ({SCHEMA[table]}){suffix}')
+
+
+def generate(connection, posts, extra_categories=20, tags=200, seed=42, batch_size=5000,
+             paragraphs=(2, 8), thumbnail_ratio=0.8, years=5, drop=False, progress=None):
+    """
+    Create the schema and load `posts` posts (plus one attachment per
+    thumbnailed post) through a raw DB-API cursor, batch by batch.
+    Post and attachment ids interleave and dates rise with the id, as on a
+    real site. Returns a dict of row counts.
+    """
+    if connection.vendor not in ('mysql', 'sqlite'):
+        raise ValueError(f"Unsupported database vendor {connection.vendor!r} (use MySQL or SQLite).")
+
+    rng = random.Random(seed)
+    pool = paragraph_pool(rng)
+    p = placeholder(connection)
+
+    connection.ensure_connection()
+    raw = connection.connection.cursor()
+    if connection.vendor == 'sqlite':
+        raw.execute('PRAGMA journal_mode=MEMORY')
+        raw.execute('PRAGMA synchronous=OFF')
+    else:
+        raw.execute('SET unique_checks=0')
+
+    create_schema(raw, connection, drop=drop)
+
+    # Terms: the mapped categories, extra categories and tags (term_taxonomy_id == term_id)
+    terms = [(term_id, name, 'category') for term_id, name, _ in MAPPED_CATEGORIES]
+    extra_ids = list(range(EXTRA_TERM_START, EXTRA_TERM_START + extra_categories))
+    tag_ids = list(range(EXTRA_TERM_START + extra_categories, EXTRA_TERM_START + extra_categories + tags))
+    terms += [(term_id, f'Category {term_id}', 'category') for term_id in extra_ids]
+    terms += [(term_id, f'Tag {term_id}', 'post_tag') for term_id in tag_ids]
+    raw.executemany(
+        f'INSERT INTO wp_terms (term_id, name, slug, term_group) VALUES ({p}, {p}, {p}, 0)',
+        [(term_id, name, name.lower().replace(' ', '-')) for term_id, name, _ in terms],
+    )
+    raw.executemany(
+        f'INSERT INTO wp_term_taxonomy (term_taxonomy_id, term_id, taxonomy, description, parent, count) '
+        f'VALUES ({p}, {p}, {p}, \'\', 0, 0)',
+        [(term_id, term_id, taxonomy) for term_id, _, taxonomy in terms],
+    )
+    connection.connection.commit()
+
+    post_sql = (
+        'INSERT INTO wp_posts (ID, post_author, post_date, post_date_gmt, post_content, post_title, '
+        'post_status, post_name, post_modified, post_modified_gmt, post_parent, guid, post_type, post_mime_type) '
+        f'VALUES ({", ".join([p] * 14)})'
+    )
+    meta_sql = f'INSERT INTO wp_postmeta (meta_id, post_id, meta_key, meta_value) VALUES ({p}, {p}, {p}, {p})'
+    rel_sql = f'INSERT INTO wp_term_relationships (object_id, term_taxonomy_id, term_order) VALUES ({p}, {p}, 0)'
+
+    start = datetime(2026, 1, 1) - timedelta(days=365 * years)
+    step = timedelta(days=365 * years) / max(posts, 1)
+    counts = {'posts': 0, 'attachments': 0, 'postmeta': 0, 'relationships': 0}
+    next_id = 1
+    meta_id = 1
+
+    for batch_start in range(0, posts, batch_size):
+        post_rows, meta_rows, rel_rows = [], [], []
+        for n in range(batch_start, min(batch_start + batch_size, posts)):
+            published = start + step * n + timedelta(seconds=rng.randint(0, 3600))
+            date = published.strftime('%Y-%m-%d %H:%M:%S')
+            roll = rng.random()
+            status = 'publish' if roll < 0.95 else ('draft' if roll < 0.98 else 'private')
+
+            attachment_id = None
+            if rng.random() < thumbnail_ratio:
+                attachment_id = next_id
+                next_id += 1
+                post_rows.append((
+                    attachment_id, 1, date, date, '', f'image-{n}', 'inherit', f'image-{n}', date, date, 0,
+                    f'https://dairynews7x7.com/wp-content/uploads/{published:%Y/%m}/image-{n}.jpg',
+                    'attachment', 'image/jpeg',
+                ))
+                counts['attachments'] += 1
+
+            post_id = next_id
+            next_id += 1
+            title = ' '.join(rng.choices(WORDS, k=rng.randint(5, 11))).capitalize()
+            content = '\n'.join(rng.choices(pool, k=rng.randint(*paragraphs)))
+            post_rows.append((
+                post_id, rng.randint(1, 20), date, date, content, title, status, f'post-{n}', date, date, 0,
+                f'https://dairynews7x7.com/?p={post_id}', 'post', '',
+            ))
+            counts['posts'] += 1
+
+            if attachment_id:
+                meta_rows.append((meta_id, post_id, '_thumbnail_id', str(attachment_id)))
+                meta_id += 1
+            meta_rows.append((meta_id, post_id, '_edit_last', '1'))
+            meta_id += 1
+
+            categories = {term_id for term_id, _, weight in MAPPED_CATEGORIES if rng.random() < weight}
+            if not categories or rng.random() < 0.3:
+                categories.add(rng.choice(extra_ids) if extra_ids else 1)
+            post_terms = categories | set(rng.sample(tag_ids, k=min(len(tag_ids), rng.randint(0, 4))))
+            rel_rows += [(post_id, term_id) for term_id in sorted(post_terms)]
+
+        raw.executemany(post_sql, post_rows)
+        raw.executemany(meta_sql, meta_rows)
+        raw.executemany(rel_sql, rel_rows)
+        connection.connection.commit()
+        counts['postmeta'] += len(meta_rows)
+        counts['relationships'] += len(rel_rows)
+        if progress:
+            progress(counts['posts'], posts)
+
+    for statement in INDEXES:
+        raw.execute(statement)
+    raw.execute(
+        'UPDATE wp_term_taxonomy SET count = ('
+        'SELECT COUNT(*) FROM wp_term_relationships tr '
+        'WHERE tr.term_taxonomy_id = wp_term_taxonomy.term_taxonomy_id)'
+    )
+    if connection.vendor == 'mysql':
+        raw.execute('SET unique_checks=1')
+        for table in TABLES:
+            raw.execute(f'ANALYZE TABLE {table}')
+            raw.fetchall()
+    else:
+        raw.execute('ANALYZE')
+    connection.connection.commit()
+    raw.close()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic WordPress database for load tests.")
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--categories', type=int, default=20, help="Categories besides the three the API maps")
+    parser.add_argument('--tags', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--thumbnail-ratio', type=float, default=0.8)
+    parser.add_argument('--database', default='news_db', help="Django database alias to load into")
+    parser.add_argument('--drop', action='store_true', help="Drop existing wp_* tables first")
+    parser.add_argument('--noinput', action='store_true', help="Do not ask before dropping tables")
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.db import connections
+
+    connection = connections[args.database]
+    settings_dict = connection.settings_dict
+    host = '' if connection.vendor == 'sqlite' else f"{settings_dict.get('HOST') or 'localhost'}/"
+    target = f"{connection.vendor}:{host}{settings_dict['NAME']}"
+
+    if tables_exist(connection):
+        if not args.drop:
+            sys.exit(f"{target} already has WordPress tables; pass --drop to replace them.")
+        if not args.noinput:
+            answer = input(f"Drop and regenerate the WordPress tables in {target}? [y/N] ")
+            if answer.lower() != 'y':
+                sys.exit("Aborted.")
+
+    started = time.monotonic()
+
+    def progress(done, total):
+        rate = done / max(time.monotonic() - started, 1e-6)
+        print(f"\r{done}/{total} posts ({rate:,.0f}/s)", end='', flush=True)
+
+    counts = generate(
+        connection, args.posts, extra_categories=args.categories, tags=args.tags, seed=args.seed,
+        batch_size=args.batch_size, thumbnail_ratio=args.thumbnail_ratio, drop=args.drop, progress=progress,
+    )
+    print(f"\nLoaded into {target} in {time.monotonic() - started:.1f}s: "
+          + ', '.join(f"{count:,} {name}" for name, count in counts.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'recipients', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['subject', 'to']
+    readonly_fields = [field.name for field in OutboundEmail._meta.fields]
+    actions = ['retry_now']
+
+    @admin.display(description='To')
+    def recipients(self, obj):
+        return ', '.join(obj.to)
+
+    @admin.action(description='Retry selected emails now')
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=OutboundEmail.SENT).update(
+            status=OutboundEmail.PENDING, next_attempt_at=timezone.now(), locked_until=None,
+        )
+        self.message_user(request, f"{updated} email(s) queued for another attempt.")
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from mailer.queue import process_queue
+
+
+class Command(BaseCommand):
+    help = "Deliver emails queued by mailer.backends.QueuedEmailBackend through EMAIL_DELIVERY_BACKEND."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Delivery threads (one connection each)")
+        parser.add_argument('--batch-size', type=int, default=20, help="Emails sent per connection")
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help="Keep running and poll the queue every N seconds while it is empty (0 = run once).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            claimed, sent = process_queue(workers=options['workers'], batch_size=options['batch_size'])
+            if claimed or not options['interval']:
+                self.stdout.write(f"Sent {sent} of {claimed} queued email(s).")
+            if not options['interval']:
+                break
+            # A full claim means there is likely more waiting; go again right away
+            if claimed < options['workers'] * options['batch_size']:
+                time.sleep(options['interval'])
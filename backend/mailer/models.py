@@ -0,0 +1,95 @@
+import base64
+
+from django.core.mail import EmailMultiAlternatives
+from django.db import models
+from django.utils import timezone
+
+
+class OutboundEmail(models.Model):
+    """
+    An email waiting for (or done with) delivery by `send_queued_email`.
+    Written by mailer.backends.QueuedEmailBackend instead of talking to SMTP
+    in the request.
+    """
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    subject = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(default=list)
+    cc = models.JSONField(default=list)
+    bcc = models.JSONField(default=list)
+    reply_to = models.JSONField(default=list)
+    headers = models.JSONField(default=dict)
+    body = models.TextField(blank=True)
+    content_subtype = models.CharField(max_length=20, default='plain')
+    alternatives = models.JSONField(default=list, help_text="[content, mimetype] pairs")
+    attachments = models.JSONField(default=list, help_text="[filename, base64 content, mimetype] triples")
+
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # A SENDING row whose lease ran out (the worker died) is picked up again
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
+
+    @classmethod
+    def from_message(cls, message):
+        attachments = []
+        for attachment in message.attachments:
+            if not isinstance(attachment, tuple):
+                raise ValueError("Queued emails only support (filename, content, mimetype) attachments.")
+            filename, content, mimetype = attachment
+            if isinstance(content, str):
+                content = content.encode()
+            attachments.append([filename, base64.b64encode(content).decode('ascii'), mimetype])
+
+        return cls(
+            subject=message.subject,
+            from_email=message.from_email,
+            to=list(message.to),
+            cc=list(message.cc),
+            bcc=list(message.bcc),
+            reply_to=list(message.reply_to),
+            headers=dict(message.extra_headers),
+            body=message.body,
+            content_subtype=message.content_subtype,
+            alternatives=[list(alternative) for alternative in getattr(message, 'alternatives', [])],
+            attachments=attachments,
+        )
+
+    def to_message(self, connection=None):
+        message = EmailMultiAlternatives(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email,
+            to=self.to,
+            cc=self.cc,
+            bcc=self.bcc,
+            reply_to=self.reply_to,
+            headers=self.headers,
+            alternatives=[tuple(alternative) for alternative in self.alternatives],
+            connection=connection,
+        )
+        message.content_subtype = self.content_subtype
+        for filename, content, mimetype in self.attachments:
+            message.attach(filename, base64.b64decode(content), mimetype)
+        return message
+
+    def __str__(self):
+        return f"{self.status} | {', '.join(self.to)} | {self.subject[:60]}"
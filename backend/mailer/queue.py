@@ -0,0 +1,122 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from monitoring.metrics import email_deliveries
+from .models import OutboundEmail
+
+MAX_ERROR_LENGTH = 2000
+
+
+def claim(limit):
+    """
+    Mark up to `limit` due emails as SENDING for this worker and return them.
+    Rows locked by another worker's claim are skipped, so several
+    `send_queued_email` processes can share the queue.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status=OutboundEmail.PENDING) | Q(status=OutboundEmail.SENDING, locked_until__lt=now),
+                next_attempt_at__lte=now,
+            )
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        OutboundEmail.objects.filter(id__in=ids).update(
+            status=OutboundEmail.SENDING,
+            locked_until=now + timedelta(seconds=settings.EMAIL_QUEUE_LEASE_SECONDS),
+        )
+    return list(OutboundEmail.objects.filter(id__in=ids).order_by('id'))
+
+
+def retry_delay(attempts):
+    """Exponential backoff with +-20% jitter, capped at EMAIL_QUEUE_RETRY_MAX_SECONDS."""
+    delay = min(settings.EMAIL_QUEUE_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.EMAIL_QUEUE_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def mark_sent(email):
+    email.status = OutboundEmail.SENT
+    email.attempts += 1
+    email.sent_at = timezone.now()
+    email.locked_until = None
+    email.last_error = ''
+    email.save(update_fields=['status', 'attempts', 'sent_at', 'locked_until', 'last_error'])
+    email_deliveries.labels('sent').inc()
+
+
+def mark_failed(email, error):
+    email.attempts += 1
+    email.last_error = repr(error)[:MAX_ERROR_LENGTH]
+    email.locked_until = None
+    if email.attempts >= settings.EMAIL_QUEUE_MAX_ATTEMPTS:
+        email.status = OutboundEmail.FAILED
+        email_deliveries.labels('failed').inc()
+    else:
+        email.status = OutboundEmail.PENDING
+        email.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay(email.attempts))
+        email_deliveries.labels('retry').inc()
+    email.save(update_fields=['status', 'attempts', 'last_error', 'locked_until', 'next_attempt_at'])
+
+
+def deliver(emails):
+    """
+    Send `emails` over a single EMAIL_DELIVERY_BACKEND connection (one SMTP
+    session for the whole batch). Returns the number sent.
+    """
+    connection = get_connection(settings.EMAIL_DELIVERY_BACKEND)
+    sent = 0
+    try:
+        try:
+            connection.open()
+        except Exception as exc:
+            for email in emails:
+                mark_failed(email, exc)
+            return 0
+
+        for email in emails:
+            try:
+                connection.send_messages([email.to_message(connection)])
+            except Exception as exc:
+                mark_failed(email, exc)
+                # The session may be broken; the next send_messages() reconnects
+                connection.close()
+            else:
+                mark_sent(email)
+                sent += 1
+    finally:
+        connection.close()
+    return sent
+
+
+def _deliver_in_thread(emails):
+    try:
+        return deliver(emails)
+    finally:
+        connections.close_all()
+
+
+def process_queue(workers=4, batch_size=20):
+    """
+    Claim up to workers * batch_size due emails and deliver them from `workers`
+    threads, one batch (and one connection) per thread.
+    Returns (claimed, sent).
+    """
+    emails = claim(workers * batch_size)
+    if not emails:
+        return 0, 0
+    batches = [emails[start:start + batch_size] for start in range(0, len(emails), batch_size)]
+    if len(batches) == 1:
+        return len(emails), deliver(batches[0])
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return len(emails), sum(pool.map(_deliver_in_thread, batches))
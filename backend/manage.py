@@ -7,6 +7,10 @@ import sys
 def main():
     """Run administrative tasks."""
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dn7x7saas.settings')
+    # The Prometheus multiprocess directory belongs to the gunicorn workers:
+    # command processes would leave files there that are never marked dead
+    # and lose their own to the rmtree on the next gunicorn start.
+    os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
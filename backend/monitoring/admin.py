@@ -0,0 +1,21 @@
+from django.contrib import admin
+
+from .models import SlowQuery
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ['statement_preview', 'database', 'count', 'mean_ms', 'max_ms', 'last_seen']
+    list_filter = ['database']
+    search_fields = ['statement', 'fingerprint']
+    readonly_fields = [field.name for field in SlowQuery._meta.fields]
+
+    @admin.display(description='Statement')
+    def statement_preview(self, obj):
+        return obj.statement[:120]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import ExpressionWrapper, F, FloatField
+
+from monitoring.models import SlowQuery
+
+ORDERINGS = {
+    'total': '-total_ms',
+    'mean': '-mean',
+    'max': '-max_ms',
+    'count': '-count',
+    'recent': '-last_seen',
+}
+
+
+class Command(BaseCommand):
+    help = "Show slow queries captured on the watched databases (SLOW_QUERY_DATABASES), grouped by fingerprint."
+
+    def add_arguments(self, parser):
+        parser.add_argument('fingerprint', nargs='?', help="Show one statement in full, with its last parameters and EXPLAIN plan")
+        parser.add_argument('--order', choices=ORDERINGS, default='total')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--database', help="Only statements seen on this alias")
+        parser.add_argument('--reset', action='store_true', help="Delete everything captured so far")
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(f"Deleted {deleted} slow query record(s).")
+            return
+
+        if options['fingerprint']:
+            return self.show(options['fingerprint'])
+
+        queries = SlowQuery.objects.annotate(
+            mean=ExpressionWrapper(F('total_ms') / F('count'), output_field=FloatField())
+        )
+        if options['database']:
+            queries = queries.filter(database=options['database'])
+        queries = queries.order_by(ORDERINGS[options['order']])[:options['limit']]
+
+        self.stdout.write(f"{'fingerprint':12} {'db':8} {'count':>7} {'mean ms':>9} {'max ms':>9} {'total s':>9}  statement")
+        for query in queries:
+            self.stdout.write(
+                f"{query.fingerprint[:12]} {query.database:8} {query.count:>7} {query.mean:>9.1f} "
+                f"{query.max_ms:>9.1f} {query.total_ms / 1000:>9.1f}  {query.statement[:100]}"
+            )
+
+    def show(self, prefix):
+        matches = list(SlowQuery.objects.filter(fingerprint__startswith=prefix)[:2])
+        if not matches:
+            raise CommandError(f"No slow query with fingerprint {prefix!r}.")
+        if len(matches) > 1:
+            raise CommandError(f"Fingerprint prefix {prefix!r} is ambiguous.")
+
+        query = matches[0]
+        self.stdout.write(f"Fingerprint: {query.fingerprint}")
+        self.stdout.write(f"Database:    {query.database}")
+        self.stdout.write(
+            f"Seen:        {query.count}x between {query.first_seen:%Y-%m-%d %H:%M} and {query.last_seen:%Y-%m-%d %H:%M}"
+        )
+        self.stdout.write(f"Duration:    mean {query.mean_ms():.1f} ms, max {query.max_ms:.1f} ms, last {query.last_ms:.1f} ms")
+        self.stdout.write(f"\nStatement:\n{query.statement}")
+        self.stdout.write(f"\nLast SQL:\n{query.last_sql}\nParams: {query.last_params}")
+        if query.plan:
+            self.stdout.write(f"\nPlan ({query.plan_captured_at:%Y-%m-%d %H:%M}):\n{query.plan}")
+        else:
+            self.stdout.write("\nNo plan captured yet.")
@@ -0,0 +1,118 @@
+"""
+Prometheus metrics.
+
+With PROMETHEUS_MULTIPROC_DIR set (see gunicorn.conf.py) every worker writes
+its samples to files in that directory and the /metrics view aggregates them,
+so a scrape sees the totals for all workers rather than whichever one answered.
+"""
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+    generate_latest, multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+MULTIPROCESS = bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+if MULTIPROCESS:
+    # gunicorn.conf.py prepares it for its workers, but uvicorn also imports
+    # the metrics and writes its samples there (manage.py unsets it)
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+http_request_duration = Histogram(
+    'dn7x7_http_request_duration_seconds',
+    'Request latency by URL route and response status.',
+    ['method', 'route', 'status'],
+    buckets=LATENCY_BUCKETS,
+)
+db_query_duration = Histogram(
+    'dn7x7_db_query_duration_seconds',
+    'SQL query latency per database alias.',
+    ['database'],
+    buckets=QUERY_BUCKETS,
+)
+cache_requests = Counter(
+    'dn7x7_cache_requests_total',
+    'Application cache lookups by cache and result (hit/miss).',
+    ['cache', 'result'],
+)
+credit_lock_wait = Histogram(
+    'dn7x7_credit_lock_wait_seconds',
+    'Time deduct_credits() waits to lock the UserCredit row.',
+    buckets=QUERY_BUCKETS,
+)
+api_rejections = Counter(
+    'dn7x7_api_rejections_total',
+    'Partner API requests rejected by APICreditMiddleware, by reason.',
+    ['reason', 'status'],
+)
+call_log_write_failures = Counter(
+    'dn7x7_call_log_write_failures_total',
+    'APICallLog rows that could not be written.',
+)
+credit_refund_failures = Counter(
+    'dn7x7_credit_refund_failures_total',
+    'Credits of failed (5xx) partner API calls that could not be refunded.',
+)
+circuit_transitions = Counter(
+    'dn7x7_circuit_transitions_total',
+    'Circuit breaker state changes, by circuit and the state entered.',
+    ['circuit', 'state'],
+)
+email_deliveries = Counter(
+    'dn7x7_email_deliveries_total',
+    'Queued email delivery attempts by result (sent, retry, failed).',
+    ['result'],
+)
+webhook_deliveries = Counter(
+    'dn7x7_webhook_deliveries_total',
+    'Webhook delivery attempts by result (delivered, retry, dead).',
+    ['result'],
+)
+stream_events = Counter(
+    'dn7x7_stream_events_total',
+    'News stream (SSE) activity by kind: connected, delivered, reset, overflow, insufficient_credits.',
+    ['kind'],
+)
+degraded_responses = Counter(
+    'dn7x7_degraded_responses_total',
+    'Partner API responses served without news_db: stale copies or 503s.',
+    ['kind'],
+)
+
+
+class UsageRollupBacklogCollector:
+    """Call logs written but not yet folded into the usage rollups, read at scrape time."""
+
+    name = 'dn7x7_call_log_rollup_backlog'
+    documentation = 'APICallLog rows waiting for rollup_usage.'
+
+    def describe(self):
+        # Lets the registry learn the name without running collect() (and its query)
+        yield GaugeMetricFamily(self.name, self.documentation)
+
+    def collect(self):
+        from billing.rollups import rollup_backlog
+
+        yield GaugeMetricFamily(self.name, self.documentation, value=rollup_backlog())
+
+
+usage_rollup_backlog = UsageRollupBacklogCollector()
+
+
+def render_metrics():
+    """(body, content_type) of the text exposition: this process, or every worker in multiprocess mode."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(usage_rollup_backlog)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+if not MULTIPROCESS:
+    REGISTRY.register(usage_rollup_backlog)
@@ -0,0 +1,109 @@
+import hmac
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics
+from .timing import collect
+
+logger = logging.getLogger('monitoring.timing')
+
+DEBUG_KEY_HEADER = 'X-Debug-Timing'
+
+
+class ServerTimingMiddleware:
+    """
+    Records per-phase timings (see monitoring.timing.phase) and per-database
+    query counts/durations for every request, emits them as a Server-Timing
+    header to staff users / holders of the debug key, and logs one structured
+    line per request.
+
+    Removed from the middleware chain entirely unless SERVER_TIMING_ENABLED is set.
+    Should be first in MIDDLEWARE so the total covers all other middleware.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with collect() as timings:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(timings.query_wrapper(alias)))
+                response = self.get_response(request)
+            total = timings.elapsed()
+
+        if self.should_expose(request):
+            response['Server-Timing'] = timings.header_value(total)
+
+        if total * 1000 >= settings.SERVER_TIMING_LOG_MIN_MS:
+            logger.info(json.dumps({
+                'event': 'request_timing',
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'api_key_id': getattr(getattr(request, 'api_key_instance', None), 'pk', None),
+                **timings.as_dict(total),
+            }))
+        return response
+
+    def should_expose(self, request):
+        if settings.SERVER_TIMING_PUBLIC:
+            return True
+
+        debug_key = settings.SERVER_TIMING_DEBUG_KEY
+        provided = request.headers.get(DEBUG_KEY_HEADER)
+        if debug_key and provided and hmac.compare_digest(provided, debug_key):
+            return True
+
+        # Set by AuthenticationMiddleware, DRF authentication or APICreditMiddleware
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_authenticated and user.is_staff)
+
+
+class PrometheusMetricsMiddleware:
+    """
+    Observes request latency per route/status and query latency per database
+    into the Prometheus histograms served at /metrics.
+    Removed from the middleware chain unless METRICS_ENABLED is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.query_wrappers = {alias: self.query_wrapper(alias) for alias in connections}
+
+    @staticmethod
+    def query_wrapper(alias):
+        histogram = metrics.db_query_duration.labels(alias)
+
+        def wrapper(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias, wrapper in self.query_wrappers.items():
+                stack.enter_context(connections[alias].execute_wrapper(wrapper))
+            response = self.get_response(request)
+
+        # The route pattern (not the raw path) keeps label cardinality bounded
+        match = request.resolver_match
+        route = match.route if match else 'unmatched'
+        metrics.http_request_duration.labels(
+            request.method, route, str(response.status_code)
+        ).observe(time.perf_counter() - start)
+        return response
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.9 on 2026-10-19 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=40, unique=True)),
+                ('database', models.CharField(max_length=50)),
+                ('statement', models.TextField(help_text='Normalized SQL')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('max_ms', models.FloatField(default=0)),
+                ('last_sql', models.TextField()),
+                ('last_params', models.TextField(blank=True)),
+                ('last_ms', models.FloatField(default=0)),
+                ('plan', models.TextField(blank=True, help_text='Latest sampled EXPLAIN output')),
+                ('plan_captured_at', models.DateTimeField(blank=True, null=True)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+                ('last_seen', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'slow queries',
+                'ordering': ['-total_ms'],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import models
+
+
+class SlowQuery(models.Model):
+    """
+    Slow statements aggregated by fingerprint (the SQL with literals and
+    parameters normalized away). Written by monitoring.slow_queries.
+    """
+    fingerprint = models.CharField(max_length=40, unique=True)
+    database = models.CharField(max_length=50)
+    statement = models.TextField(help_text="Normalized SQL")
+
+    count = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+
+    # The most recent occurrence, with its real parameters
+    last_sql = models.TextField()
+    last_params = models.TextField(blank=True)
+    last_ms = models.FloatField(default=0)
+
+    plan = models.TextField(blank=True, help_text="Latest sampled EXPLAIN output")
+    plan_captured_at = models.DateTimeField(null=True, blank=True)
+
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-total_ms']
+        verbose_name_plural = 'slow queries'
+
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0
+
+    def __str__(self):
+        return f"[{self.database}] {self.count}x avg {self.mean_ms():.0f}ms {self.statement[:80]}"
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connections
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+logger = logging.getLogger('monitoring.slow_queries')
+
+MAX_PARAMS_LENGTH = 2000
+# Slow queries waiting to be written; past this, new ones are only logged
+MAX_PENDING = 1000
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_IN_LIST = re.compile(r"\bin\s*\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# Set in the writer thread, so its own statements (EXPLAIN, SlowQuery writes) are not captured
+_local = threading.local()
+
+
+def normalize(sql):
+    """SQL with literals, parameters and IN-list lengths folded away, so equivalent statements compare equal."""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _WHITESPACE.sub(' ', sql).strip().lower()
+    return _IN_LIST.sub('in (...)', sql)
+
+
+def fingerprint(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()
+
+
+class SlowQueryRecorder:
+    """
+    execute_wrapper for one database alias. Statements slower than
+    SLOW_QUERY_THRESHOLD_MS are logged with their parameters and folded into
+    SlowQuery by fingerprint; for a sample of them (always the first one of a
+    fingerprint) the EXPLAIN plan is captured too.
+
+    Only the log line is written by the thread that ran the query. SlowQuery
+    rows and plans are written by one background thread on its own database
+    connections, after the caller's transaction has committed, so they add no
+    latency to the request and can never fail or commit as part of it.
+    """
+
+    lock = threading.Lock()
+    writer = None
+    pending = 0
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_local, 'paused', False):
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            if duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+                try:
+                    self.capture(sql, params, many, duration_ms, context['connection'])
+                except Exception:
+                    # Never let monitoring break the query it is watching
+                    logger.exception("Could not record slow query")
+
+    def capture(self, sql, params, many, duration_ms, connection):
+        params_text = repr(params)[:MAX_PARAMS_LENGTH]
+        logger.warning(json.dumps({
+            'event': 'slow_query',
+            'database': self.alias,
+            'duration_ms': round(duration_ms, 2),
+            'fingerprint': fingerprint(normalize(sql)),
+            'sql': sql,
+            'params': params_text,
+        }))
+
+        # Queued once the caller's transaction is over (at once outside one),
+        # so the writer never waits on, or is waited on by, its locks
+        connection.on_commit(lambda: self._submit(sql, params, many, duration_ms, params_text), robust=True)
+
+    def _submit(self, *args):
+        cls = type(self)
+        with cls.lock:
+            if cls.pending >= MAX_PENDING:
+                return
+            cls.pending += 1
+            if cls.writer is None:
+                cls.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-queries')
+        cls.writer.submit(self._write, *args)
+
+    def _write(self, *args):
+        _local.paused = True
+        try:
+            close_old_connections()
+            self.record(*args)
+        except Exception:
+            logger.exception("Could not record slow query")
+        finally:
+            with type(self).lock:
+                type(self).pending -= 1
+
+    def record(self, sql, params, many, duration_ms, params_text):
+        from .models import SlowQuery
+
+        normalized = normalize(sql)
+        digest = fingerprint(normalized)
+        now = timezone.now()
+        updates = {
+            'count': F('count') + 1,
+            'total_ms': F('total_ms') + duration_ms,
+            'max_ms': Greatest(F('max_ms'), duration_ms),
+            'last_sql': sql,
+            'last_params': params_text,
+            'last_ms': duration_ms,
+            'last_seen': now,
+        }
+        has_plan = SlowQuery.objects.filter(fingerprint=digest).exclude(plan='').exists()
+        if not many and (not has_plan or random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE):
+            plan = explain(connections[self.alias], sql, params)
+            if plan:
+                updates.update(plan=plan, plan_captured_at=now)
+
+        if SlowQuery.objects.filter(fingerprint=digest).update(**updates):
+            return
+        try:
+            SlowQuery.objects.create(
+                fingerprint=digest,
+                database=self.alias,
+                statement=normalized,
+                count=1,
+                total_ms=duration_ms,
+                max_ms=duration_ms,
+                last_sql=sql,
+                last_params=params_text,
+                last_ms=duration_ms,
+                plan=updates.get('plan', ''),
+                plan_captured_at=updates.get('plan_captured_at'),
+                last_seen=now,
+            )
+        except IntegrityError:
+            # Another worker created it first
+            SlowQuery.objects.filter(fingerprint=digest).update(**updates)
+
+
+def explain(connection, sql, params):
+    """
+    EXPLAIN output for a SELECT as text, or '' for other statements.
+    Runs in the writer thread, on that thread's own connection to the database.
+    """
+    if not sql.lstrip().lower().startswith('select'):
+        return ''
+
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            columns = [col[0] for col in cursor.description]
+            rows = cursor.fetchall()
+    except Exception:
+        logger.exception("EXPLAIN failed")
+        return ''
+
+    lines = [' | '.join(columns)]
+    lines += [' | '.join('' if value is None else str(value) for value in row) for row in rows]
+    return '\n'.join(lines)
+
+
+def install(sender, connection, **kwargs):
+    """connection_created receiver: attach a recorder to the watched databases (once per connection wrapper)."""
+    if connection.alias not in settings.SLOW_QUERY_DATABASES:
+        return
+    if not any(isinstance(wrapper, SlowQueryRecorder) for wrapper in connection.execute_wrappers):
+        connection.execute_wrappers.append(SlowQueryRecorder(connection.alias))
@@ -0,0 +1,87 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# The timings of the request being handled, or None when instrumentation is off
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """
+    Per-phase durations and per-database query counts/durations for one request.
+    Phases with the same name accumulate (e.g. one category lookup per post).
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.queries = {}
+
+    def add_phase(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0) + seconds
+
+    def query_wrapper(self, alias):
+        """An execute_wrapper for connections[alias] that times every query run on it."""
+        def wrapper(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                count, seconds = self.queries.get(alias, (0, 0))
+                self.queries[alias] = (count + 1, seconds + time.perf_counter() - start)
+        return wrapper
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def header_value(self, total):
+        """Format as a Server-Timing header value (durations in milliseconds)."""
+        metrics = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items()]
+        metrics += [
+            f'db-{alias};dur={seconds * 1000:.2f};desc="{count} queries"'
+            for alias, (count, seconds) in self.queries.items()
+        ]
+        metrics.append(f"total;dur={total * 1000:.2f}")
+        return ', '.join(metrics)
+
+    def as_dict(self, total):
+        return {
+            'total_ms': round(total * 1000, 2),
+            'phases': {name: round(seconds * 1000, 2) for name, seconds in self.phases.items()},
+            'db': {
+                alias: {'queries': count, 'ms': round(seconds * 1000, 2)}
+                for alias, (count, seconds) in self.queries.items()
+            },
+        }
+
+
+def current_timings():
+    return _current.get()
+
+
+@contextmanager
+def phase(name):
+    """
+    Time a block of the current request as `name`.
+    Costs one context variable lookup when instrumentation is off.
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add_phase(name, time.perf_counter() - start)
+
+
+@contextmanager
+def collect():
+    """Make a new RequestTimings current for the enclosed block and yield it."""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
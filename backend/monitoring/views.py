@@ -0,0 +1,21 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from .metrics import render_metrics
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. When METRICS_TOKEN is set the scraper must send
+    it as a bearer token (Prometheus `authorization` / `bearer_token` config).
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        provided = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(provided, f"Bearer {token}"):
+            return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
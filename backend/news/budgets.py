@@ -0,0 +1,78 @@
+"""
+Time budgets for the WordPress queries behind one partner API request.
+
+A QueryBudget is started per request and every statement run through it gets
+the time that is left as a server-side limit: a MAX_EXECUTION_TIME optimizer
+hint on MySQL (5.7.8+; MariaDB ignores it), an interrupting progress handler
+on SQLite. Other backends run unlimited.
+"""
+import re
+import time
+
+from django.db import OperationalError
+
+# MySQL ER_QUERY_TIMEOUT: "maximum statement execution time exceeded"
+MYSQL_QUERY_TIMEOUT = 3024
+# Statements are not started with less than this left; they would only time out
+MIN_STATEMENT_MS = 5
+# SQLite VM instructions between deadline checks
+SQLITE_CHECK_EVERY = 1000
+
+_SELECT = re.compile(r'^\s*SELECT\b', re.IGNORECASE)
+
+
+class QueryBudgetExceeded(OperationalError):
+    pass
+
+
+class QueryBudget:
+    def __init__(self, budget_ms):
+        self.budget_ms = budget_ms
+        self.deadline = time.monotonic() + budget_ms / 1000
+
+    def remaining_ms(self):
+        return max(0, int((self.deadline - time.monotonic()) * 1000))
+
+    def fetchall(self, cursor, sql, params=None):
+        """
+        Run one SELECT within what is left of the budget and return all rows
+        (cursor.description describes them). Raises QueryBudgetExceeded when
+        the budget is used up before or during the statement.
+        """
+        remaining = self.remaining_ms()
+        if remaining < MIN_STATEMENT_MS:
+            raise QueryBudgetExceeded(f"No time left of the {self.budget_ms}ms query budget.")
+
+        vendor = cursor.db.vendor
+        if vendor == 'mysql':
+            return self._fetchall_mysql(cursor, sql, params, remaining)
+        if vendor == 'sqlite':
+            return self._fetchall_sqlite(cursor, sql, params)
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+    def _fetchall_mysql(self, cursor, sql, params, remaining):
+        sql = _SELECT.sub(f'SELECT /*+ MAX_EXECUTION_TIME({remaining}) */', sql, count=1)
+        try:
+            # mysqlclient buffers the whole result in execute(), so the limit covers it all
+            cursor.execute(sql, params)
+        except OperationalError as exc:
+            if exc.args and exc.args[0] == MYSQL_QUERY_TIMEOUT:
+                raise QueryBudgetExceeded(f"Statement exceeded the {self.budget_ms}ms query budget.") from exc
+            raise
+        return cursor.fetchall()
+
+    def _fetchall_sqlite(self, cursor, sql, params):
+        # SQLite steps through the result while fetching, so the handler stays
+        # installed until every row is read
+        raw = cursor.db.connection
+        raw.set_progress_handler(lambda: time.monotonic() > self.deadline, SQLITE_CHECK_EVERY)
+        try:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        except OperationalError as exc:
+            if time.monotonic() > self.deadline:
+                raise QueryBudgetExceeded(f"Statement exceeded the {self.budget_ms}ms query budget.") from exc
+            raise
+        finally:
+            raw.set_progress_handler(None, 0)
@@ -0,0 +1,159 @@
+import logging
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError
+
+from monitoring.metrics import circuit_transitions
+
+from .budgets import QueryBudgetExceeded
+
+logger = logging.getLogger('news.circuit')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpen(Exception):
+    def __init__(self, name, retry_after):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"Circuit {name} is open; retry in {retry_after:.0f}s.")
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker shared by all worker processes through the Django cache.
+
+    Calls are counted in fixed windows of NEWS_DB_CIRCUIT_WINDOW_SECONDS; a
+    call fails if it raises a DatabaseError or takes longer than
+    NEWS_DB_CIRCUIT_SLOW_MS. Once at least NEWS_DB_CIRCUIT_MIN_CALLS calls were
+    made in the current and previous window and the failing share reaches
+    NEWS_DB_CIRCUIT_FAILURE_RATE, the circuit opens and calls are refused for
+    NEWS_DB_CIRCUIT_OPEN_SECONDS. After that a single probe call is let through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name, cache_alias='default', prefix='circuit'):
+        self.name = name
+        self.cache_alias = cache_alias
+        self.prefix = f"{prefix}:{name}"
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    @property
+    def window(self):
+        return settings.NEWS_DB_CIRCUIT_WINDOW_SECONDS
+
+    def _key(self, *parts):
+        return ':'.join((self.prefix, *map(str, parts)))
+
+    def _count(self, name, bucket):
+        key = self._key(name, bucket)
+        self.cache.add(key, 0, timeout=self.window * 3)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            return 0
+
+    def state(self):
+        opened_at = self.cache.get(self._key('opened_at'))
+        if opened_at is None:
+            return CLOSED
+        if time.time() < opened_at + settings.NEWS_DB_CIRCUIT_OPEN_SECONDS:
+            return OPEN
+        return HALF_OPEN
+
+    def allow(self):
+        """Raise CircuitOpen unless a call may go ahead now."""
+        opened_at = self.cache.get(self._key('opened_at'))
+        if opened_at is None:
+            return
+        retry_after = opened_at + settings.NEWS_DB_CIRCUIT_OPEN_SECONDS - time.time()
+        if retry_after > 0:
+            raise CircuitOpen(self.name, retry_after)
+        # Half-open: exactly one worker gets to probe; the probe lock expires
+        # on its own if that worker dies mid-call
+        probe_timeout = settings.NEWS_DB_CIRCUIT_OPEN_SECONDS
+        if not self.cache.add(self._key('probe'), 1, timeout=probe_timeout):
+            raise CircuitOpen(self.name, probe_timeout)
+
+    def record_success(self):
+        state = self.state()
+        if state == HALF_OPEN:
+            self._close()
+        elif state == CLOSED:
+            self._count('calls', int(time.time() // self.window))
+
+    def record_failure(self):
+        # Calls that started before the circuit opened may still finish while
+        # it is open; they neither extend nor close it
+        state = self.state()
+        if state == HALF_OPEN:
+            self._open('probe failed')
+            return
+        if state == OPEN:
+            return
+
+        bucket = int(time.time() // self.window)
+        calls = self._count('calls', bucket)
+        failures = self._count('failures', bucket)
+        previous = self.cache.get_many([self._key('calls', bucket - 1), self._key('failures', bucket - 1)])
+        calls += previous.get(self._key('calls', bucket - 1), 0)
+        failures += previous.get(self._key('failures', bucket - 1), 0)
+
+        if calls >= settings.NEWS_DB_CIRCUIT_MIN_CALLS and failures / calls >= settings.NEWS_DB_CIRCUIT_FAILURE_RATE:
+            self._open(f'{failures}/{calls} calls failed')
+
+    def _open(self, reason):
+        self.cache.set(self._key('opened_at'), time.time(), timeout=settings.NEWS_DB_CIRCUIT_OPEN_SECONDS * 10)
+        self.cache.delete(self._key('probe'))
+        circuit_transitions.labels(self.name, OPEN).inc()
+        logger.warning("Circuit %s opened: %s", self.name, reason)
+
+    def _close(self):
+        bucket = int(time.time() // self.window)
+        self.cache.delete_many([
+            self._key('opened_at'), self._key('probe'),
+            self._key('calls', bucket), self._key('failures', bucket),
+            self._key('calls', bucket - 1), self._key('failures', bucket - 1),
+        ])
+        circuit_transitions.labels(self.name, CLOSED).inc()
+        logger.warning("Circuit %s closed", self.name)
+
+    @contextmanager
+    def guard(self):
+        """
+        Run the block through the breaker. Raises CircuitOpen instead of running
+        it while the circuit is open; DatabaseErrors (other than query budget
+        overruns) and slow blocks count as failures.
+        """
+        if not settings.NEWS_DB_CIRCUIT_ENABLED:
+            yield
+            return
+        self.allow()
+        start = time.monotonic()
+        try:
+            yield
+        except QueryBudgetExceeded:
+            # One caller's expensive query (say, a deep offset) running out of
+            # its own budget says nothing about the database's health. As a
+            # probe it proved nothing either, so let the next call probe.
+            if self.state() == HALF_OPEN:
+                self.cache.delete(self._key('probe'))
+            raise
+        except DatabaseError:
+            self.record_failure()
+            raise
+        if time.monotonic() - start > settings.NEWS_DB_CIRCUIT_SLOW_MS / 1000:
+            self.record_failure()
+        else:
+            self.record_success()
+
+
+news_db_breaker = CircuitBreaker('news_db')
@@ -0,0 +1,109 @@
+"""
+Change feed over the WordPress posts: published posts in the order they were
+published or last modified, resumable from a (changed_at, id) position.
+
+A post's change time is the later of post_modified_gmt and post_date_gmt,
+because WordPress publishes scheduled posts without touching post_modified.
+Times are the 'YYYY-MM-DD HH:MM:SS' GMT strings WordPress stores.
+"""
+from datetime import datetime, timedelta, timezone
+
+from .replicas import FRESH, news_cursor
+
+EPOCH = '1970-01-01 00:00:00'
+# Within this many seconds of publishing a change still counts as the publish
+PUBLISH_GRACE_SECONDS = 60
+
+CHANGED_AT = (
+    "CASE WHEN p.post_date_gmt > p.post_modified_gmt THEN p.post_date_gmt ELSE p.post_modified_gmt END"
+)
+
+
+def gmt_string(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value)[:19]
+
+
+def gmt_now(minus_seconds=0):
+    return gmt_string(datetime.now(timezone.utc) - timedelta(seconds=minus_seconds))
+
+
+def changed_posts(after=EPOCH, after_id=0, until=None, limit=200):
+    """
+    Up to `limit` published posts changed after (after, after_id) and no later
+    than `until`, oldest change first. Reads from a replica that is not
+    lagging (news.replicas.FRESH). Each post is in the partner API's post
+    format plus 'event' ('post.published' or 'post.updated'), 'changed_at'
+    and 'category_ids'.
+    """
+    until = until or gmt_now()
+    query = f"""
+        SELECT
+            p.ID, p.post_date, p.post_date_gmt, p.post_modified_gmt, p.post_content, p.post_title,
+            p.post_name, wp_media.guid as featured_media_url,
+            {CHANGED_AT} as changed_at
+        FROM wp_posts p
+        LEFT JOIN wp_postmeta pm ON p.ID = pm.post_id AND pm.meta_key = '_thumbnail_id'
+        LEFT JOIN wp_posts wp_media ON pm.meta_value = wp_media.ID AND wp_media.post_type = 'attachment'
+        WHERE p.post_type = 'post' AND p.post_status = 'publish'
+            AND ({CHANGED_AT} > %s OR ({CHANGED_AT} = %s AND p.ID > %s))
+            AND {CHANGED_AT} <= %s
+        ORDER BY changed_at, p.ID
+        LIMIT %s
+    """
+    with news_cursor(FRESH) as cursor:
+        cursor.execute(query, [after, after, after_id, until, limit])
+        columns = [col[0] for col in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        categories = post_categories(cursor, [row['ID'] for row in rows])
+
+    posts = []
+    for row in rows:
+        published = gmt_string(row['post_date_gmt'])
+        modified = gmt_string(row['post_modified_gmt'])
+        recently_published = (
+            _parse(modified) - _parse(published) <= timedelta(seconds=PUBLISH_GRACE_SECONDS)
+        )
+        posts.append({
+            'id': row['ID'],
+            'date': row['post_date'],
+            'slug': row['post_name'],
+            'title': row['post_title'],
+            'content': {'rendered': row['post_content']},
+            'featured_media_url': row['featured_media_url'],
+            'categories': [name for _, name in categories.get(row['ID'], [])],
+            'category_ids': [term_id for term_id, _ in categories.get(row['ID'], [])],
+            'changed_at': gmt_string(row['changed_at']),
+            'event': 'post.published' if recently_published else 'post.updated',
+        })
+    return posts
+
+
+def post_categories(cursor, post_ids, budget=None):
+    """
+    {post_id: [(term_id, name), ...]} for all `post_ids` in one query, within
+    `budget` (a news.budgets.QueryBudget) if given.
+    """
+    if not post_ids:
+        return {}
+    query = f"""
+        SELECT tr.object_id, t.term_id, t.name
+        FROM wp_terms t
+        JOIN wp_term_taxonomy tt ON t.term_id = tt.term_id
+        JOIN wp_term_relationships tr ON tt.term_taxonomy_id = tr.term_taxonomy_id
+        WHERE tt.taxonomy = 'category' AND tr.object_id IN ({','.join(['%s'] * len(post_ids))})
+    """
+    if budget is None:
+        cursor.execute(query, post_ids)
+        rows = cursor.fetchall()
+    else:
+        rows = budget.fetchall(cursor, query, post_ids)
+    categories = {}
+    for post_id, term_id, name in rows:
+        categories.setdefault(post_id, []).append((term_id, name))
+    return categories
+
+
+def _parse(value):
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
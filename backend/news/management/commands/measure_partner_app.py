@@ -0,0 +1,134 @@
+import json
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter per settings module, so both apps start cold.
+PROBE = r'''
+import io, json, os, sys, time
+
+settings_module, path, api_key, iterations = sys.argv[1], sys.argv[2], sys.argv[3], int(sys.argv[4])
+
+start = time.perf_counter()
+os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+startup_ms = (time.perf_counter() - start) * 1000
+
+from django.conf import settings
+host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS and settings.ALLOWED_HOSTS[0] != '*' else 'localhost'
+path_info, _, query_string = path.partition('?')
+
+def environ():
+    env = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path_info, 'QUERY_STRING': query_string,
+        'SCRIPT_NAME': '', 'SERVER_NAME': host, 'SERVER_PORT': '80', 'HTTP_HOST': host,
+        'SERVER_PROTOCOL': 'HTTP/1.1', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http', 'wsgi.version': (1, 0), 'wsgi.multithread': False,
+        'wsgi.multiprocess': True, 'wsgi.run_once': False,
+    }
+    if api_key:
+        env['HTTP_X_API_KEY'] = api_key
+    return env
+
+statuses = set()
+def start_response(status, headers, exc_info=None):
+    statuses.add(status.split(' ', 1)[0])
+
+def call():
+    body = application(environ(), start_response)
+    for _ in body:
+        pass
+    if hasattr(body, 'close'):
+        body.close()
+
+first_start = time.perf_counter()
+call()
+first_request_ms = (time.perf_counter() - first_start) * 1000
+
+for _ in range(min(50, iterations)):
+    call()
+
+timings = []
+for _ in range(iterations):
+    t = time.perf_counter()
+    call()
+    timings.append((time.perf_counter() - t) * 1e6)
+
+timings.sort()
+print(json.dumps({
+    'startup_ms': startup_ms,
+    'first_request_ms': first_request_ms,
+    'request_p50_us': timings[len(timings) // 2],
+    'request_p95_us': timings[int(len(timings) * 0.95) - 1],
+    'request_mean_us': sum(timings) / len(timings),
+    'middleware_count': len(settings.MIDDLEWARE),
+    'installed_apps': len(settings.INSTALLED_APPS),
+    'statuses': sorted(statuses),
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare startup time and per-request overhead of the full app (dn7x7saas.settings) "
+        "against the lean partner app (dn7x7saas.partner_settings)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Cold starts per app (medians are reported)")
+        parser.add_argument('--iterations', type=int, default=2000, help="Timed requests per run")
+        parser.add_argument('--path', default='/api/news/')
+        parser.add_argument(
+            '--api-key', default='',
+            help="Send this X-API-KEY to time the full billed path (needs both databases). "
+                 "Without it the middleware rejects with 401, which isolates framework overhead.",
+        )
+        parser.add_argument('--full-settings', default='dn7x7saas.settings')
+        parser.add_argument('--partner-settings', default='dn7x7saas.partner_settings')
+        parser.add_argument('--json', action='store_true', help="Print raw results as JSON")
+
+    def handle(self, *args, **options):
+        results = {}
+        for label, module in (('full', options['full_settings']), ('partner', options['partner_settings'])):
+            runs = [self._probe(module, options) for _ in range(options['runs'])]
+            results[label] = {
+                'settings': module,
+                'middleware_count': runs[0]['middleware_count'],
+                'installed_apps': runs[0]['installed_apps'],
+                'statuses': runs[0]['statuses'],
+                **{
+                    metric: statistics.median(run[metric] for run in runs)
+                    for metric in ('startup_ms', 'first_request_ms', 'request_p50_us', 'request_p95_us', 'request_mean_us')
+                },
+            }
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        full, partner = results['full'], results['partner']
+        self.stdout.write(f"{'':22}{'full':>12}{'partner':>12}{'ratio':>8}")
+        for metric, unit in (
+            ('startup_ms', 'ms'), ('first_request_ms', 'ms'),
+            ('request_p50_us', 'us'), ('request_p95_us', 'us'), ('request_mean_us', 'us'),
+        ):
+            ratio = partner[metric] / full[metric] if full[metric] else 0
+            self.stdout.write(
+                f"{metric + ' (' + unit + ')':22}{full[metric]:>12.1f}{partner[metric]:>12.1f}{ratio:>8.2f}"
+            )
+        self.stdout.write(f"{'middleware':22}{full['middleware_count']:>12}{partner['middleware_count']:>12}")
+        self.stdout.write(f"{'installed apps':22}{full['installed_apps']:>12}{partner['installed_apps']:>12}")
+        self.stdout.write(f"{'response status':22}{','.join(full['statuses']):>12}{','.join(partner['statuses']):>12}")
+
+    def _probe(self, module, options):
+        completed = subprocess.run(
+            [sys.executable, '-c', PROBE, module, options['path'], options['api_key'], str(options['iterations'])],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            raise CommandError(f"Probe for {module} failed:\n{completed.stderr}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from news.snapshot import build, publish, refresher_lock
+
+
+class Command(BaseCommand):
+    help = "Publish the shared snapshot of the latest posts per category that workers answer /api/news/ from."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=None, help="Posts per category (default NEWS_SNAPSHOT_POSTS)")
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help="Keep running and republish every N seconds (0 = run once).",
+        )
+
+    def handle(self, *args, **options):
+        lock = refresher_lock()
+        if lock is None:
+            raise CommandError(f"Another refresher holds {settings.NEWS_SNAPSHOT_PATH}.lock")
+        posts = options['posts'] or settings.NEWS_SNAPSHOT_POSTS
+
+        with lock:
+            while True:
+                started = time.monotonic()
+                try:
+                    data = build(posts)
+                except DatabaseError as exc:
+                    # Workers fall back to news_db once the old snapshot is too old
+                    if not options['interval']:
+                        raise
+                    self.stderr.write(f"Snapshot not refreshed: {exc!r}")
+                else:
+                    publish(data)
+                    self.stdout.write(
+                        f"Published {len(data)} byte snapshot in {time.monotonic() - started:.2f}s."
+                    )
+                if not options['interval']:
+                    break
+                time.sleep(options['interval'])
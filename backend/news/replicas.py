@@ -0,0 +1,159 @@
+"""
+The one place that decides which WordPress database a read goes to.
+
+news_db is the primary; NEWS_DB_REPLICAS adds read replicas (see settings).
+Reads go to a replica chosen by weight or load, fail over to the next one and
+finally to news_db when a replica cannot be reached, and change-feed reads
+(FRESH) skip replicas lagging more than NEWS_DB_FRESH_MAX_LAG_SECONDS.
+
+All bookkeeping (in-flight reads, latency, failures, measured lag) is per
+process: it only steers this worker's choices, so there is nothing to share.
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger('news.replicas')
+
+PRIMARY = 'news_db'
+
+READ = 'read'    # any healthy replica will do
+FRESH = 'fresh'  # change feeds: only replicas within the lag limit
+
+LATENCY_SMOOTHING = 0.2
+
+
+class ReplicaSet:
+    def __init__(self, primary=PRIMARY):
+        self.primary = primary
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._latency = {}
+        self._down_until = {}
+        self._lag = {}  # alias -> (measured_at, seconds or None)
+
+    @property
+    def replicas(self):
+        return settings.NEWS_DB_REPLICAS
+
+    def is_down(self, alias):
+        return self._down_until.get(alias, 0) > time.monotonic()
+
+    def mark_down(self, alias, error):
+        self._down_until[alias] = time.monotonic() + settings.NEWS_DB_REPLICA_RETRY_SECONDS
+        self._lag.pop(alias, None)
+        logger.warning("news_db read alias %s marked down for %ss: %s", alias, settings.NEWS_DB_REPLICA_RETRY_SECONDS, error)
+
+    def replication_lag(self, alias):
+        """
+        Seconds `alias` is behind the primary, remeasured every
+        NEWS_DB_LAG_CHECK_SECONDS. None when it cannot be told (replication
+        stopped, or no privilege to ask), which FRESH reads treat as too far behind.
+        """
+        measured_at, lag = self._lag.get(alias, (None, None))
+        if measured_at is not None and time.monotonic() - measured_at < settings.NEWS_DB_LAG_CHECK_SECONDS:
+            return lag
+
+        connection = connections[alias]
+        if connection.vendor != 'mysql':
+            lag = 0.0
+        else:
+            try:
+                lag = self._mysql_lag(connection)
+            except DatabaseError as exc:
+                logger.warning("Could not read replication status of %s: %s", alias, exc)
+                lag = None
+        self._lag[alias] = (time.monotonic(), lag)
+        return lag
+
+    def _mysql_lag(self, connection):
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute('SHOW REPLICA STATUS')
+            except DatabaseError:
+                # MySQL < 8.0.22 / MariaDB
+                cursor.execute('SHOW SLAVE STATUS')
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            status = dict(zip([column[0] for column in cursor.description], row))
+        lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+        return None if lag is None else float(lag)
+
+    def candidates(self, purpose=READ):
+        """Aliases to try in order: usable replicas, best first, then the primary."""
+        usable = [alias for alias in self.replicas if not self.is_down(alias)]
+        if purpose == FRESH:
+            usable = [
+                alias for alias in usable
+                if (lag := self.replication_lag(alias)) is not None and lag <= settings.NEWS_DB_FRESH_MAX_LAG_SECONDS
+            ]
+        return self._order(usable) + [self.primary]
+
+    def _order(self, aliases):
+        if settings.NEWS_DB_REPLICA_SELECTION == 'least_loaded':
+            def load(alias):
+                in_flight = self._in_flight.get(alias, 0)
+                return (in_flight + 1) * self._latency.get(alias, 0.0) / self.replicas[alias], in_flight
+            return sorted(aliases, key=load)
+
+        # Weighted random order without replacement
+        remaining = list(aliases)
+        ordered = []
+        while remaining:
+            alias = random.choices(remaining, weights=[self.replicas[alias] for alias in remaining])[0]
+            remaining.remove(alias)
+            ordered.append(alias)
+        return ordered
+
+    def choose(self, purpose=READ):
+        return self.candidates(purpose)[0]
+
+    def _connect(self, purpose):
+        """The first candidate that accepts a connection, marking the ones that do not."""
+        error = None
+        for alias in self.candidates(purpose):
+            try:
+                connections[alias].ensure_connection()
+                return alias
+            except DatabaseError as exc:
+                error = exc
+                if alias != self.primary:
+                    self.mark_down(alias, exc)
+        raise error
+
+    @contextmanager
+    def cursor(self, purpose=READ):
+        """A cursor on the chosen WordPress database for one read."""
+        alias = self._connect(purpose)
+        with self._lock:
+            self._in_flight[alias] = self._in_flight.get(alias, 0) + 1
+        start = time.monotonic()
+        try:
+            with connections[alias].cursor() as cursor:
+                yield cursor
+        except DatabaseError as exc:
+            # A failed statement is not a failed replica; a dropped connection is
+            if alias != self.primary and not connections[alias].is_usable():
+                self.mark_down(alias, exc)
+            raise
+        finally:
+            elapsed = time.monotonic() - start
+            with self._lock:
+                self._in_flight[alias] -= 1
+                previous = self._latency.get(alias)
+                self._latency[alias] = elapsed if previous is None else (
+                    previous + LATENCY_SMOOTHING * (elapsed - previous)
+                )
+
+
+news_replicas = ReplicaSet()
+
+
+def news_cursor(purpose=READ):
+    return news_replicas.cursor(purpose)
@@ -1,5 +1,7 @@
 from rest_framework import serializers
 
+from .thumbnails import thumbnail_url
+
 
 class MinimalNewsSerializer(serializers.Serializer):
     """
@@ -10,10 +12,15 @@ class MinimalNewsSerializer(serializers.Serializer):
     title = serializers.CharField()
     excerpt = serializers.SerializerMethodField()
     image = serializers.CharField(source='featured_media_url', allow_null=True)
+    thumbnail = serializers.SerializerMethodField()
     url = serializers.SerializerMethodField()
     published_at = serializers.DateTimeField(source='date')
     categories = serializers.ListField(child=serializers.CharField())
 
+    def get_thumbnail(self, obj):
+        """Signed URL of a resized copy of the image (w= can be any of THUMBNAIL_WIDTHS)"""
+        return thumbnail_url(obj.get('featured_media_url'))
+
     def get_excerpt(self, obj):
         """Truncate content to 150 characters"""
         content = obj.get('content', '')
@@ -43,10 +50,14 @@ class FullNewsSerializer(serializers.Serializer):
     title = serializers.CharField()
     content = serializers.SerializerMethodField()
     image = serializers.CharField(source='featured_media_url', allow_null=True)
+    thumbnail = serializers.SerializerMethodField()
     url = serializers.SerializerMethodField()
     published_at = serializers.DateTimeField(source='date')
     categories = serializers.ListField(child=serializers.CharField())
 
+    def get_thumbnail(self, obj):
+        return thumbnail_url(obj.get('featured_media_url'))
+
     def get_content(self, obj):
         content = obj.get('content', '')
         if isinstance(content, dict):
@@ -0,0 +1,219 @@
+"""
+Shared, memory-mapped snapshot of the latest posts per category.
+
+`refresh_news_snapshot` (one process) renders the newest NEWS_SNAPSHOT_POSTS
+posts of every category, and of all categories, exactly as the list API
+returns them, and atomically replaces NEWS_SNAPSHOT_PATH with the result.
+Every worker maps the file read-only, so the page cache holds one copy for
+the whole host, and answers the first pages of /api/news/ by slicing the
+rendered posts out of it: no news_db access and no JSON encoding.
+
+File layout (little-endian):
+
+    MAGIC (8 bytes) | header length (uint32) | header JSON | body
+
+The header holds generated_at and, per section ('' for all categories, else
+the CATEGORY_MAPPING slug), the total post count and the body offsets of its
+posts. Each rendered post in the body is followed by a comma, so a page is
+the single slice offsets[start]:offsets[end] - 1.
+"""
+import fcntl
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from monitoring.metrics import cache_requests
+from .constants import CATEGORY_MAPPING
+from .feed import post_categories
+from .replicas import news_cursor
+from .serializers import MinimalNewsSerializer
+
+MAGIC = b'DN7SNAP1'
+HEADER_LENGTH = struct.Struct('<I')
+ALL_CATEGORIES = ''
+
+Snapshot = namedtuple('Snapshot', ['identity', 'buffer', 'header', 'body_start'])
+
+
+def latest_posts(cursor, category_ids, limit):
+    """(the newest `limit` published posts in the list API's post format, total count)."""
+    category_filter = ''
+    params = []
+    if category_ids:
+        category_filter = """
+            AND EXISTS (
+                SELECT 1 FROM wp_term_relationships tr
+                JOIN wp_term_taxonomy tt ON tr.term_taxonomy_id = tt.term_taxonomy_id
+                WHERE tr.object_id = p.ID AND tt.taxonomy = 'category' AND tt.term_id IN ({})
+            )
+        """.format(','.join(['%s'] * len(category_ids)))
+        params = list(category_ids)
+
+    cursor.execute(f"""
+        SELECT p.ID, p.post_date, p.post_content, p.post_title, p.post_name,
+            wp_media.guid as featured_media_url
+        FROM wp_posts p
+        LEFT JOIN wp_postmeta pm ON p.ID = pm.post_id AND pm.meta_key = '_thumbnail_id'
+        LEFT JOIN wp_posts wp_media ON pm.meta_value = wp_media.ID AND wp_media.post_type = 'attachment'
+        WHERE p.post_type = 'post' AND p.post_status = 'publish' {category_filter}
+        ORDER BY p.post_date DESC
+        LIMIT %s
+    """, params + [limit])
+    columns = [col[0] for col in cursor.description]
+    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    cursor.execute(f"""
+        SELECT COUNT(*) FROM wp_posts p
+        WHERE p.post_type = 'post' AND p.post_status = 'publish' {category_filter}
+    """, params)
+    count = cursor.fetchone()[0]
+
+    categories = post_categories(cursor, [row['ID'] for row in rows])
+    posts = [{
+        'id': row['ID'],
+        'date': row['post_date'],
+        'slug': row['post_name'],
+        'title': row['post_title'],
+        'content': {'rendered': row['post_content']},
+        'featured_media_url': row['featured_media_url'],
+        'categories': [name for _, name in categories.get(row['ID'], [])],
+    } for row in rows]
+    return posts, count
+
+
+def build(limit):
+    """The snapshot file's bytes for the newest `limit` posts of every section."""
+    renderer = JSONRenderer()
+    sections = {ALL_CATEGORIES: None, **CATEGORY_MAPPING}
+    body = bytearray()
+    index = {}
+    with news_cursor() as cursor:
+        for section, category_ids in sections.items():
+            posts, count = latest_posts(cursor, category_ids, limit)
+            offsets = [len(body)]
+            for post in posts:
+                body += renderer.render(MinimalNewsSerializer(post).data)
+                body += b','
+                offsets.append(len(body))
+            index[section] = {'count': count, 'offsets': offsets}
+
+    header = json.dumps({'generated_at': time.time(), 'sections': index}, separators=(',', ':')).encode()
+    return MAGIC + HEADER_LENGTH.pack(len(header)) + header + bytes(body)
+
+
+def publish(data, path=None):
+    """Atomically replace the snapshot file: readers see the old or the new one, never a mix."""
+    path = path or settings.NEWS_SNAPSHOT_PATH
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def refresher_lock(path=None):
+    """
+    Hold an exclusive lock file next to the snapshot, so only one refresher
+    publishes. Returns the open lock file, or None if another process has it.
+    """
+    lock_file = open(f'{path or settings.NEWS_SNAPSHOT_PATH}.lock', 'w')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+class SnapshotReader:
+    """
+    Per-process view of the snapshot file. Checks for a newer file at most
+    every NEWS_SNAPSHOT_CHECK_SECONDS; a replaced mapping stays valid for
+    requests still using it and is unmapped once they are done.
+    """
+
+    def __init__(self):
+        self.current = None
+        self.checked_at = 0
+        self.lock = threading.Lock()
+
+    def snapshot(self):
+        now = time.monotonic()
+        if now - self.checked_at >= settings.NEWS_SNAPSHOT_CHECK_SECONDS:
+            with self.lock:
+                if now - self.checked_at >= settings.NEWS_SNAPSHOT_CHECK_SECONDS:
+                    self.current = self._load(self.current)
+                    self.checked_at = now
+        return self.current
+
+    def _load(self, current):
+        try:
+            with open(settings.NEWS_SNAPSHOT_PATH, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+                if current is not None and current.identity == identity:
+                    return current
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            # ValueError: an empty file cannot be mapped
+            return None
+
+        if buffer[:len(MAGIC)] != MAGIC:
+            return None
+        header_length, = HEADER_LENGTH.unpack_from(buffer, len(MAGIC))
+        body_start = len(MAGIC) + HEADER_LENGTH.size + header_length
+        header = json.loads(buffer[len(MAGIC) + HEADER_LENGTH.size:body_start])
+        return Snapshot(identity, buffer, header, body_start)
+
+    def page(self, section, page, page_size):
+        """
+        The list API response for this page, straight from the snapshot, or
+        None if the snapshot is missing, older than NEWS_SNAPSHOT_MAX_AGE_SECONDS
+        or does not reach that far.
+        """
+        if not settings.NEWS_SNAPSHOT_ENABLED or page < 1 or page_size < 1:
+            return None
+        snapshot = self.snapshot()
+        if snapshot is None or time.time() - snapshot.header['generated_at'] > settings.NEWS_SNAPSHOT_MAX_AGE_SECONDS:
+            cache_requests.labels('news_snapshot', 'miss').inc()
+            return None
+
+        index = snapshot.header['sections'].get(section)
+        offsets = index['offsets'] if index else []
+        available = len(offsets) - 1
+        start = (page - 1) * page_size
+        end = start + page_size
+        # Past the end is fine only if the snapshot holds every post of the section
+        if index is None or (end > available and available < index['count']):
+            cache_requests.labels('news_snapshot', 'miss').inc()
+            return None
+
+        cache_requests.labels('news_snapshot', 'hit').inc()
+        start, end = min(start, available), min(end, available)
+        results = b''
+        if end > start:
+            results = snapshot.buffer[snapshot.body_start + offsets[start]:snapshot.body_start + offsets[end] - 1]
+
+        count = index['count']
+        envelope = JSONRenderer().render({
+            'results': [],
+            'count': count,
+            'page': page,
+            'page_size': page_size,
+            'total_pages': (count + page_size - 1) // page_size,
+        })
+        # Splice the pre-rendered posts into the (otherwise identical) list API response
+        content = envelope.replace(b'[]', b'[' + results + b']', 1)
+        return HttpResponse(content, content_type='application/json')
+
+
+news_snapshot = SnapshotReader()
@@ -0,0 +1,63 @@
+"""
+Last known good partner API payloads, served while news_db is unavailable.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+from monitoring.metrics import degraded_responses
+
+STALE_HEADER = 'X-Content-Stale'
+CACHE_ALIAS = 'default'
+PREFIX = 'news:stale'
+# A stored copy is rewritten at most once per this share of NEWS_STALE_TTL
+# (about 15 minutes by default) rather than on every successful request
+REFRESH_FRACTION = 0.01
+
+
+def list_key(category_ids, page, page_size):
+    category = ','.join(map(str, category_ids)) if category_ids else 'all'
+    return f"{PREFIX}:list:{category}:{page}:{page_size}"
+
+
+def post_key(post_id):
+    return f"{PREFIX}:post:{post_id}"
+
+
+def remember(key, data):
+    """
+    Store `data` as the copy to fall back on, unless it was stored recently.
+    The check is a small marker key, so most hits cost one cache.add()
+    instead of writing the whole payload.
+    """
+    cache = caches[CACHE_ALIAS]
+    refresh_after = max(1, int(settings.NEWS_STALE_TTL * REFRESH_FRACTION))
+    if cache.add(f"{key}:fresh", 1, timeout=refresh_after):
+        cache.set(key, (time.time(), data), timeout=settings.NEWS_STALE_TTL)
+
+
+def fallback_response(key, retry_after):
+    """
+    The stored payload for `key`, marked stale with its age, or a 503 when
+    there is none. 503s are not billed (see APICreditMiddleware).
+    """
+    stored = caches[CACHE_ALIAS].get(key)
+    if stored is None:
+        degraded_responses.labels('unavailable').inc()
+        response = Response(
+            {'error': 'News is temporarily unavailable. Please retry later.'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+        response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
+
+    stored_at, data = stored
+    degraded_responses.labels('stale').inc()
+    response = Response(data, status=status.HTTP_200_OK)
+    response[STALE_HEADER] = 'true'
+    response['Age'] = str(int(time.time() - stored_at))
+    return response
@@ -0,0 +1,228 @@
+"""
+Live feed of newly published posts for the SSE endpoint (/api/news/stream/).
+
+One StreamBroadcaster per process polls the change feed (news.feed) while
+anyone is connected and fans each new post out to every subscriber's queue,
+so news_db sees one query per NEWS_STREAM_POLL_SECONDS however many clients
+are listening. Event ids are feed positions, which are the same in every
+process, so a client can resume with Last-Event-ID on any worker.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError
+
+from .circuit import CircuitOpen, news_db_breaker
+from .feed import changed_posts, gmt_now
+from .serializers import MinimalNewsSerializer
+
+logger = logging.getLogger('news.stream')
+
+PUBLISHED = 'post.published'
+# Feed rows read per query; a poll keeps reading until it gets a short batch
+POLL_BATCH = 200
+
+# position is the feed position (changed_at, post_id); data the MinimalNewsSerializer shape
+Event = namedtuple('Event', ['position', 'category_ids', 'data'])
+
+
+def event_id(position):
+    changed_at, post_id = position
+    return f"{changed_at.replace(' ', 'T')}_{post_id}"
+
+
+def parse_event_id(value):
+    """The feed position in a Last-Event-ID header, or None if it is not one of ours."""
+    try:
+        changed_at, post_id = value.rsplit('_', 1)
+        changed_at = changed_at.replace('T', ' ')
+        datetime.strptime(changed_at, '%Y-%m-%d %H:%M:%S')
+        return changed_at, int(post_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def to_events(posts):
+    """Events for the newly published posts among `posts` (updates are not streamed)."""
+    return [
+        Event((post['changed_at'], post['id']), set(post['category_ids']), MinimalNewsSerializer(post).data)
+        for post in posts
+        if post['event'] == PUBLISHED
+    ]
+
+
+def format_event(event):
+    return (
+        f"id: {event_id(event.position)}\n"
+        f"event: {PUBLISHED}\n"
+        f"data: {json.dumps(event.data, cls=DjangoJSONEncoder)}\n\n"
+    )
+
+
+def format_message(name, data):
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+class Subscriber:
+    """One connected client: its category filter and a bounded queue of events."""
+
+    def __init__(self, category_ids, after):
+        self.category_ids = category_ids
+        self.after = after
+        self.queue = asyncio.Queue(maxsize=settings.NEWS_STREAM_QUEUE_SIZE)
+        # Set when the client fell too far behind and events were dropped
+        self.overflowed = False
+
+    def matches(self, event):
+        return self.category_ids is None or bool(self.category_ids & event.category_ids)
+
+    def wants(self, event):
+        return event.position > self.after and self.matches(event)
+
+    def offer(self, event):
+        if self.overflowed or not self.wants(event):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class StreamBroadcaster:
+    """
+    The single change detector of a process. Keeps the last NEWS_STREAM_BACKLOG
+    events so reconnecting clients can be caught up without a query.
+    """
+
+    def __init__(self):
+        self.subscribers = set()
+        self.position = None
+        self.backlog = None
+        # Events after this position are all in the backlog
+        self.backlog_start = None
+        self.task = None
+        self.loop = None
+
+    def subscribe(self, category_ids, after=None):
+        """
+        Register a client on the running event loop and start polling if this
+        is the first one. Returns (subscriber, replay): the events the client
+        missed since `after`, from the backlog, or None if it reaches back
+        further than the backlog (see catch_up).
+        """
+        loop = asyncio.get_running_loop()
+        running = self.task is not None and not self.task.done() and self.loop is loop
+        if not running:
+            # Nobody was listening, so nothing was polled: start from now rather
+            # than streaming everything published in between as live events
+            self.position = (gmt_now(settings.NEWS_STREAM_SETTLE_SECONDS), 0)
+            self.backlog = deque(maxlen=settings.NEWS_STREAM_BACKLOG)
+            self.backlog_start = self.position
+
+        # Live events are those after the current position (or after `after`
+        # if the client is ahead of this process)
+        subscriber = Subscriber(category_ids, max(after or self.position, self.position))
+        self.subscribers.add(subscriber)
+        if not running:
+            self.loop = loop
+            self.task = loop.create_task(self.run())
+
+        if after is None or after >= self.position:
+            return subscriber, []
+        if after >= self.backlog_start:
+            return subscriber, [
+                event for event in self.backlog if event.position > after and subscriber.matches(event)
+            ]
+        return subscriber, None
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    async def run(self):
+        # Stops (and stops querying) once the last client has gone
+        while self.subscribers:
+            try:
+                events, self.position = await sync_to_async(self.poll, thread_sensitive=False)(self.position)
+            except (CircuitOpen, DatabaseError) as exc:
+                logger.warning('News stream poll failed: %r', exc)
+                events = []
+            for event in events:
+                if len(self.backlog) == self.backlog.maxlen:
+                    self.backlog_start = self.backlog[0].position
+                self.backlog.append(event)
+                for subscriber in list(self.subscribers):
+                    subscriber.offer(event)
+            await asyncio.sleep(settings.NEWS_STREAM_POLL_SECONDS)
+
+    def poll(self, position):
+        """
+        (published posts after `position`, the new position). Blocking, so it
+        runs in a thread; run() applies the result on the event loop.
+        """
+        until = gmt_now(settings.NEWS_STREAM_SETTLE_SECONDS)
+        events = []
+        while True:
+            with news_db_breaker.guard():
+                posts = changed_posts(*position, until=until, limit=POLL_BATCH)
+            if posts:
+                position = (posts[-1]['changed_at'], posts[-1]['id'])
+            events.extend(to_events(posts))
+            if len(posts) < POLL_BATCH:
+                return events, position
+
+    def catch_up(self, subscriber, after):
+        """
+        Published posts between `after` and where the subscriber's live events
+        start, for a client resuming from further back than the backlog
+        (blocking). Returns None if there are more than NEWS_STREAM_RESUME_LIMIT
+        changes to go through; the client is then told to re-sync from the
+        list API instead.
+        """
+        limit = settings.NEWS_STREAM_RESUME_LIMIT
+        with news_db_breaker.guard():
+            posts = changed_posts(*after, until=subscriber.after[0], limit=limit + 1)
+        if len(posts) > limit:
+            return None
+        return [event for event in to_events(posts) if event.position <= subscriber.after and subscriber.matches(event)]
+
+
+class StreamMeter:
+    """
+    Bills a stream (NEWS_STREAM_BILLING): NEWS_STREAM_COST credits per event
+    delivered, or per connection-minute after the first, which the connecting
+    call already paid for.
+    """
+
+    def __init__(self, credit):
+        self.credit = credit
+        self.per_event = settings.NEWS_STREAM_BILLING == 'event'
+        self.next_minute = time.monotonic() + 60
+
+    async def charge(self):
+        return await sync_to_async(self.credit.deduct_credits, thread_sensitive=False)(
+            cost=settings.NEWS_STREAM_COST
+        )
+
+    async def event(self):
+        return await self.charge() if self.per_event else True
+
+    async def tick(self):
+        """Charge for every connection-minute that has started since the last tick."""
+        while not self.per_event and time.monotonic() >= self.next_minute:
+            if not await self.charge():
+                return False
+            self.next_minute += 60
+        return True
+
+    def seconds_to_next_charge(self):
+        return None if self.per_event else max(0.0, self.next_minute - time.monotonic())
+
+
+news_stream = StreamBroadcaster()
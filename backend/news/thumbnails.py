@@ -0,0 +1,285 @@
+"""
+Resized, recompressed (WebP/JPEG) variants of WordPress featured images,
+served by ThumbnailView at /api/thumbnails/.
+
+Each variant is generated once, in a small per-process thread pool, and kept
+in THUMBNAIL_CACHE_ROOT under the hash of the source URL and variant. The
+directory is held under THUMBNAIL_CACHE_MAX_BYTES by deleting the least
+recently used files. Thumbnail URLs carry a signature over the source URL
+(see thumbnail_url), so the endpoint only ever fetches images this API
+pointed partners at.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlencode, urlsplit
+
+import requests
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from monitoring.metrics import cache_requests
+
+logger = logging.getLogger('news.thumbnails')
+
+SIGNER = signing.Signer(salt='news.thumbnails')
+# format name -> (Pillow format, content type)
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+# A cache hit moves a file to the young end of the LRU at most this often
+TOUCH_INTERVAL = 60 * 60
+# Pruning deletes down to this share of THUMBNAIL_CACHE_MAX_BYTES
+PRUNE_LOW_WATER = 0.9
+# Unfinished temp files older than this were left by a killed worker
+STALE_TEMP_SECONDS = 60 * 60
+
+
+class ThumbnailError(Exception):
+    """The source image could not be fetched or decoded."""
+
+
+def thumbnail_url(src, width=None):
+    """Signed thumbnail URL for a featured image URL (None for none)."""
+    if not src:
+        return None
+    query = urlencode({
+        'src': src,
+        'w': width or settings.THUMBNAIL_DEFAULT_WIDTH,
+        'sig': SIGNER.signature(src),
+    })
+    return f"{settings.THUMBNAIL_BASE_URL}/api/thumbnails/?{query}"
+
+
+def valid_signature(src, signature):
+    return constant_time_compare(SIGNER.signature(src), signature)
+
+
+def variant_key(src, width, fmt):
+    return hashlib.sha256(f'{src}\n{width}\n{fmt}\n{settings.THUMBNAIL_QUALITY}'.encode()).hexdigest()
+
+
+def fetch(src, session):
+    """The source image's bytes, refusing anything over THUMBNAIL_MAX_SOURCE_BYTES."""
+    if urlsplit(src).scheme not in ('http', 'https'):
+        raise ThumbnailError(f'Unsupported source URL {src!r}')
+    try:
+        with session.get(src, stream=True, timeout=settings.THUMBNAIL_FETCH_TIMEOUT_SECONDS) as response:
+            response.raise_for_status()
+            data = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                data += chunk
+                if len(data) > settings.THUMBNAIL_MAX_SOURCE_BYTES:
+                    raise ThumbnailError(f'{src} is larger than {settings.THUMBNAIL_MAX_SOURCE_BYTES} bytes')
+    except requests.RequestException as exc:
+        raise ThumbnailError(f'Could not fetch {src}: {exc!r}')
+    return bytes(data)
+
+
+def render(data, width, fmt):
+    """`data` scaled down to `width` pixels wide (never up) and encoded as `fmt`."""
+    pillow_format, _ = FORMATS[fmt]
+    try:
+        with Image.open(BytesIO(data)) as image:
+            if image.width * image.height > settings.THUMBNAIL_MAX_SOURCE_PIXELS:
+                raise ThumbnailError(f'Source is {image.width}x{image.height} pixels')
+            # Lets the JPEG decoder downscale while decoding, which is much cheaper
+            image.draft('RGB', (width, max(1, image.height * width // image.width)))
+            image = ImageOps.exif_transpose(image)
+            if image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+            if image.mode not in ('RGB', 'RGBA', 'L'):
+                image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+            if pillow_format == 'JPEG' and image.mode == 'RGBA':
+                background = Image.new('RGB', image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+
+            out = BytesIO()
+            if pillow_format == 'JPEG':
+                image.save(out, 'JPEG', quality=settings.THUMBNAIL_QUALITY, optimize=True, progressive=True)
+            else:
+                image.save(out, 'WEBP', quality=settings.THUMBNAIL_QUALITY, method=4)
+            return out.getvalue()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as exc:
+        raise ThumbnailError(f'Could not decode the source image: {exc!r}')
+
+
+class ThumbnailCache:
+    """
+    The on-disk variant cache of one process. Concurrent requests for the
+    same missing variant wait on a single generation; other processes may
+    generate it too, harmlessly, since files are written under a temporary
+    name and renamed into place.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pool = None
+        self.in_progress = {}
+        self.last_prune = 0
+        self.local = threading.local()
+
+    @property
+    def root(self):
+        return settings.THUMBNAIL_CACHE_ROOT
+
+    def path(self, key, fmt):
+        return os.path.join(self.root, key[:2], key[2:4], f'{key}.{fmt}')
+
+    def get(self, src, width, fmt):
+        """
+        Path of the cached variant, generating it first if needed. Raises
+        ThumbnailError, or concurrent.futures.TimeoutError after
+        THUMBNAIL_TIMEOUT_SECONDS.
+        """
+        key = variant_key(src, width, fmt)
+        path = self.path(key, fmt)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            pass
+        else:
+            cache_requests.labels('thumbnails', 'hit').inc()
+            if time.time() - stat.st_mtime > TOUCH_INTERVAL:
+                self._touch(path)
+            return path
+
+        cache_requests.labels('thumbnails', 'miss').inc()
+        if cache.get(self._failure_key(key)):
+            raise ThumbnailError(f'{src} failed recently')
+        return self._submit(key, src, width, fmt, path).result(timeout=settings.THUMBNAIL_TIMEOUT_SECONDS)
+
+    def open_variant(self, src, width, fmt):
+        """
+        The cached variant opened for reading (see get). If pruning deleted
+        it in the meantime it is generated once more; a second miss raises
+        FileNotFoundError.
+        """
+        try:
+            return open(self.get(src, width, fmt), 'rb')
+        except FileNotFoundError:
+            return open(self.get(src, width, fmt), 'rb')
+
+    def _submit(self, key, src, width, fmt, path):
+        with self.lock:
+            future = self.in_progress.get(key)
+            if future is None:
+                if self.pool is None:
+                    self.pool = ThreadPoolExecutor(
+                        max_workers=settings.THUMBNAIL_WORKERS, thread_name_prefix='thumbnails',
+                    )
+                future = self.pool.submit(self._generate, key, src, width, fmt, path)
+                self.in_progress[key] = future
+                future.add_done_callback(lambda _: self._done(key))
+            return future
+
+    def _done(self, key):
+        with self.lock:
+            self.in_progress.pop(key, None)
+
+    def _generate(self, key, src, width, fmt, path):
+        if os.path.exists(path):
+            return path
+        try:
+            data = render(fetch(src, self._session()), width, fmt)
+        except ThumbnailError:
+            cache.set(self._failure_key(key), True, timeout=settings.THUMBNAIL_FAILURE_TTL)
+            raise
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        self._schedule_prune()
+        return path
+
+    def _schedule_prune(self):
+        # The walk over the whole cache runs in its own thread, so neither the
+        # request waiting on this variant nor the generation pool waits for it
+        with self.lock:
+            if time.monotonic() - self.last_prune < settings.THUMBNAIL_PRUNE_INTERVAL_SECONDS:
+                return
+            self.last_prune = time.monotonic()
+        threading.Thread(target=self._prune_quietly, name='thumbnails-prune', daemon=True).start()
+
+    def _prune_quietly(self):
+        try:
+            self.prune()
+        except OSError:
+            logger.exception('Pruning the thumbnail cache failed')
+
+    def _session(self):
+        # One keep-alive session per pool thread
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _failure_key(self, key):
+        return f'thumbnail-failed:{key}'
+
+    def prune(self, max_bytes=None):
+        """
+        Delete the least recently used variants until the cache is below
+        PRUNE_LOW_WATER of max_bytes (THUMBNAIL_CACHE_MAX_BYTES), if it is over
+        max_bytes. Returns (files deleted, bytes freed).
+        """
+        max_bytes = settings.THUMBNAIL_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        now = time.time()
+        entries = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if filename.endswith('.tmp'):
+                    if now - stat.st_mtime > STALE_TEMP_SECONDS:
+                        self._remove(path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        deleted = freed = 0
+        if total <= max_bytes:
+            return deleted, freed
+        entries.sort()
+        for _, size, path in entries:
+            if total - freed <= max_bytes * PRUNE_LOW_WATER:
+                break
+            if self._remove(path):
+                deleted += 1
+                freed += size
+        logger.info('Pruned %d thumbnail(s), %d bytes', deleted, freed)
+        return deleted, freed
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+
+thumbnail_cache = ThumbnailCache()
@@ -1,9 +1,10 @@
 from django.urls import path
-from .views import PartnerNewsListView, PartnerNewsDetailView
+from .views import PartnerNewsListView, PartnerNewsDetailView, PartnerNewsStreamView
 
 app_name = 'news'
 
 urlpatterns = [
     path('', PartnerNewsListView.as_view(), name='partner-news-list'),
+    path('stream/', PartnerNewsStreamView.as_view(), name='partner-news-stream'),
     path('<int:post_id>/', PartnerNewsDetailView.as_view(), name='partner-news-detail'),
 ]
@@ -1,9 +1,29 @@
+import asyncio
+import concurrent.futures
+import time
+
+from asgiref.sync import sync_to_async
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.db import connections  # <--- CHANGED: Import connections instead of connection
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import DatabaseError
+from django.http import FileResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.views import View
+from billing.concurrency import stream_limiter
+from monitoring.metrics import stream_events
+from monitoring.timing import phase
+from . import stale
 from .authentication import APIKeyAuthentication
+from .budgets import QueryBudget, QueryBudgetExceeded
+from .circuit import CircuitOpen, news_db_breaker
+from .feed import post_categories
+from .replicas import news_cursor
 from .serializers import MinimalNewsSerializer, FullNewsSerializer
+from .snapshot import ALL_CATEGORIES, news_snapshot
+from .stream import StreamMeter, format_event, format_message, news_stream, parse_event_id
+from .thumbnails import FORMATS, ThumbnailError, thumbnail_cache, valid_signature, variant_key
 from .constants import CATEGORY_MAPPING, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 class PartnerNewsListView(APIView):
@@ -33,28 +53,51 @@ class PartnerNewsListView(APIView):
         category_ids = None
         if category_slug and category_slug.lower() in CATEGORY_MAPPING:
             category_ids = CATEGORY_MAPPING[category_slug.lower()]
+
+        # The first pages come from the shared snapshot (news/snapshot.py) while it is fresh
+        with phase('snapshot'):
+            snapshot_response = news_snapshot.page(
+                category_slug.lower() if category_ids else ALL_CATEGORIES, page, page_size
+            )
+        if snapshot_response is not None:
+            return snapshot_response
         
-        # Fetch news
-        posts, total_count = self.fetch_news_from_wordpress(category_ids, page_size, offset)
+        # Fetch news (falling back to the last good copy of this page if news_db
+        # is down or the page query does not fit in the time budget)
+        stale_key = stale.list_key(category_ids, page, page_size)
+        try:
+            with news_db_breaker.guard():
+                posts, total_count = self.fetch_news_from_wordpress(category_ids, page_size, offset)
+        except CircuitOpen as exc:
+            return stale.fallback_response(stale_key, exc.retry_after)
+        except DatabaseError:
+            return stale.fallback_response(stale_key, settings.NEWS_DB_CIRCUIT_OPEN_SECONDS)
         
         # Serialize data
-        serializer = MinimalNewsSerializer(posts, many=True)
+        with phase('serialize'):
+            results = MinimalNewsSerializer(posts, many=True).data
         
-        # Prepare response with pagination info
+        # Prepare response with pagination info (count and total_pages are
+        # null when the count did not fit in the query budget)
         response_data = {
-            'results': serializer.data,
+            'results': results,
             'count': total_count,
             'page': page,
             'page_size': page_size,
-            'total_pages': (total_count + page_size - 1) // page_size,
+            'total_pages': (total_count + page_size - 1) // page_size if total_count is not None else None,
         }
+        if total_count is not None:
+            stale.remember(stale_key, response_data)
         
         return Response(response_data, status=status.HTTP_200_OK)
 
     def fetch_news_from_wordpress(self, category_ids, limit, offset):
         """
-        Fetch news from WordPress database ('news_db').
+        Fetch news from the WordPress database (news_db or a read replica).
+        All statements share NEWS_LIST_QUERY_BUDGET_MS. The page comes first;
+        if the count then runs out of budget it is returned as None.
         """
+        budget = QueryBudget(settings.NEWS_LIST_QUERY_BUDGET_MS)
         if category_ids:
             # Filter by category
             query = """
@@ -114,25 +157,33 @@ class PartnerNewsListView(APIView):
             params = [limit, offset]
             count_params = []
         
-        # Execute queries using 'news_db' connection
-        with connections['news_db'].cursor() as cursor:  # <--- CHANGED
-            # Get total count
-            cursor.execute(count_query, count_params)
-            total_count = cursor.fetchone()[0]
-            
+        # Execute queries on the WordPress database picked by news.replicas
+        with news_cursor() as cursor:
             # Get posts
-            cursor.execute(query, params)
-            if cursor.description:
-                columns = [col[0] for col in cursor.description]
-                results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-            else:
-                results = []
+            with phase('news_page'):
+                rows = budget.fetchall(cursor, query, params)
+                if cursor.description:
+                    columns = [col[0] for col in cursor.description]
+                    results = [dict(zip(columns, row)) for row in rows]
+                else:
+                    results = []
+
+            # Categories of the whole page in one query, before the count, so a
+            # count that uses up the budget cannot cost the page its categories
+            with phase('categories'):
+                categories = post_categories(cursor, [row['ID'] for row in results], budget)
+
+            # Get total count (optional: a page without it beats no page)
+            with phase('news_count'):
+                try:
+                    total_count = budget.fetchall(cursor, count_query, count_params)[0][0]
+                except QueryBudgetExceeded:
+                    total_count = None
         
-        # Fetch categories for each post
         posts = []
         for row in results:
             post_data = self.map_post_to_format(row)
-            post_data['categories'] = self.fetch_post_categories(row['ID'])
+            post_data['categories'] = [name for _, name in categories.get(row['ID'], [])]
             posts.append(post_data)
         
         return posts, total_count
@@ -149,22 +200,6 @@ class PartnerNewsListView(APIView):
             "categories": [] 
         }
 
-    def fetch_post_categories(self, post_id):
-        """Fetch categories for a given post ID from 'news_db'"""
-        query = """
-            SELECT t.name 
-            FROM wp_terms t
-            JOIN wp_term_taxonomy tt ON t.term_id = tt.term_id
-            JOIN wp_term_relationships tr ON tt.term_taxonomy_id = tr.term_taxonomy_id
-            WHERE tt.taxonomy = 'category' AND tr.object_id = %s
-        """
-        # Execute using 'news_db' connection
-        with connections['news_db'].cursor() as cursor:  # <--- CHANGED
-            cursor.execute(query, [post_id])
-            categories = [row[0] for row in cursor.fetchall()]
-        return categories
-
-
 class PartnerNewsDetailView(APIView):
     """
     API endpoint for external partners to access a single news article.
@@ -172,15 +207,25 @@ class PartnerNewsDetailView(APIView):
     authentication_classes = [APIKeyAuthentication]
 
     def get(self, request, post_id):
-        post = self.fetch_single_news_from_wordpress(post_id)
+        stale_key = stale.post_key(post_id)
+        try:
+            with news_db_breaker.guard():
+                post = self.fetch_single_news_from_wordpress(post_id)
+        except CircuitOpen as exc:
+            return stale.fallback_response(stale_key, exc.retry_after)
+        except DatabaseError:
+            return stale.fallback_response(stale_key, settings.NEWS_DB_CIRCUIT_OPEN_SECONDS)
         
         if not post:
             return Response({'error': 'News not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-        serializer = FullNewsSerializer(post)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        with phase('serialize'):
+            data = FullNewsSerializer(post).data
+        stale.remember(stale_key, data)
+        return Response(data, status=status.HTTP_200_OK)
 
     def fetch_single_news_from_wordpress(self, post_id):
+        budget = QueryBudget(settings.NEWS_DETAIL_QUERY_BUDGET_MS)
         query = """
             SELECT 
                 p.ID, p.post_date, p.post_date_gmt, p.post_content, p.post_title,
@@ -192,20 +237,19 @@ class PartnerNewsDetailView(APIView):
             LEFT JOIN wp_posts wp_media ON pm.meta_value = wp_media.ID AND wp_media.post_type = 'attachment'
             WHERE p.post_type = 'post' AND p.post_status = 'publish' AND p.ID = %s
         """
-        # Execute using 'news_db' connection
-        with connections['news_db'].cursor() as cursor:  # <--- CHANGED
-            cursor.execute(query, [post_id])
+        with phase('news_post'), news_cursor() as cursor:
+            rows = budget.fetchall(cursor, query, [post_id])
             if cursor.description:
                 columns = [col[0] for col in cursor.description]
-                row = cursor.fetchone()
-                if not row:
+                if not rows:
                     return None
-                result = dict(zip(columns, row))
+                result = dict(zip(columns, rows[0]))
             else:
                 return None
 
         post_data = self.map_post_to_format(result)
-        post_data['categories'] = self.fetch_post_categories(result['ID'])
+        with phase('categories'):
+            post_data['categories'] = self.fetch_post_categories(result['ID'], budget)
         
         return post_data
 
@@ -220,7 +264,7 @@ class PartnerNewsDetailView(APIView):
             "categories": []
         }
 
-    def fetch_post_categories(self, post_id):
+    def fetch_post_categories(self, post_id, budget):
         query = """
             SELECT t.name 
             FROM wp_terms t
@@ -228,8 +272,188 @@ class PartnerNewsDetailView(APIView):
             JOIN wp_term_relationships tr ON tt.term_taxonomy_id = tr.term_taxonomy_id
             WHERE tt.taxonomy = 'category' AND tr.object_id = %s
         """
-        # Execute using 'news_db' connection
-        with connections['news_db'].cursor() as cursor:  # <--- CHANGED
-            cursor.execute(query, [post_id])
-            categories = [row[0] for row in cursor.fetchall()]
-        return categories
\ No newline at end of file
+        with news_cursor() as cursor:
+            categories = [row[0] for row in budget.fetchall(cursor, query, [post_id])]
+        return categories
+
+
+class StreamResponse(StreamingHttpResponse):
+    """
+    Frees the stream slot when the server closes the response, including
+    when the client left before the stream was ever iterated (the stream's
+    own cleanup only runs once it started).
+    """
+
+    def __init__(self, *args, lease, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lease = lease
+
+    def close(self):
+        try:
+            stream_limiter.release(self.lease)
+        finally:
+            super().close()
+
+
+class PartnerNewsStreamView(View):
+    """
+    Server-Sent Events stream of newly published posts (MinimalNewsSerializer
+    shape) as an alternative to polling PartnerNewsListView. Supports
+    ?category= and resuming with Last-Event-ID. Needs the ASGI apps; under
+    WSGI, which would buffer the response, it answers 503.
+    APICreditMiddleware authenticates and bills the connecting call; after
+    that StreamMeter bills per event or per connection-minute.
+    """
+
+    async def get(self, request):
+        api_key = getattr(request, 'api_key_instance', None)
+        if api_key is None:
+            return JsonResponse({'error': 'Missing X-API-KEY header'}, status=401)
+
+        if not isinstance(request, ASGIRequest):
+            # A WSGI server would buffer the whole stream and hold a worker for it
+            return JsonResponse({
+                'error': 'News streams are not served by this deployment.'
+            }, status=503)
+
+        category_ids = None
+        category_slug = request.GET.get('category')
+        if category_slug and category_slug.lower() in CATEGORY_MAPPING:
+            category_ids = set(CATEGORY_MAPPING[category_slug.lower()])
+
+        lease = await sync_to_async(stream_limiter.acquire)(api_key.pk, settings.NEWS_STREAM_MAX_PER_KEY, wait=0)
+        if lease is None:
+            response = JsonResponse({
+                'error': f'At most {settings.NEWS_STREAM_MAX_PER_KEY} streams may be open for this API Key.'
+            }, status=429)
+            response['Retry-After'] = str(settings.NEWS_STREAM_RETRY_MS // 1000 or 1)
+            return response
+
+        after = parse_event_id(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id'))
+        response = StreamResponse(
+            self.stream(api_key, lease, category_ids, after), lease=lease, content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Tell nginx not to buffer the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, api_key, lease, category_ids, after):
+        subscriber = None
+        try:
+            subscriber, replay = news_stream.subscribe(category_ids, after)
+            stream_events.labels('connected').inc()
+            yield f"retry: {settings.NEWS_STREAM_RETRY_MS}\n\n"
+
+            if replay is None:
+                try:
+                    replay = await sync_to_async(news_stream.catch_up, thread_sensitive=False)(subscriber, after)
+                except (CircuitOpen, DatabaseError):
+                    replay = None
+                if replay is None:
+                    stream_events.labels('reset').inc()
+                    yield format_message('reset', {
+                        'detail': 'Too far behind to resume. Re-sync from /api/news/; the stream continues from now.'
+                    })
+                    replay = []
+
+            meter = StreamMeter(api_key.user.credit)
+            deadline = time.monotonic() + settings.NEWS_STREAM_MAX_SECONDS
+            refreshed = time.monotonic()
+            pending = list(replay)
+            while True:
+                if not await meter.tick():
+                    yield self.out_of_credits()
+                    return
+
+                if pending:
+                    event = pending.pop(0)
+                else:
+                    if subscriber.overflowed and subscriber.queue.empty():
+                        # Dropped events; the client reconnects and resumes from its last id
+                        stream_events.labels('overflow').inc()
+                        return
+                    now = time.monotonic()
+                    if now >= deadline:
+                        return
+                    if now - refreshed >= settings.NEWS_STREAM_HEARTBEAT_SECONDS:
+                        await sync_to_async(stream_limiter.refresh)(lease)
+                        refreshed = now
+                    timeout = min(settings.NEWS_STREAM_HEARTBEAT_SECONDS, deadline - now)
+                    next_charge = meter.seconds_to_next_charge()
+                    if next_charge is not None:
+                        timeout = min(timeout, next_charge)
+                    try:
+                        event = await asyncio.wait_for(subscriber.queue.get(), timeout=max(timeout, 0.01))
+                    except asyncio.TimeoutError:
+                        yield ": keepalive\n\n"
+                        continue
+
+                if not await meter.event():
+                    yield self.out_of_credits()
+                    return
+                yield format_event(event)
+                stream_events.labels('delivered').inc()
+        finally:
+            if subscriber is not None:
+                news_stream.unsubscribe(subscriber)
+            await sync_to_async(stream_limiter.release)(lease)
+
+    def out_of_credits(self):
+        stream_events.labels('insufficient_credits').inc()
+        return format_message('error', {
+            'error': 'Insufficient credits. Daily free limit used and no purchased credits remaining.'
+        })
+
+
+class ThumbnailView(View):
+    """
+    Resized WebP/JPEG copy of a featured image, from the URLs in the news
+    payloads' `thumbnail` field: ?src=&w=&sig=, plus an optional
+    ?format=webp|jpeg (otherwise picked from the Accept header).
+    Public, so partners can use the URLs in <img> tags; the signature stops
+    it from fetching anything else.
+    """
+
+    def get(self, request):
+        src = request.GET.get('src', '')
+        if not src or not valid_signature(src, request.GET.get('sig', '')):
+            return JsonResponse({'error': 'Invalid thumbnail signature.'}, status=403)
+
+        try:
+            width = int(request.GET.get('w', settings.THUMBNAIL_DEFAULT_WIDTH))
+        except ValueError:
+            width = None
+        if width not in settings.THUMBNAIL_WIDTHS:
+            return JsonResponse({
+                'error': f"w must be one of {', '.join(map(str, settings.THUMBNAIL_WIDTHS))}."
+            }, status=400)
+
+        fmt = request.GET.get('format')
+        negotiated = not fmt
+        if negotiated:
+            fmt = 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpeg'
+        if fmt not in FORMATS:
+            return JsonResponse({'error': f"format must be one of {', '.join(FORMATS)}."}, status=400)
+
+        etag = f'"{variant_key(src, width, fmt)}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponseNotModified()
+        else:
+            try:
+                variant = thumbnail_cache.open_variant(src, width, fmt)
+            except ThumbnailError:
+                return JsonResponse({'error': 'The source image could not be loaded.'}, status=502)
+            except (concurrent.futures.TimeoutError, FileNotFoundError):
+                # Only an alias of the builtin TimeoutError from Python 3.11
+                response = JsonResponse({'error': 'The thumbnail is still being generated.'}, status=503)
+                response['Retry-After'] = '1'
+                return response
+            response = FileResponse(variant, content_type=FORMATS[fmt][1])
+
+        # A variant never changes: its name covers the source URL, size, format and quality
+        response['Cache-Control'] = f'public, max-age={settings.THUMBNAIL_MAX_AGE}, immutable'
+        response['ETag'] = etag
+        if negotiated:
+            response['Vary'] = 'Accept'
+        return response
@@ -0,0 +1,33 @@
+from django.contrib import admin
+
+from .delivery import redeliver
+from .models import WebhookCheckpoint, WebhookDelivery, WebhookEndpoint
+
+
+@admin.register(WebhookEndpoint)
+class WebhookEndpointAdmin(admin.ModelAdmin):
+    list_display = ['url', 'user', 'is_active', 'max_in_flight', 'created_at', 'last_success_at']
+    list_filter = ['is_active']
+    search_fields = ['url', 'user__email']
+    raw_id_fields = ['user']
+
+
+@admin.register(WebhookDelivery)
+class WebhookDeliveryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'endpoint', 'status', 'attempts', 'last_status_code', 'next_attempt_at', 'created_at']
+    list_filter = ['status']
+    search_fields = ['endpoint__url', 'endpoint__user__email']
+    readonly_fields = [field.name for field in WebhookDelivery._meta.fields]
+    actions = ['redeliver_dead']
+
+    @admin.action(description='Redeliver selected dead deliveries')
+    def redeliver_dead(self, request, queryset):
+        self.message_user(request, f"{redeliver(queryset)} delivery(ies) queued again.")
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(WebhookCheckpoint)
+class WebhookCheckpointAdmin(admin.ModelAdmin):
+    list_display = ['name', 'last_changed_at', 'last_post_id', 'updated_at']
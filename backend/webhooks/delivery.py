@@ -0,0 +1,297 @@
+import hashlib
+import hmac
+import ipaddress
+import json
+import random
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from monitoring.metrics import webhook_deliveries
+from .models import WebhookDelivery, WebhookEndpoint
+
+DELIVERY_HEADER = 'X-DN7-Webhook-Id'
+TIMESTAMP_HEADER = 'X-DN7-Webhook-Timestamp'
+SIGNATURE_HEADER = 'X-DN7-Webhook-Signature'
+USER_AGENT = 'dn7x7-webhooks/1.0'
+MAX_ERROR_LENGTH = 2000
+
+
+def sign(secret, timestamp, body):
+    """'v1=' + hex HMAC-SHA256 of '<timestamp>.<body>' under the endpoint's secret."""
+    message = f'{timestamp}.'.encode() + body
+    return 'v1=' + hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def validate_url(url):
+    """
+    Raise ValueError unless `url` is one we are willing to POST to: https and
+    resolving only to public addresses. Returns the address to connect to, so
+    the host is not resolved a second time (see PinnedAdapter).
+    WEBHOOK_ALLOW_PRIVATE_URLS lifts both checks so a local receiver can be
+    used in development; the address is then None and the URL used as is.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError('Webhook URLs must be absolute http(s) URLs.')
+    if settings.WEBHOOK_ALLOW_PRIVATE_URLS:
+        return None
+    if parts.scheme != 'https':
+        raise ValueError('Webhook URLs must use https.')
+    try:
+        addresses = socket.getaddrinfo(parts.hostname, parts.port or 443, proto=socket.IPPROTO_TCP)
+    except socket.gaierror:
+        raise ValueError(f'Could not resolve {parts.hostname}.')
+    for *_, sockaddr in addresses:
+        if not ipaddress.ip_address(sockaddr[0]).is_global:
+            raise ValueError('Webhook URLs must not point at private or local addresses.')
+    return addresses[0][4][0]
+
+
+class PinnedAdapter(HTTPAdapter):
+    """
+    Sends requests whose URL names the vetted IP (see pinned_url) while TLS
+    still uses and verifies the hostname from the Host header, so a receiver
+    cannot rebind its DNS to an internal address between check and connect.
+    """
+
+    def build_connection_pool_key_attributes(self, request, verify, cert=None):
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(request, verify, cert)
+        host = request.headers.get('Host')
+        if host and host_params['scheme'] == 'https':
+            hostname = urlsplit(f'//{host}').hostname
+            pool_kwargs['server_hostname'] = hostname
+            pool_kwargs['assert_hostname'] = hostname
+        return host_params, pool_kwargs
+
+
+def pinned_url(url, address):
+    """`url` with its host replaced by `address`, and the Host header value to send with it."""
+    parts = urlsplit(url)
+    host = parts.hostname if parts.port is None else f'{parts.hostname}:{parts.port}'
+    ip = f'[{address}]' if ':' in address else address
+    netloc = ip if parts.port is None else f'{ip}:{parts.port}'
+    if '@' in parts.netloc:
+        netloc = parts.netloc.rpartition('@')[0] + '@' + netloc
+    return parts._replace(netloc=netloc).geturl(), host
+
+
+def _due(now):
+    return (
+        Q(status=WebhookDelivery.PENDING) | Q(status=WebhookDelivery.SENDING, locked_until__lt=now)
+    ) & Q(next_attempt_at__lte=now)
+
+
+def claim(limit):
+    """
+    Mark up to `limit` due deliveries as SENDING for this worker and return
+    them, without taking any endpoint past its max_in_flight (0 = unlimited).
+    Claims lock the endpoint rows involved, so in-flight counts stay exact
+    when several `deliver_webhooks` processes share the queue.
+    """
+    now = timezone.now()
+    due = _due(now)
+    endpoint_ids = set(
+        WebhookDelivery.objects
+        .filter(due, endpoint__is_active=True)
+        .order_by('next_attempt_at')
+        .values_list('endpoint_id', flat=True)[:limit * 4]
+    )
+    if not endpoint_ids:
+        return []
+
+    with transaction.atomic():
+        limits = dict(
+            WebhookEndpoint.objects
+            .select_for_update()
+            .filter(id__in=endpoint_ids, is_active=True)
+            .order_by('id')
+            .values_list('id', 'max_in_flight')
+        )
+        in_flight = dict(
+            WebhookDelivery.objects
+            .filter(endpoint_id__in=limits, status=WebhookDelivery.SENDING, locked_until__gte=now)
+            .values_list('endpoint_id')
+            .annotate(count=Count('id'))
+        )
+        ids = []
+        candidates = (
+            WebhookDelivery.objects
+            .filter(due, endpoint_id__in=limits)
+            .order_by('next_attempt_at')
+            .values_list('id', 'endpoint_id')[:limit * 4]
+        )
+        for delivery_id, endpoint_id in candidates:
+            cap = limits[endpoint_id]
+            if cap and in_flight.get(endpoint_id, 0) >= cap:
+                continue
+            in_flight[endpoint_id] = in_flight.get(endpoint_id, 0) + 1
+            ids.append(delivery_id)
+            if len(ids) >= limit:
+                break
+        WebhookDelivery.objects.filter(id__in=ids).update(
+            status=WebhookDelivery.SENDING,
+            locked_until=now + timedelta(seconds=settings.WEBHOOK_LEASE_SECONDS),
+        )
+    return list(WebhookDelivery.objects.filter(id__in=ids).select_related('endpoint').order_by('id'))
+
+
+def retry_delay(attempts, retry_after=None):
+    """
+    Exponential backoff with +-20% jitter, capped at WEBHOOK_RETRY_MAX_SECONDS,
+    but never sooner than a Retry-After the receiver asked for.
+    """
+    delay = min(settings.WEBHOOK_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.WEBHOOK_RETRY_MAX_SECONDS)
+    delay *= random.uniform(0.8, 1.2)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, settings.WEBHOOK_RETRY_MAX_SECONDS))
+    return delay
+
+
+def mark_delivered(delivery, status_code):
+    now = timezone.now()
+    delivery.status = WebhookDelivery.DELIVERED
+    delivery.attempts += 1
+    delivery.delivered_at = now
+    delivery.locked_until = None
+    delivery.last_status_code = status_code
+    delivery.last_error = ''
+    delivery.save(update_fields=['status', 'attempts', 'delivered_at', 'locked_until', 'last_status_code', 'last_error'])
+    WebhookEndpoint.objects.filter(pk=delivery.endpoint_id).update(last_success_at=now)
+    webhook_deliveries.labels('delivered').inc()
+
+
+def mark_failed(delivery, error, status_code=None, retry_after=None):
+    delivery.attempts += 1
+    delivery.last_status_code = status_code
+    delivery.last_error = str(error)[:MAX_ERROR_LENGTH]
+    delivery.locked_until = None
+    if delivery.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+        delivery.status = WebhookDelivery.DEAD
+        webhook_deliveries.labels('dead').inc()
+    else:
+        delivery.status = WebhookDelivery.PENDING
+        delivery.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay(delivery.attempts, retry_after))
+        webhook_deliveries.labels('retry').inc()
+    delivery.save(update_fields=[
+        'status', 'attempts', 'last_status_code', 'last_error', 'locked_until', 'next_attempt_at',
+    ])
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get('Retry-After', ''))
+    except ValueError:
+        return None
+
+
+def send(delivery, session):
+    """POST one delivery, signed, and record the outcome. Returns True on a 2xx."""
+    endpoint = delivery.endpoint
+    body = json.dumps(
+        {'id': delivery.id, 'attempt': delivery.attempts + 1, **delivery.payload},
+        cls=DjangoJSONEncoder, separators=(',', ':'),
+    ).encode()
+    timestamp = str(int(time.time()))
+    headers = {
+        'Content-Type': 'application/json',
+        'User-Agent': USER_AGENT,
+        DELIVERY_HEADER: str(delivery.id),
+        TIMESTAMP_HEADER: timestamp,
+        SIGNATURE_HEADER: sign(endpoint.secret, timestamp, body),
+    }
+    try:
+        # Checked again here: the host may resolve elsewhere than at registration
+        url = endpoint.url
+        address = validate_url(url)
+        if address:
+            url, headers['Host'] = pinned_url(url, address)
+        response = session.post(
+            url, data=body, headers=headers,
+            timeout=settings.WEBHOOK_TIMEOUT_SECONDS, allow_redirects=False,
+        )
+    except (requests.RequestException, ValueError) as exc:
+        mark_failed(delivery, repr(exc))
+        return False
+
+    if 200 <= response.status_code < 300:
+        mark_delivered(delivery, response.status_code)
+        return True
+    mark_failed(
+        delivery, f'HTTP {response.status_code}: {response.text[:500]}',
+        status_code=response.status_code, retry_after=_retry_after(response),
+    )
+    return False
+
+
+def deliver(deliveries):
+    """Send `deliveries` in order over one keep-alive session. Returns the number delivered."""
+    with requests.Session() as session:
+        session.mount('https://', PinnedAdapter())
+        return sum(send(delivery, session) for delivery in deliveries)
+
+
+def _deliver_in_thread(deliveries):
+    try:
+        return deliver(deliveries)
+    finally:
+        connections.close_all()
+
+
+def lanes(deliveries):
+    """
+    Split claimed deliveries into per-thread lanes: each endpoint's deliveries
+    are dealt round-robin over at most max_in_flight lanes (as many as there
+    are deliveries when unlimited), so a lane talks to one endpoint over one
+    connection.
+    """
+    by_endpoint = {}
+    for delivery in deliveries:
+        by_endpoint.setdefault(delivery.endpoint_id, []).append(delivery)
+    result = []
+    for group in by_endpoint.values():
+        width = min(group[0].endpoint.max_in_flight or len(group), len(group))
+        result.extend(group[offset::width] for offset in range(width))
+    return result
+
+
+def process_deliveries(workers=8, batch_size=50):
+    """
+    Claim up to batch_size due deliveries and send them from `workers` threads.
+    Returns (claimed, delivered).
+    """
+    deliveries = claim(batch_size)
+    if not deliveries:
+        return 0, 0
+    work = lanes(deliveries)
+    if len(work) == 1:
+        return len(deliveries), deliver(work[0])
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return len(deliveries), sum(pool.map(_deliver_in_thread, work))
+
+
+def redeliver(deliveries):
+    """Put DEAD deliveries back in the queue with a fresh set of attempts. Returns the number requeued."""
+    return deliveries.filter(status=WebhookDelivery.DEAD).update(
+        status=WebhookDelivery.PENDING,
+        attempts=0,
+        next_attempt_at=timezone.now(),
+        locked_until=None,
+    )
+
+
+def purge_delivered():
+    """Delete delivered rows older than WEBHOOK_DELIVERY_RETENTION_DAYS. Dead ones are kept."""
+    cutoff = timezone.now() - timedelta(days=settings.WEBHOOK_DELIVERY_RETENTION_DAYS)
+    deleted, _ = WebhookDelivery.objects.filter(status=WebhookDelivery.DELIVERED, delivered_at__lt=cutoff).delete()
+    return deleted
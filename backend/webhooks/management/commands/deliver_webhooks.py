@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from webhooks.delivery import process_deliveries, purge_delivered
+from webhooks.fanout import scan_changed_posts
+
+
+class Command(BaseCommand):
+    help = "Fan new and updated WordPress posts out to webhook endpoints and deliver them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help="Delivery threads")
+        parser.add_argument('--batch-size', type=int, default=50, help="Deliveries claimed per round")
+        parser.add_argument('--scan-size', type=int, default=200, help="Posts read from news_db per query")
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help="Keep running, scanning and delivering every N seconds (0 = run once).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            scanned, created = scan_changed_posts(batch_size=options['scan_size'])
+            if scanned:
+                self.stdout.write(f"Fanned {scanned} changed post(s) out as {created} delivery(ies).")
+
+            claimed = delivered = 0
+            while True:
+                round_claimed, round_delivered = process_deliveries(
+                    workers=options['workers'], batch_size=options['batch_size'],
+                )
+                claimed += round_claimed
+                delivered += round_delivered
+                if round_claimed < options['batch_size']:
+                    break
+            if claimed or not options['interval']:
+                self.stdout.write(f"Delivered {delivered} of {claimed} webhook(s).")
+            purge_delivered()
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,81 @@
+import secrets
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+def generate_secret():
+    return secrets.token_hex(32)
+
+
+class WebhookEndpoint(models.Model):
+    """
+    A partner URL that receives new and updated posts, optionally only those
+    in some categories (CATEGORY_MAPPING slugs; empty means all).
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='webhook_endpoints')
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=64, default=generate_secret, help_text="HMAC-SHA256 signing secret")
+    categories = models.JSONField(default=list, blank=True)
+    is_active = models.BooleanField(default=True)
+    max_in_flight = models.PositiveIntegerField(default=2, help_text="Max concurrent deliveries to this URL")
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_success_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user.email} | {self.url}"
+
+
+class WebhookDelivery(models.Model):
+    """
+    One signed POST of a batch of posts to one endpoint. Deliveries that
+    still fail after WEBHOOK_MAX_ATTEMPTS stay here as DEAD (the dead-letter
+    store) until they are redelivered or purged.
+    """
+    PENDING = 'pending'
+    SENDING = 'sending'
+    DELIVERED = 'delivered'
+    DEAD = 'dead'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (DELIVERED, 'Delivered'),
+        (DEAD, 'Dead'),
+    ]
+
+    endpoint = models.ForeignKey(WebhookEndpoint, on_delete=models.CASCADE, related_name='deliveries')
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # A SENDING row whose lease ran out (the worker died) is picked up again
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_status_code = models.IntegerField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'webhook deliveries'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='webhook_delivery_due_idx'),
+            models.Index(fields=['endpoint', 'status', '-id'], name='webhook_delivery_endpoint_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.endpoint_id} | {self.status} | {len(self.payload.get('posts', []))} post(s)"
+
+
+class WebhookCheckpoint(models.Model):
+    """
+    Position in the WordPress change feed (news.feed) up to which posts have
+    been fanned out to endpoints.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    last_changed_at = models.CharField(max_length=19, help_text="GMT, as WordPress stores it")
+    last_post_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_changed_at} #{self.last_post_id}"
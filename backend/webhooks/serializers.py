@@ -0,0 +1,50 @@
+from django.conf import settings
+from rest_framework import serializers
+
+from news.constants import CATEGORY_MAPPING
+from .delivery import validate_url
+from .models import WebhookDelivery, WebhookEndpoint
+
+
+class WebhookEndpointSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WebhookEndpoint
+        fields = ['id', 'url', 'secret', 'categories', 'is_active', 'max_in_flight', 'created_at', 'last_success_at']
+        read_only_fields = ['secret', 'max_in_flight', 'created_at', 'last_success_at']
+
+    def validate_url(self, value):
+        try:
+            validate_url(value)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+        return value
+
+    def validate_categories(self, value):
+        if not isinstance(value, list) or not all(isinstance(slug, str) for slug in value):
+            raise serializers.ValidationError('Expected a list of category slugs.')
+        unknown = sorted(set(value) - set(CATEGORY_MAPPING))
+        if unknown:
+            raise serializers.ValidationError(f"Unknown categories: {', '.join(unknown)}.")
+        return sorted(set(value))
+
+    def validate(self, attrs):
+        user = self.context['request'].user
+        if self.instance is None and user.webhook_endpoints.count() >= settings.WEBHOOK_MAX_ENDPOINTS_PER_USER:
+            raise serializers.ValidationError(
+                f'At most {settings.WEBHOOK_MAX_ENDPOINTS_PER_USER} webhook endpoints per account.'
+            )
+        return attrs
+
+
+class WebhookDeliverySerializer(serializers.ModelSerializer):
+    post_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = WebhookDelivery
+        fields = [
+            'id', 'status', 'attempts', 'post_count', 'last_status_code', 'last_error',
+            'next_attempt_at', 'created_at', 'delivered_at',
+        ]
+
+    def get_post_count(self, obj):
+        return len(obj.payload.get('posts', []))
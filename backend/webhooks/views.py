@@ -0,0 +1,47 @@
+from rest_framework import permissions, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .delivery import redeliver
+from .models import WebhookEndpoint, generate_secret
+from .serializers import WebhookDeliverySerializer, WebhookEndpointSerializer
+
+RECENT_DELIVERIES = 50
+
+
+class WebhookEndpointViewSet(viewsets.ModelViewSet):
+    """Register and manage the URLs that receive new and updated posts."""
+    serializer_class = WebhookEndpointSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return WebhookEndpoint.objects.filter(user=self.request.user).order_by('id')
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    @action(detail=True, methods=['get'])
+    def deliveries(self, request, pk=None):
+        """The latest deliveries to this endpoint, newest first; ?status=dead lists the dead letters."""
+        deliveries = self.get_object().deliveries.order_by('-id')
+        delivery_status = request.query_params.get('status')
+        if delivery_status:
+            deliveries = deliveries.filter(status=delivery_status)
+        serializer = WebhookDeliverySerializer(deliveries[:RECENT_DELIVERIES], many=True)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['post'])
+    def redeliver(self, request, pk=None):
+        """Queue this endpoint's dead deliveries again, or only those listed in "ids"."""
+        deliveries = self.get_object().deliveries.all()
+        ids = request.data.get('ids')
+        if ids:
+            deliveries = deliveries.filter(id__in=ids)
+        return Response({'requeued': redeliver(deliveries)})
+
+    @action(detail=True, methods=['post'])
+    def rotate_secret(self, request, pk=None):
+        endpoint = self.get_object()
+        endpoint.secret = generate_secret()
+        endpoint.save(update_fields=['secret'])
+        return Response(self.get_serializer(endpoint).data)
@@ -47,7 +47,7 @@ export default function UserUsagePage() {
 
       // 2. Fetch User Logs
       const logsRes = await adminUserService.getUserLogs(userId, { time_range: timeRange });
-      setLogs(logsRes.data);
+      setLogs(logsRes.data.results ?? logsRes.data);
     } catch (error) {
       toast.error("Failed to load user data");
       console.error(error);
@@ -44,9 +44,9 @@ export default function UsersPage() {
   const [users, setUsers] = useState([]);
   const [loading, setLoading] = useState(true);
   
-  // Pagination & Search
-  const [currentPage, setCurrentPage] = useState(1);
-  const [totalPages, setTotalPages] = useState(1);
+  // Pagination (cursor based) & Search
+  const [cursor, setCursor] = useState(null);
+  const [pageLinks, setPageLinks] = useState({ next: null, previous: null });
   const [searchTerm, setSearchTerm] = useState("");
   const [debouncedSearch] = useDebounce(searchTerm, 500);
 
@@ -60,16 +60,17 @@ export default function UsersPage() {
     setLoading(true);
     try {
       const response = await adminUserService.getAllUsers({
-        page: currentPage,
+        cursor,
         search: debouncedSearch,
         page_size: 10
       });
       if (response.data.results) {
         setUsers(response.data.results);
-        const count = response.data.count || 0;
-        setTotalPages(Math.ceil(count / 10)); 
+        setPageLinks({ next: response.data.next, previous: response.data.previous });
       } else {
+        // Search returns a single ranked list without cursors
         setUsers(response.data); 
+        setPageLinks({ next: null, previous: null });
       }
     } catch (error) {
       toast.error("Failed to fetch users");
@@ -80,7 +81,14 @@ export default function UsersPage() {
 
   useEffect(() => {
     fetchUsers();
-  }, [currentPage, debouncedSearch]);
+  }, [cursor, debouncedSearch]);
+
+  // A new search starts again from the first page
+  useEffect(() => {
+    setCursor(null);
+  }, [debouncedSearch]);
+
+  const cursorFrom = (url) => (url ? new URL(url).searchParams.get("cursor") : null);
 
   // --- Handlers ---
   const handleToggleStatus = async (user) => {
@@ -229,10 +237,10 @@ export default function UsersPage() {
           </Table>
         </CardContent>
         <CardFooter className="flex items-center justify-between border-t py-4">
-            <div className="text-xs text-muted-foreground">Page {currentPage} of {totalPages}</div>
+            <div className="text-xs text-muted-foreground">Showing {users.length} users</div>
             <div className="flex gap-2">
-                <Button variant="outline" size="sm" onClick={() => setCurrentPage(p => Math.max(1, p - 1))} disabled={currentPage === 1}>Previous</Button>
-                <Button variant="outline" size="sm" onClick={() => setCurrentPage(p => Math.min(totalPages, p + 1))} disabled={currentPage >= totalPages}>Next</Button>
+                <Button variant="outline" size="sm" onClick={() => setCursor(cursorFrom(pageLinks.previous))} disabled={!pageLinks.previous}>Previous</Button>
+                <Button variant="outline" size="sm" onClick={() => setCursor(cursorFrom(pageLinks.next))} disabled={!pageLinks.next}>Next</Button>
             </div>
         </CardFooter>
       </Card>
@@ -70,7 +70,7 @@ export default function BillingPage() {
       ]);
 
       setCredits(creditRes.data);
-      setLogs(logsRes.data);
+      setLogs(logsRes.data.results ?? logsRes.data);
     } catch (error) {
       toast.error("Failed to load billing history");
       console.error(error);
@@ -13,7 +13,7 @@ import { Input } from "@/components/ui/input";
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from "@/components/ui/card";
 
 // Services
-import { getCredits, getAPIKeys, getLogs } from "@/services/dashboardService";
+import { getSummary } from "@/services/dashboardService";
 
 export default function DashboardPage() {
   const [loading, setLoading] = useState(true);
@@ -26,23 +26,20 @@ export default function DashboardPage() {
   useEffect(() => {
     async function loadData() {
       try {
-        const [creditRes, keysRes, logsRes] = await Promise.all([
-          getCredits(),
-          getAPIKeys(),
-          getLogs({ time_range: "24h" }) // Fetch last 24h for stats
-        ]);
+        // One round trip: credits, keys, 24h totals and recent activity
+        const { data } = await getSummary();
 
-        const creditsData = creditRes.data;
-        const keysData = keysRes.data;
-        const logsData = logsRes.data;
+        const creditsData = data.credit;
+        const keysData = data.keys;
+        const logsData = data.recent_activity;
 
         // 1. Set Main Active Key (First active one found)
         const active = keysData.find(k => k.is_active);
         if (active) setMainKey(active.key);
 
         // 2. Calculate Stats
-        const totalCalls = logsData.length;
-        const successCalls = logsData.filter(l => l.status_code >= 200 && l.status_code < 300).length;
+        const totalCalls = data.usage_24h.total;
+        const successCalls = data.usage_24h.success;
         const successRate = totalCalls > 0 ? ((successCalls / totalCalls) * 100).toFixed(1) : 100;
 
         setStats({
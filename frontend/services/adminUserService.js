@@ -3,8 +3,9 @@ import apiClient from '@/services/authService'; // Importing your existing axios
 const BASE_URL = '/accounts/admin/users/';
 
 /**
- * Fetch all users (supports pagination/search if your viewset does)
- * @param {Object} params - e.g. { page: 1, search: "john" }
+ * Fetch users, newest first (cursor paginated)
+ * @param {Object} params - e.g. { cursor, page_size: 10, search: "john" }
+ * Response: { results: [...], next, previous }
  */
 export const getAllUsers = (params = {}) => {
   return apiClient.get(BASE_URL, { params });
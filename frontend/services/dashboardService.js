@@ -1,5 +1,15 @@
 import apiClient from '@/services/authService';
 
+// --- Summary Endpoint ---
+
+/**
+ * Everything the dashboard home needs in one call
+ * Endpoint: GET /api/dashboard/summary/
+ * Response: { credit, keys: [... with calls_today], usage_24h: { total, success }, recent_activity: [...] }
+ */
+export const getSummary = () => apiClient.get('/dashboard/summary/');
+
+
 // --- Credit Endpoints ---
 
 /**
@@ -35,18 +45,28 @@ export const revokeAPIKey = (id) => apiClient.post(`/dashboard/${id}/revoke_key/
 // --- Logs & Analytics Endpoints ---
 
 /**
- * Get usage logs
- * @param {Object} params - Optional filters like { time_range: '7d', status_filter: 'error' }
+ * Get usage logs (newest first, keyset paginated)
+ * @param {Object} params - Optional filters like { time_range: '7d', status: 'error', api_key: 3, cursor, page_size }
  * Endpoint: GET /api/dashboard/logs/
+ * Response: { results: [...], next, next_cursor }
  */
 export const getLogs = (params = {}) => apiClient.get('/dashboard/logs/', { params });
 
+/**
+ * Download usage logs as CSV or NDJSON
+ * @param {Object} params - Same filters as getLogs, plus { export_format: 'csv' | 'ndjson' }
+ * Endpoint: GET /api/dashboard/logs/export/
+ */
+export const exportLogs = (params = {}) => apiClient.get('/dashboard/logs/export/', { params, responseType: 'blob' });
+
 const dashboardService = {
+  getSummary,
   getCredits,
   getAPIKeys,
   createAPIKey,
   revokeAPIKey,
   getLogs,
+  exportLogs,
 };
 
 export default dashboardService;
\ No newline at end of file